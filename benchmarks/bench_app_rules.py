@@ -0,0 +1,152 @@
+"""
+Measures how long finding the rule for a focused application takes with
+thousands of exact, directory and glob rules.
+
+Compares Rules.match_rule and Rules.get_action, which use the rule index and
+path trie, to a linear scan testing every rule in turn.
+
+Usage: python benchmarks/bench_app_rules.py [-n RULES] [-l LOOKUPS]
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import fnmatch
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyboardsounds.app_rules import Action, GlobalAction, Rule, Rules
+from keyboardsounds.app_rules import PATH_SEPARATOR, WIN32
+from keyboardsounds.app_rules import is_glob_pattern, is_prefix_pattern
+from keyboardsounds.app_rules import normalize_app_path
+
+
+def make_path(*components: str) -> str:
+    root = "C:" if WIN32 else ""
+    return PATH_SEPARATOR.join([root, *components])
+
+
+def make_rules(count: int) -> list:
+    """
+    Builds `count` rules, 80% exact paths, 10% directories and 10% globs.
+    """
+    actions = [Action.DISABLE, Action.ENABLE]
+    rules = []
+    for i in range(count):
+        vendor = f"vendor{i % 200}"
+        if i % 10 == 0:
+            path = make_path("opt", vendor, f"suite{i}", "")
+        elif i % 10 == 1:
+            path = make_path("opt", vendor, f"tools{i}", "*", "bin", "*")
+        else:
+            path = make_path("opt", vendor, f"app{i}", "bin", f"app{i}")
+        rules.append(Rule(path, actions[i % 2]))
+    return rules
+
+
+def make_lookups(count: int, rule_count: int) -> list:
+    """
+    Builds the focused application paths, a mix of exact matches, paths under
+    a directory or glob rule and paths no rule matches.
+    """
+    paths = []
+    for _ in range(count):
+        i = random.randrange(rule_count)
+        vendor = f"vendor{i % 200}"
+        kind = random.randrange(4)
+        if kind == 0:
+            i -= i % 10
+            paths.append(make_path("opt", vendor, f"suite{i}", "bin", "tool"))
+        elif kind == 1:
+            i -= i % 10 - 1
+            paths.append(make_path("opt", vendor, f"tools{i}", "2024", "bin", "x"))
+        elif kind == 2:
+            i = i - i % 10 + 2
+            paths.append(make_path("opt", vendor, f"app{i}", "bin", f"app{i}"))
+        else:
+            paths.append(make_path("usr", "bin", f"other{i}"))
+    return paths
+
+
+class LinearRules:
+    """
+    The rules as a list, every lookup tests each rule in the order they were
+    added and keeps the most specific match.
+    """
+
+    def __init__(self, rules: list) -> None:
+        self.rules = []
+        for rule in rules:
+            key = normalize_app_path(rule.app_path)
+            if is_glob_pattern(rule.app_path):
+                pattern = re.compile(fnmatch.translate(key))
+                self.rules.append(("glob", pattern, rule))
+            elif is_prefix_pattern(rule.app_path):
+                self.rules.append(("prefix", key.rstrip(PATH_SEPARATOR), rule))
+            else:
+                self.rules.append(("exact", key, rule))
+
+    def match_rule(self, app_path: str):
+        key = normalize_app_path(app_path)
+        best = None
+        best_depth = -1
+        for kind, pattern, rule in self.rules:
+            if kind == "exact":
+                if pattern == key:
+                    return rule
+            elif kind == "glob":
+                if pattern.match(key):
+                    depth = pattern.pattern.count(PATH_SEPARATOR)
+                    if depth >= best_depth:
+                        best, best_depth = rule, depth
+            elif key.startswith(pattern + PATH_SEPARATOR):
+                depth = pattern.count(PATH_SEPARATOR)
+                if depth > best_depth:
+                    best, best_depth = rule, depth
+        return best
+
+
+def time_per_lookup(lookup, paths: list) -> float:
+    started = time.perf_counter()
+    for path in paths:
+        lookup(path)
+    return (time.perf_counter() - started) / len(paths) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "-n", type=int, nargs="+", default=[1000, 5000, 20000], help="rule counts"
+    )
+    parser.add_argument("-l", "--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    for count in args.n:
+        rules = make_rules(count)
+        paths = make_lookups(args.lookups, count)
+
+        started = time.perf_counter()
+        indexed = Rules(GlobalAction.ENABLE, rules)
+        indexed.match_rule(paths[0])
+        build_ms = (time.perf_counter() - started) * 1000.0
+        linear = LinearRules(rules)
+
+        # Both find the same rule for every path
+        for path in paths:
+            assert indexed.match_rule(path) is linear.match_rule(path), path
+
+        print(f"{count} rules (index built in {build_ms:.1f}ms):")
+        for name, lookup in [
+            ("match_rule", indexed.match_rule),
+            ("get_action", indexed.get_action),
+            ("linear scan", linear.match_rule),
+        ]:
+            print(f"  {name:<12} {time_per_lookup(lookup, paths):>10.2f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measures the throughput of the external API in commands per second.
+
+Sends N pipelined requests and N requests batched into a single 'batch'
+command through ExternalAPIClient to an ExternalAPI served locally, over
+TCP and, where available, a Unix domain socket.
+
+Usage: python benchmarks/bench_external_api.py [-n N] [-r ROUNDS]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyboardsounds.external_api import ExternalAPI, ExternalAPIClient
+from keyboardsounds.external_api import bind_unix_socket
+
+
+def on_command(command: dict):
+    # Stands in for the daemon's handler, a cheap read action
+    if command["action"] == "get_status":
+        return {"enabled": True, "volume": 50}
+    return None
+
+
+def best_rate(run, count: int, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def bench(client: ExternalAPIClient, count: int, rounds: int, out) -> None:
+    commands = [{"action": "get_status"} for _ in range(count)]
+
+    def sequential():
+        for command in commands:
+            client.request(command["action"])
+
+    def pipelined():
+        client.pipeline(commands)
+
+    def batched():
+        client.batch(commands)
+
+    for name, run in [
+        ("sequential", sequential),
+        ("pipelined", pipelined),
+        ("batched", batched),
+    ]:
+        rate = best_rate(run, count, rounds)
+        print(f"  {name:<10} {rate:>12,.0f} commands/s", file=out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", type=int, default=5000, help="commands per round")
+    parser.add_argument("-r", "--rounds", type=int, default=5, help="rounds per case")
+    args = parser.parse_args()
+
+    tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    tcp_socket.bind(("localhost", 0))
+    tcp_socket.listen()
+    with tempfile.TemporaryDirectory() as directory:
+        unix_socket = None
+        if sys.platform != "win32":
+            unix_socket = bind_unix_socket(os.path.join(directory, "bench.sock"))
+            if unix_socket is not None:
+                unix_socket.listen()
+
+        # The API prints every command it handles, which would dominate the
+        # measurement
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+        api = ExternalAPI(tcp_socket, on_command, unix_socket)
+        api.listen()
+        try:
+            transports = [("tcp", {"port": api.port()})]
+            if api.unix_path() is not None:
+                transports.append(("unix", {"path": api.unix_path()}))
+            for name, params in transports:
+                with ExternalAPIClient(timeout=60.0, **params) as client:
+                    print(f"{name}, {args.n} commands:", file=stdout)
+                    bench(client, args.n, args.rounds, stdout)
+        finally:
+            api.stop()
+            sys.stdout.close()
+            sys.stdout = stdout
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Measures the cost of mixing one buffer in the NumPy software mixer.
+
+Times SoftwareMixer.mix() at the default buffer size with 1, 8, 32 and 64
+voices playing, and reports the time per buffer, the voices mixed per
+millisecond and the share of the buffer's playback time spent mixing.
+
+Usage: python benchmarks/bench_software_mixer.py [-b BUFFERS]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from keyboardsounds.software_mixer import BUFFER_SIZE, CHANNELS, FREQUENCY
+from keyboardsounds.software_mixer import SoftwareMixer
+
+VOICE_COUNTS = [1, 8, 32, 64]
+
+
+def bench(voices: int, buffers: int, soft_clip: bool) -> float:
+    """
+    Returns:
+    - float: The average time to mix a buffer, in microseconds.
+    """
+    mixer = SoftwareMixer(max_voices=voices, soft_clip=soft_clip)
+    # Clips long enough that every voice plays for the whole measurement
+    frames = BUFFER_SIZE * (buffers + 1)
+    rng = np.random.default_rng(0)
+    clip = rng.uniform(-0.1, 0.1, (frames, CHANNELS)).astype(np.float32)
+    for i in range(voices):
+        mixer.play(clip, "keyboard", 0.8, pan=(i % 3 - 1) * 0.5)
+
+    out = np.zeros((BUFFER_SIZE, CHANNELS), dtype=np.float32)
+    mixer.mix(out)
+    started = time.perf_counter()
+    for _ in range(buffers):
+        mixer.mix(out)
+    return (time.perf_counter() - started) / buffers * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-b", "--buffers", type=int, default=2000)
+    args = parser.parse_args()
+
+    budget_us = BUFFER_SIZE / FREQUENCY * 1e6
+    print(f"{BUFFER_SIZE} frames per buffer, {budget_us:.0f}us of audio")
+    for soft_clip in [False, True]:
+        print("soft clip:" if soft_clip else "hard clip:")
+        for voices in VOICE_COUNTS:
+            per_buffer = bench(voices, args.buffers, soft_clip)
+            print(
+                f"  {voices:>3} voices {per_buffer:>8.1f}us/buffer "
+                f"{voices / per_buffer * 1000:>8.0f} voices/ms "
+                f"{per_buffer / budget_us:>7.1%} of real time"
+            )
+
+
+if __name__ == "__main__":
+    main()
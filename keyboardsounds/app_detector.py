@@ -33,7 +33,8 @@ def start_listening(callback):
     """
     global __callback
     __callback = callback
-    t = Thread(target=__message_loop)
+    # The message loop never returns, it must not keep the process alive
+    t = Thread(target=__message_loop, daemon=True)
     t.start()
 
 def __on_foreground_window_change(hWinEventHook, event, hwnd, idObject,
@@ -0,0 +1,176 @@
+import os
+import sys
+
+from threading import Thread
+from typing import Callable, Dict, Optional, Tuple
+
+__callback: Optional[Callable[[str], None]] = None
+
+# Executable paths keyed by PID. Each entry also holds the change time of the
+# process's /proc directory, which is set when the process starts, so that
+# an entry is not reused for a new process with a recycled PID.
+__exe_cache: Dict[int, Tuple[int, str]] = {}
+__exe_cache_size = 256
+
+
+def is_supported() -> bool:
+    """
+    Checks whether focused application detection is available.
+
+    Detection relies on the window manager publishing the active window on
+    the X11 root window, so it is only available in X11 sessions. Wayland
+    does not expose the focused window of other applications.
+
+    Returns:
+    - bool: True if running on Linux in an X11 session.
+    """
+    return (
+        sys.platform.startswith("linux")
+        and os.environ.get("XDG_SESSION_TYPE") != "wayland"
+        and bool(os.environ.get("DISPLAY"))
+    )
+
+
+def start_listening(callback):
+    """
+    Initiates the listening process for focused window changes in the X11
+    session.
+
+    This function starts a new thread that subscribes to changes of the
+    root window's _NET_ACTIVE_WINDOW property and blocks on the X connection
+    until one occurs, so no polling is involved. When the focused window
+    changes, the specified callback function is invoked with the full path
+    of the executable file of the window's process.
+
+    Parameters:
+    - callback: A Callable accepting a single string argument. This function
+                will be called with the path of the executable file of the
+                active window whenever the focused application changes.
+
+    Returns:
+    - None
+    """
+    global __callback
+    __callback = callback
+    # The event loop never returns, it must not keep the process alive
+    t = Thread(target=__event_loop, daemon=True)
+    t.start()
+
+
+def __exe_path(pid: int) -> Optional[str]:
+    """
+    Resolves the executable of a process through /proc/<pid>/exe, caching
+    the result.
+
+    Parameters:
+    - pid: The process ID.
+
+    Returns:
+    - str or None: The path of the executable, or None if the process no
+                   longer exists or belongs to another user.
+    """
+    try:
+        started = os.stat(f"/proc/{pid}").st_ctime_ns
+    except OSError:
+        return None
+    cached = __exe_cache.get(pid)
+    if cached is not None and cached[0] == started:
+        return cached[1]
+
+    try:
+        path = os.readlink(f"/proc/{pid}/exe")
+    except OSError:
+        return None
+    if len(__exe_cache) >= __exe_cache_size:
+        __exe_cache.clear()
+    __exe_cache[pid] = (started, path)
+    return path
+
+
+def __active_window_pid(display, root, net_active_window, net_wm_pid) -> Optional[int]:
+    """
+    Reads the PID of the process owning the active window.
+
+    Returns:
+    - int or None: The PID, or None if there is no active window or it does
+                   not publish _NET_WM_PID.
+    """
+    from Xlib import X
+    from Xlib.error import XError
+
+    try:
+        active = root.get_full_property(net_active_window, X.AnyPropertyType)
+        if active is None or len(active.value) == 0 or active.value[0] == 0:
+            return None
+        window = display.create_resource_object("window", active.value[0])
+        pid = window.get_full_property(net_wm_pid, X.AnyPropertyType)
+        if pid is None or len(pid.value) == 0:
+            return None
+        return int(pid.value[0])
+    except XError:
+        # The window was destroyed before it could be queried
+        return None
+
+
+def __event_loop():
+    """
+    Internal function that waits for changes of the active window.
+
+    This function connects to the X server, selects PropertyNotify events on
+    the root window and blocks until the window manager updates
+    _NET_ACTIVE_WINDOW. The callback is only invoked when the executable of
+    the active window differs from the previous one.
+
+    If the X server can not be reached, or closes the connection, the error
+    is printed and detection stops, leaving the rules on the application
+    that was focused last.
+
+    Returns:
+    - None
+    """
+    # Xlib is only imported by the detector's thread, the command line only
+    # checks whether detection is supported
+    from Xlib import X
+    from Xlib.display import Display
+    from Xlib.error import ConnectionClosedError, DisplayError
+
+    try:
+        display = Display()
+    except DisplayError as e:
+        print(f"Unable to detect the focused application: {e}")
+        return
+    root = display.screen().root
+    net_active_window = display.intern_atom("_NET_ACTIVE_WINDOW")
+    net_wm_pid = display.intern_atom("_NET_WM_PID")
+    root.change_attributes(event_mask=X.PropertyChangeMask)
+
+    last_path = None
+
+    def update():
+        nonlocal last_path
+        pid = __active_window_pid(display, root, net_active_window, net_wm_pid)
+        if pid is None:
+            return
+        path = __exe_path(pid)
+        if path is not None and path != last_path:
+            last_path = path
+            if __callback is not None:
+                # Keep tracking the focused window if handling a change
+                # fails, like the Windows detector's hook does
+                try:
+                    __callback(path)
+                except Exception as e:
+                    print(f"Error handling focused application change: {e}")
+
+    # make sure we call the callback with the current active window to
+    # initialize the state of the delegate
+    update()
+
+    while True:
+        try:
+            event = display.next_event()
+        except ConnectionClosedError as e:
+            print(f"Stopped detecting the focused application: {e}")
+            return
+        if event.type == X.PropertyNotify and event.atom == net_active_window:
+            update()
@@ -1,9 +1,15 @@
 import os
+import re
 import json
+import sys
+import ntpath
+import fnmatch
+import posixpath
+import threading
 
 from enum import Enum
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from keyboardsounds.root import get_root
 import os
@@ -13,10 +19,157 @@ def get_rules_path():
     return os.path.join(get_root(), "rules.json")
 
 
+# Application paths are compared the way the platform's file system compares
+# them: case-insensitively and with either separator on Windows, exactly
+# elsewhere.
+WIN32 = sys.platform.startswith("win")
+PATH_SEPARATOR = "\\" if WIN32 else "/"
+
+
+def normalize_app_path(app_path: str) -> str:
+    """
+    Normalizes an application path for comparison, so that paths differing
+    only in redundant components, and on Windows in case or separators,
+    match the same rule.
+
+    :param app_path: Path of an application.
+    :return: The normalized path, case-folded on Windows.
+    """
+    if WIN32:
+        return ntpath.normpath(app_path).casefold()
+    return posixpath.normpath(app_path)
+
+
+# Characters that make a rule's app path a glob pattern.
+GLOB_CHARACTERS = "*?["
+
+
+def is_glob_pattern(app_path: str) -> bool:
+    """
+    Checks whether a rule's app path is a glob pattern, such as
+    'C:\\Program Files\\JetBrains\\*\\bin\\*.exe'. Glob patterns are
+    matched against the whole normalized path and '*' also matches path
+    separators.
+
+    :param app_path: App path of a rule.
+    :return: True if the app path contains any of '*', '?' or '['.
+    """
+    return any(c in app_path for c in GLOB_CHARACTERS)
+
+
+def is_prefix_pattern(app_path: str) -> bool:
+    """
+    Checks whether a rule's app path is a directory prefix, such as
+    'C:\\Program Files\\JetBrains\\', matching every application in the
+    directory and its subdirectories.
+
+    :param app_path: App path of a rule.
+    :return: True if the app path ends with a path separator.
+    """
+    separators = ("\\", "/") if WIN32 else ("/",)
+    return not is_glob_pattern(app_path) and app_path.endswith(separators)
+
+
+def _rule_key(app_path: str) -> str:
+    # A directory prefix and an application of the same name are different
+    # rules, the prefix keeps its trailing separator
+    key = normalize_app_path(app_path)
+    if is_prefix_pattern(app_path) and not key.endswith(PATH_SEPARATOR):
+        key += PATH_SEPARATOR
+    return key
+
+
+class _TrieNode:
+    __slots__ = ["children", "prefix_rule", "globs"]
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Rule for the directory this node represents, if any.
+        self.prefix_rule: Optional["Rule"] = None
+        # Glob rules whose literal leading directories end at this node.
+        self.globs: List[Tuple["re.Pattern[str]", "Rule"]] = []
+
+
+class _RuleMatcher:
+    """
+    Finds the rule applying to an application path.
+
+    Exact paths are looked up in a hash table first. Directory prefixes and
+    glob patterns are stored in a trie of normalized path components, glob
+    patterns at the node of their leading directories that contain no
+    wildcards. A lookup walks the path's components once and only tries the
+    glob patterns stored along the way, so its cost depends on the depth of
+    the path rather than on the number of rules.
+
+    When several rules match, the most specific one applies: an exact path,
+    otherwise the pattern anchored at the deepest directory, with glob
+    patterns taking precedence over a directory prefix at the same depth.
+    """
+
+    def __init__(self, rules: List["Rule"]) -> None:
+        self.__exact: Dict[str, Rule] = {}
+        self.__root = _TrieNode()
+        for rule in rules:
+            key = normalize_app_path(rule.app_path)
+            if is_glob_pattern(rule.app_path):
+                components = key.split(PATH_SEPARATOR)
+                depth = 0
+                while depth < len(components) - 1 and not is_glob_pattern(
+                    components[depth]
+                ):
+                    depth += 1
+                node = self.__node(components[:depth])
+                node.globs.append((re.compile(fnmatch.translate(key)), rule))
+            elif is_prefix_pattern(rule.app_path):
+                node = self.__node(key.rstrip(PATH_SEPARATOR).split(PATH_SEPARATOR))
+                if node.prefix_rule is None:
+                    node.prefix_rule = rule
+            else:
+                self.__exact.setdefault(key, rule)
+
+    def __node(self, components: List[str]) -> _TrieNode:
+        node = self.__root
+        for component in components:
+            child = node.children.get(component)
+            if child is None:
+                child = _TrieNode()
+                node.children[component] = child
+            node = child
+        return node
+
+    def match(self, app_path: str) -> Optional["Rule"]:
+        key = normalize_app_path(app_path)
+        rule = self.__exact.get(key)
+        if rule is not None:
+            return rule
+
+        components = key.split(PATH_SEPARATOR)
+        # Directories of the path that have patterns, shallowest first. A
+        # prefix only applies to paths inside its directory.
+        path: List[_TrieNode] = [self.__root]
+        node = self.__root
+        for component in components[:-1]:
+            node = node.children.get(component)
+            if node is None:
+                break
+            path.append(node)
+
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            for pattern, rule in node.globs:
+                if pattern.match(key):
+                    return rule
+            if node.prefix_rule is not None and depth > 0:
+                return node.prefix_rule
+        return None
+
+
 class Action(Enum):
     EXCLUSIVE = "exclusive"
     DISABLE = "disable"
     ENABLE = "enable"
+    # Enables sound effects and switches to the rule's profiles.
+    PROFILE = "profile"
 
 
 class GlobalAction(Enum):
@@ -25,15 +178,41 @@ class GlobalAction(Enum):
 
 
 class Rule:
-    def __init__(self, app_path: str, action: Action) -> None:
+    def __init__(
+        self,
+        app_path: str,
+        action: Action,
+        profile: Optional[str] = None,
+        mouse_profile: Optional[str] = None,
+    ) -> None:
         """
         Initializes a new Rule instance.
 
         :param app_path: Path of the app the rule applies to.
         :param action: Action (from Action enum) for the app.
+        :param profile: Keyboard profile used while the app is focused, only
+                        used by the profile action.
+        :param mouse_profile: Mouse profile used while the app is focused,
+                              only used by the profile action.
         """
         self.app_path = app_path
         self.action = action
+        self.profile = profile
+        self.mouse_profile = mouse_profile
+
+    def to_dict(self) -> dict:
+        """
+        Returns the rule as stored in the rules file.
+
+        :return: The rule's app path and action, along with its profiles if
+                 it has any.
+        """
+        data = {"app_path": self.app_path, "action": self.action.value}
+        if self.profile is not None:
+            data["profile"] = self.profile
+        if self.mouse_profile is not None:
+            data["mouse_profile"] = self.mouse_profile
+        return data
 
 
 class Rules:
@@ -46,7 +225,27 @@ class Rules:
         :param rules: List of Rule instances for specific apps.
         """
         self.global_action = global_action
-        self.rules = rules
+        # Rules keyed by their normalized path, in the order they were added.
+        # When several rules share a path the first one applies.
+        self.__index: Dict[str, Rule] = {}
+        for rule in rules:
+            self.__index.setdefault(_rule_key(rule.app_path), rule)
+        self.__exclusive = self.__find_exclusive_rule()
+        # Compiled when a path is first matched after the rules changed
+        self.__matcher: Optional[_RuleMatcher] = None
+
+    @property
+    def rules(self) -> List[Rule]:
+        """
+        The rules for specific apps, in the order they were added.
+        """
+        return list(self.__index.values())
+
+    def __find_exclusive_rule(self) -> Optional[Rule]:
+        for r in self.__index.values():
+            if r.action == Action.EXCLUSIVE:
+                return r
+        return None
 
     def set_global_action(self, action: GlobalAction) -> None:
         """
@@ -56,27 +255,40 @@ class Rules:
         """
         self.global_action = action
 
-    def set_rule(self, app_path: str, action: Action) -> None:
+    def set_rule(
+        self,
+        app_path: str,
+        action: Action,
+        profile: Optional[str] = None,
+        mouse_profile: Optional[str] = None,
+    ) -> None:
         """
         Sets or updates a rule for a specific application. If the rule exists,
-        its action is updated. If not, a new rule is added.
+        its action and profiles are updated. If not, a new rule is added.
 
         :param app_path: Application path for the rule to be set or updated.
         :param action: Action for the application.
+        :param profile: Keyboard profile for the profile action.
+        :param mouse_profile: Mouse profile for the profile action.
         """
-        # Check if the rule exists
-        existing_rule = None
-        for rule in self.rules:
-            if rule.app_path == app_path:
-                existing_rule = rule
-                break
+        key = _rule_key(app_path)
+        existing_rule = self.__index.get(key)
+        self.__matcher = None
 
         # If the rule exists, update its action
-        if existing_rule:
+        if existing_rule is not None:
             existing_rule.action = action
+            existing_rule.profile = profile
+            existing_rule.mouse_profile = mouse_profile
         else:
             # Otherwise, add a new rule
-            self.rules.append(Rule(app_path, action))
+            self.__index[key] = Rule(app_path, action, profile, mouse_profile)
+
+        if action == Action.EXCLUSIVE:
+            if self.__exclusive is None:
+                self.__exclusive = self.__index[key]
+        elif existing_rule is not None and existing_rule is self.__exclusive:
+            self.__exclusive = self.__find_exclusive_rule()
 
     def remove_rule(self, app_path: str) -> None:
         """
@@ -84,7 +296,10 @@ class Rules:
 
         :param app_path: Application path for the rule to be removed.
         """
-        self.rules = [r for r in self.rules if r.app_path != app_path]
+        rule = self.__index.pop(_rule_key(app_path), None)
+        self.__matcher = None
+        if rule is not None and rule is self.__exclusive:
+            self.__exclusive = self.__find_exclusive_rule()
 
     def has_rule(self, app_path: str) -> bool:
         """
@@ -93,7 +308,30 @@ class Rules:
         :param app_path: Application path to check for a rule.
         :return: True if a rule exists for the application, False otherwise.
         """
-        return any(r.app_path == app_path for r in self.rules)
+        return _rule_key(app_path) in self.__index
+
+    def get_rule(self, app_path: str) -> Optional[Rule]:
+        """
+        Retrieves the rule set for a specific application path or pattern.
+
+        :param app_path: Application path or pattern of the rule.
+        :return: The rule, or None if it does not exist.
+        """
+        return self.__index.get(_rule_key(app_path))
+
+    def match_rule(self, app_path: str) -> Optional[Rule]:
+        """
+        Finds the rule that applies to an application, considering exact
+        paths, directory prefixes and glob patterns. When several rules match,
+        the most specific one applies.
+
+        :param app_path: Path of the application.
+        :return: The rule applying to the application, or None if no rule
+                 matches it.
+        """
+        if self.__matcher is None:
+            self.__matcher = _RuleMatcher(self.rules)
+        return self.__matcher.match(app_path)
 
     def has_exclusive_rule(self) -> bool:
         """
@@ -101,7 +339,24 @@ class Rules:
 
         :return: True if an exclusive rule exists, False otherwise.
         """
-        return any(r.action == Action.EXCLUSIVE for r in self.rules)
+        return self.__exclusive is not None
+
+    def get_rule_profiles(self) -> Tuple[List[str], List[str]]:
+        """
+        Lists the profiles selected by profile rules.
+
+        :return: The names of the keyboard profiles and of the mouse profiles
+                 used by any profile rule.
+        """
+        profiles: Dict[str, None] = {}
+        mouse_profiles: Dict[str, None] = {}
+        for r in self.__index.values():
+            if r.action == Action.PROFILE:
+                if r.profile is not None:
+                    profiles[r.profile] = None
+                if r.mouse_profile is not None:
+                    mouse_profiles[r.mouse_profile] = None
+        return list(profiles), list(mouse_profiles)
 
     def get_exclusive_rule(self) -> Optional[Rule]:
         """
@@ -109,10 +364,7 @@ class Rules:
 
         :return: Rule with an exclusive action.
         """
-        for r in self.rules:
-            if r.action == Action.EXCLUSIVE:
-                return r
-        return None
+        return self.__exclusive
 
     def get_action(self, app_path: str) -> Action:
         """
@@ -121,16 +373,14 @@ class Rules:
         :param app_path: Application path to retrieve the action for.
         :return: Action applicable to the application.
         """
-        if self.global_action == GlobalAction.DISABLE.value:
-            for r in self.rules:
-                if r.app_path == app_path:
-                    if r.action == Action.ENABLE:
-                        return Action.ENABLE
+        rule = self.match_rule(app_path)
+        if self.global_action == GlobalAction.DISABLE:
+            if rule is not None and rule.action in [Action.ENABLE, Action.PROFILE]:
+                return rule.action
             return Action.DISABLE
 
-        for r in self.rules:
-            if r.app_path == app_path:
-                return r.action
+        if rule is not None:
+            return rule.action
         return Action(self.global_action.value)
 
     def save(self) -> None:
@@ -150,10 +400,7 @@ class Rules:
             json.dump(
                 {
                     "global_action": self.global_action.value,
-                    "rules": [
-                        {"app_path": r.app_path, "action": r.action.value}
-                        for r in self.rules
-                    ],
+                    "rules": [r.to_dict() for r in self.rules],
                 },
                 f,
             )
@@ -178,10 +425,49 @@ def get_rules() -> Rules:
         data = json.load(f)
         return Rules(
             global_action=GlobalAction(data["global_action"]),
-            rules=[Rule(r["app_path"], Action(r["action"])) for r in data["rules"]],
+            rules=[
+                Rule(
+                    r["app_path"],
+                    Action(r["action"]),
+                    r.get("profile"),
+                    r.get("mouse_profile"),
+                )
+                for r in data["rules"]
+            ],
         )
 
 
+__cache_lock = threading.Lock()
+__cached_rules: Optional[Rules] = None
+__cached_stat: Optional[Tuple[int, int]] = None
+
+
+def get_cached_rules() -> Rules:
+    """
+    Returns the rules from the database, only reading the file again when its
+    modification time or size changed since it was last read.
+
+    The returned instance is shared between callers and must not be
+    modified, use get_rules() to load a copy that can be changed and saved.
+
+    :raises IOError: If an I/O operation fails.
+    :raises PermissionError: If there are insufficient permissions.
+    """
+    global __cached_rules, __cached_stat
+
+    with __cache_lock:
+        try:
+            stat = os.stat(get_rules_path())
+        except FileNotFoundError:
+            __safe_create_rules()
+            stat = os.stat(get_rules_path())
+        key = (stat.st_mtime_ns, stat.st_size)
+        if __cached_rules is None or key != __cached_stat:
+            __cached_rules = get_rules()
+            __cached_stat = key
+        return __cached_rules
+
+
 def __safe_create_rules() -> None:
     """
     Ensures the rules file exists, creating it with defaults if not.
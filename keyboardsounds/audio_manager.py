@@ -2,7 +2,6 @@ import subprocess
 import wave
 import os
 import io
-import random
 
 from typing import Optional, Any, Dict, List, cast
 
@@ -11,6 +10,40 @@ from pynput.keyboard import Key, KeyCode
 from pynput.mouse import Button
 
 from keyboardsounds.profile import Profile
+from keyboardsounds.profile_validation import SUPPORTED_MOUSE_SCROLL
+from keyboardsounds.compiled_profile import build_key_table
+from keyboardsounds.source_selection import SourceSelector, DEFAULT_SELECTION
+
+
+def to_wav_bytes(input_bytes: bytes) -> bytes:
+    """
+    Decode arbitrary audio bytes to WAV using ffmpeg (in-memory, no temp files).
+    """
+    ffmpeg_path = get_ffmpeg_exe()
+    cmd = [
+        ffmpeg_path,
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-y",
+        "-i",
+        "pipe:0",
+        "-f",
+        "wav",
+        "-ar",
+        "44100",
+        "-ac",
+        "2",
+        "pipe:1",
+    ]
+    proc = subprocess.run(
+        cmd, input=input_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if proc.returncode != 0 or len(proc.stdout) == 0:
+        raise RuntimeError(
+            f"ffmpeg decode failed: {proc.stderr.decode('utf-8', errors='ignore')}"
+        )
+    return proc.stdout
 
 
 class AudioManager:
@@ -27,9 +60,13 @@ class AudioManager:
         """
         self.sounds: Dict[str, Any] = {}
         self.profile = profile
+        self.__key_table: Optional[Dict[str, Any]] = None
+        self.__selectors: Dict[str, SourceSelector] = {}
+        self.__default_selector: Optional[SourceSelector] = None
         self.__one_shot_press_sound: Optional[io.BytesIO] = None
         self.__one_shot_release_sound: Optional[io.BytesIO] = None
         self.__prime_audio_clips()
+        self.__build_selectors()
         self.__enabled = True
 
     def set_profile(self, profile: Profile):
@@ -44,8 +81,10 @@ class AudioManager:
         accordingly.
         """
         self.sounds = {}
+        self.__key_table = None
         self.profile = profile
         self.__prime_audio_clips()
+        self.__build_selectors()
 
     def __prime_audio_clips(self):
         """
@@ -57,9 +96,17 @@ class AudioManager:
         files to audio, extracting specific segments from audio files, and
         organizing them for playback.
 
+        Profiles loaded from a compiled bundle are primed directly from the
+        bundle's decoded clips and precompiled key table.
+
         No parameters or return values as it modifies the internal state of the
         AudioManager instance.
         """
+        if self.profile.compiled is not None:
+            self.sounds = dict(self.profile.compiled.sounds)
+            self.__key_table = self.profile.compiled.key_table
+            return
+
         if self.profile.value("profile.type") == "video-extract":
             ffmpeg_exe = get_ffmpeg_exe()
             video_path = cast(str, self.profile.value("profile.video"))
@@ -125,6 +172,44 @@ class AudioManager:
                     path = self.profile.get_child(src).get_path()
                     self.__extract(source_id, path)
 
+        if self.profile.value("profile.type") != "one-shot":
+            self.__key_table = build_key_table(
+                self.profile.data(), list(self.sounds.keys())
+            )
+
+    def __build_selectors(self):
+        """
+        Precomputes the selector that picks a source for every mapped key or
+        button, and for everything else.
+
+        Names mapped to the same sources with the same strategy share a
+        selector, so for example a shuffle bag covers every key of a mapping
+        rather than each key on its own.
+        """
+        table = self.__key_table
+        if table is None:
+            self.__selectors = {}
+            self.__default_selector = SourceSelector(list(self.sounds.keys()))
+            return
+
+        weights = table.get("weights", {})
+        default_selection = table.get("default_selection", DEFAULT_SELECTION)
+        selection = table.get("selection", {})
+        shared: Dict[Any, SourceSelector] = {}
+
+        def selector(sources: List[str], strategy: str) -> SourceSelector:
+            key = (tuple(sources), strategy)
+            if key not in shared:
+                shared[key] = SourceSelector(sources, strategy, weights)
+            return shared[key]
+
+        self.__default_selector = selector(table["default"], default_selection)
+        self.__selectors = {
+            name: selector(sources, selection.get(name, default_selection))
+            for name, sources in table["map"].items()
+            if len(sources) > 0
+        }
+
     def __extract(self, id, input, start: float = 0.0, end: Optional[float] = None):
         """
         Extracts and prepares an audio clip from the specified input source.
@@ -182,38 +267,63 @@ class AudioManager:
         action, taking into account any custom mappings defined in the profile.
         If no specific sound is mapped for the key, a default or random sound
         might be returned based on the profile configuration.
+
+        A source is picked on every call. To play the press and release clips
+        of the same source, resolve it once with get_source() and look up
+        each clip with get_source_sound().
+        """
+        return self.get_source_sound(self.get_source(key), action)
+
+    def get_source(self, key) -> Optional[str]:
+        """
+        Resolves the source a key or button plays, picking one with the
+        selection strategy of its mapping.
+
+        Parameters:
+        - key: A pynput.keyboard.Key or KeyCode, a character, a
+               pynput.mouse.Button or a scroll wheel input name.
+
+        Returns:
+        - str or None: The ID of the source, or None if the AudioManager is
+                       disabled or nothing is mapped to the key.
         """
         if not self.__enabled:
             return None
+        selector = self.__get_selector(key)
+        return selector.choose() if selector is not None else None
 
-        # Device-aware mapping
-        device = cast(Optional[str], self.profile.value("profile.device")) or "keyboard"
-        if device == "mouse":
-            return self.__get_mouse_sound(key, action)
-
-        # Keyboard behavior (existing)
-        if self.profile.value("keys") is not None:
-            if self.profile.value("keys.other") is not None:
-                sounds = []
-                for mapping in cast(
-                    List[Dict[str, Any]], self.profile.value("keys.other") or []
-                ):
-                    keys_list = cast(List[str], mapping.get("keys", []))
-                    k_val: Optional[str] = None
-                    if isinstance(key, Key):
-                        k_val = key.name
-                    elif isinstance(key, KeyCode) and key.char is not None:
-                        k_val = key.char
-                    else:
-                        k_val = f"{key}"
-                    if k_val is not None and k_val in keys_list:
-                        sounds.append(mapping["sound"])
-                if len(sounds) > 0:
-                    return self.__get_sound(sounds, action)
-            if self.profile.value("keys.default") is not None:
-                default_key = self.profile.value("keys.default")
-                return self.__get_sound(default_key, action)
-        return self.__get_sound(key=None, action=action)
+    def get_source_sound(
+        self, source: Optional[str], action: str = "press"
+    ) -> Optional[io.BytesIO]:
+        """
+        Retrieves a clip of a source resolved with get_source().
+
+        Parameters:
+        - source (str): The ID of the source.
+        - action (str, optional): The type of action, either 'press' or
+                                  'release'. Defaults to 'press'.
+
+        Returns:
+        - (Optional[io.BytesIO]): The clip, or None if the source has no clip
+                                  for the action or the AudioManager is
+                                  disabled.
+        """
+        if source is None or not self.__enabled:
+            return None
+        return self.__parse_sound(self.sounds[source], action)
+
+    def has_scroll_sounds(self) -> bool:
+        """
+        Checks whether the profile maps any sources to the scroll wheel.
+
+        Returns:
+        - bool: True if the profile is a mouse profile with at least one
+                'buttons.other' mapping for 'scroll_up' or 'scroll_down'.
+        """
+        table = self.__key_table
+        if table is None or table["device"] != "mouse":
+            return False
+        return any(name in table["map"] for name in SUPPORTED_MOUSE_SCROLL)
 
     def get_one_shot_sounds(self) -> list[Optional[io.BytesIO]]:
         return [self.__one_shot_press_sound, self.__one_shot_release_sound]
@@ -232,32 +342,34 @@ class AudioManager:
         """
         self.__enabled = enabled
 
-    def __get_sound(self, key=None, action: str = "press") -> Optional[io.BytesIO]:
+    def __get_selector(self, key) -> Optional[SourceSelector]:
+        """
+        Finds the selector of the mapping a key or button belongs to.
         """
-        A private method to retrieve a sound clip based on a key and action.
+        table = self.__key_table
+        if table is None:
+            return self.__default_selector
 
-        Parameters:
-        - key (optional):         The key for which to retrieve the sound. If
-                                  None, a random key's sound will be selected.
-        - action (str, optional): The type of action, either 'press' or
-                                  'release'. Defaults to 'press'.
+        # Device-aware mapping
+        if table["device"] == "mouse":
+            return self.__get_mouse_selector(key)
+
+        k_val: str
+        if isinstance(key, Key):
+            k_val = key.name
+        elif isinstance(key, KeyCode) and key.char is not None:
+            k_val = key.char
+        else:
+            k_val = f"{key}"
+        return self.__selectors.get(k_val) or self.__default_selector
 
-        Returns:
-        - (io.BytesIO): A BytesIO object containing the sound clip.
+    def __get_mouse_selector(self, btn) -> Optional[SourceSelector]:
+        # btn is expected to be pynput.mouse.Button, or one of the scroll
+        # wheel input names ('scroll_up', 'scroll_down')
+        if isinstance(btn, str) and btn in SUPPORTED_MOUSE_SCROLL:
+            # The scroll wheel only plays explicitly mapped sources
+            return self.__selectors.get(btn)
 
-        This method encapsulates the logic for determining the appropriate sound
-        clip based on the key and action, including handling default and random
-        sound selection.
-        """
-        if key is None:
-            key = list(self.sounds.keys())
-        if type(key) is list:
-            return self.__parse_sound(self.sounds[random.choice(key)], action)
-        key_str = cast(str, key)
-        return self.__parse_sound(self.sounds[key_str], action)
-
-    def __get_mouse_sound(self, btn, action: str = "press") -> Optional[io.BytesIO]:
-        # btn is expected to be pynput.mouse.Button
         button_name = None
         if isinstance(btn, Button):
             if btn == Button.left:
@@ -270,17 +382,7 @@ class AudioManager:
         if button_name is None:
             return None
 
-        if self.profile.value("buttons") is not None:
-            if self.profile.value("buttons.other") is not None:
-                for mapping in cast(
-                    List[Dict[str, Any]], self.profile.value("buttons.other") or []
-                ):
-                    if "buttons" in mapping and button_name in mapping["buttons"]:
-                        return self.__get_sound(mapping["sound"], action)
-            if self.profile.value("buttons.default") is not None:
-                default_btn = self.profile.value("buttons.default")
-                return self.__get_sound(default_btn, action)
-        return self.__get_sound(key=None, action=action)
+        return self.__selectors.get(button_name) or self.__default_selector
 
     def __parse_sound(self, sound, action: str = "press") -> Optional[io.BytesIO]:
         """
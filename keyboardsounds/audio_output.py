@@ -0,0 +1,222 @@
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from pygame import mixer
+
+# The audio outputs sounds can be played through.
+BACKENDS = ["pygame", "software", "null", "wav"]
+
+
+class AudioOutput(ABC):
+    """
+    Plays clips with a gain per device.
+
+    Clips are loaded once, cached by the caller and may be played by any
+    number of voices at a time, so an output never changes a loaded clip.
+    Outputs implement load() and play(), everything else is optional.
+    """
+
+    def open(self) -> None:
+        """
+        Opens the output, called before any clip is loaded.
+        """
+        pass
+
+    @abstractmethod
+    def load(self, sound) -> Any:
+        """
+        Loads a clip for playback.
+
+        Parameters:
+        - sound: A file-like object holding the clip.
+
+        Returns:
+        - Any: The clip, in the form play() expects.
+        """
+
+    @abstractmethod
+    def play(self, clip, device: str, gain: float) -> bool:
+        """
+        Starts playing a clip.
+
+        Parameters:
+        - clip: A clip returned by load().
+        - device (str): Either 'keyboard' or 'mouse'.
+        - gain (float): The gain of the voice, between 0.0 and 1.0.
+
+        Returns:
+        - bool: True if the clip is playing, False if it was dropped.
+        """
+
+    def set_gains(self, gains: Dict[str, float]) -> None:
+        """
+        Applies new gains to the voices that are still playing.
+
+        Parameters:
+        - gains (Dict[str, float]): The gain for each device.
+        """
+        pass
+
+    def busy(self) -> bool:
+        """
+        Returns:
+        - bool: True if any clip is still playing.
+        """
+        return False
+
+    def close(self) -> None:
+        """
+        Stops every voice and closes the output.
+        """
+        pass
+
+    def stats(self) -> dict:
+        """
+        Returns:
+        - dict: Statistics collected by the output, if any.
+        """
+        return {}
+
+
+class PygameOutput(AudioOutput):
+    def __init__(self, num_channels: int = 32) -> None:
+        """
+        Plays clips on pygame.mixer's channels with a gain applied per
+        channel.
+
+        Each play picks a free channel and sets that channel's volume, which
+        only affects the voice playing on it. The output remembers which
+        device each channel last played for, so a volume change can be
+        applied to the voices that are still sounding.
+
+        Parameters:
+        - num_channels (int): The number of sounds that can play at once.
+        """
+        self.__num_channels = num_channels
+        self.__lock = threading.Lock()
+        self.__channels: List[mixer.Channel] = []
+        self.__devices: List[Optional[str]] = []
+        self.__next = 0
+
+    def open(self) -> None:
+        mixer.init()
+        mixer.set_num_channels(self.__num_channels)
+        self.__channels = [mixer.Channel(i) for i in range(self.__num_channels)]
+        self.__devices = [None] * self.__num_channels
+
+    def load(self, sound) -> mixer.Sound:
+        return mixer.Sound(sound)
+
+    def play(self, clip, device: str, gain: float) -> bool:
+        with self.__lock:
+            count = len(self.__channels)
+            for offset in range(count):
+                index = (self.__next + offset) % count
+                channel = self.__channels[index]
+                if not channel.get_busy():
+                    self.__next = (index + 1) % count
+                    self.__devices[index] = device
+                    channel.set_volume(gain)
+                    channel.play(clip)
+                    return True
+        return False
+
+    def set_gains(self, gains: Dict[str, float]) -> None:
+        # The change is picked up by the mixer on its next buffer
+        with self.__lock:
+            for channel, device in zip(self.__channels, self.__devices):
+                if device is not None and channel.get_busy():
+                    channel.set_volume(gains[device])
+
+    def busy(self) -> bool:
+        return mixer.get_init() is not None and mixer.get_busy()
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__channels = []
+            self.__devices = []
+        mixer.quit()
+
+
+class NullOutput(AudioOutput):
+    def __init__(self) -> None:
+        """
+        Discards every clip, only counting and timing the plays.
+
+        Used to measure the daemon's throughput on machines without an audio
+        device, the statistics are reported with the daemon's metrics.
+        """
+        self.__lock = threading.Lock()
+        self.__plays: Dict[str, int] = {}
+        self.__load_ms = 0.0
+        self.__first_play: Optional[float] = None
+        self.__last_play: Optional[float] = None
+
+    def load(self, sound) -> bytes:
+        started = time.perf_counter()
+        sound.seek(0)
+        data = sound.read()
+        sound.seek(0)
+        with self.__lock:
+            self.__load_ms += (time.perf_counter() - started) * 1000.0
+        return data
+
+    def play(self, clip, device: str, gain: float) -> bool:
+        now = time.perf_counter()
+        with self.__lock:
+            self.__plays[device] = self.__plays.get(device, 0) + 1
+            if self.__first_play is None:
+                self.__first_play = now
+            self.__last_play = now
+        return True
+
+    def stats(self) -> dict:
+        with self.__lock:
+            plays = dict(self.__plays)
+            total = sum(plays.values())
+            elapsed = 0.0
+            if self.__first_play is not None and self.__last_play is not None:
+                elapsed = self.__last_play - self.__first_play
+            return {
+                "plays": plays,
+                "load_ms": round(self.__load_ms, 3),
+                "plays_per_second": (
+                    round((total - 1) / elapsed, 1) if elapsed > 0 else None
+                ),
+            }
+
+
+def create_output(backend: str, output_path: Optional[str] = None) -> AudioOutput:
+    """
+    Creates the audio output for a backend.
+
+    Parameters:
+    - backend (str): One of 'pygame', 'software', 'null' or 'wav'.
+    - output_path (str): The file the 'wav' backend captures to.
+
+    Returns:
+    - AudioOutput: The output, not opened yet.
+
+    Raises:
+    - ValueError: If the backend is unknown, its dependencies are missing or
+                  the 'wav' backend is missing its output path.
+    """
+    if backend == "pygame":
+        return PygameOutput()
+    if backend == "null":
+        return NullOutput()
+    # The NumPy based outputs are only imported when they are used
+    if backend == "software":
+        from keyboardsounds.software_mixer import SoftwareMixer
+
+        return SoftwareMixer()
+    if backend == "wav":
+        if output_path is None:
+            raise ValueError("The 'wav' backend requires an output file.")
+        from keyboardsounds.software_mixer import WavCapture
+
+        return WavCapture(output_path)
+    raise ValueError(f"Unknown audio backend '{backend}'")
@@ -0,0 +1,363 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+
+from typing import Any, Dict, List, Optional
+
+from keyboardsounds.root import get_root
+from keyboardsounds.source_selection import DEFAULT_SELECTION
+
+COMPILED_PROFILE_FILE = "profile.kbsc"
+FORMAT_MAGIC = b"KBSC"
+FORMAT_VERSION = 3
+
+# magic, format version, reserved, metadata offset, metadata length,
+# blob offset, blob length
+_HEADER = struct.Struct("<4sHHQQQQ")
+
+
+def get_compiled_profile_path(name: str) -> str:
+    """
+    Returns the path of the compiled bundle for the named profile.
+
+    The bundle lives next to the profile's profile.yaml so that it is removed
+    along with the profile. It is never included in exported profiles.
+    """
+    return os.path.join(get_root(), "profiles", name, COMPILED_PROFILE_FILE)
+
+
+def build_key_table(data: dict, source_ids: List[str]) -> dict:
+    """
+    Flattens the key or button mappings of a validated profile into a lookup
+    table.
+
+    Parameters:
+    - data (dict): The validated profile data.
+    - source_ids (List[str]): The IDs of all primed sources, used when the
+                              profile does not define a default.
+
+    Returns:
+    - dict: A table with the profile's 'device', a 'map' of key or button
+            names to lists of source IDs and a 'default' list of source IDs
+            used for anything not present in the map. The 'selection' of each
+            name in the map and the 'default_selection' name the strategy
+            used to pick among the sources, and 'weights' holds the weight of
+            every source that has one.
+
+    Keyboard keys listed in several mappings can play the sources of any of
+    them, each source listed once, picked with the strategy of the first
+    mapping. Mouse buttons use the
+    first mapping they appear in. Scroll wheel inputs are only ever present in
+    the map, never resolved to the default.
+    """
+    device = data["profile"].get("device", "keyboard")
+    section = data.get("buttons" if device == "mouse" else "keys")
+    names_key = "buttons" if device == "mouse" else "keys"
+    selection = data["profile"].get("selection", DEFAULT_SELECTION)
+
+    table: Dict[str, Any] = {
+        "device": device,
+        "map": {},
+        "default": list(source_ids),
+        "selection": {},
+        "default_selection": selection,
+        "weights": {
+            source["id"]: source["weight"]
+            for source in data.get("sources", [])
+            if "weight" in source
+        },
+    }
+    if not isinstance(section, dict):
+        return table
+
+    if section.get("default") is not None:
+        table["default"] = __as_list(section["default"])
+
+    for mapping in section.get("other") or []:
+        sounds = __as_list(mapping["sound"])
+        for name in mapping.get(names_key, []):
+            name = str(name)
+            table["selection"].setdefault(name, mapping.get("selection", selection))
+            if device == "mouse":
+                table["map"].setdefault(name, sounds)
+            else:
+                # A source shared by several mappings is only listed once so
+                # that no-repeat and shuffle never pick it twice in a row
+                merged = table["map"].get(name, []) + sounds
+                table["map"][name] = list(dict.fromkeys(merged))
+    return table
+
+
+def __as_list(value: Any) -> List[str]:
+    return list(value) if isinstance(value, list) else [value]
+
+
+class CompiledProfile:
+    def __init__(self, path: str) -> None:
+        """
+        Loads a compiled profile bundle.
+
+        The bundle is memory mapped while it is read and each clip is copied
+        out of the mapping once, so loading costs a single file open
+        regardless of how many audio files the profile uses. The clips are
+        kept as bytes rather than views of the mapping, playback wraps them
+        in a BytesIO per key press, which shares bytes but would copy a view
+        every time.
+
+        Parameters:
+        - path (str): The path to the bundle.
+
+        Raises:
+        - ValueError: If the bundle is corrupted or was written by an
+                      incompatible version.
+        """
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    magic, version, _, meta_offset, meta_length, blob_offset, _ = (
+                        _HEADER.unpack_from(view, 0)
+                    )
+                    if magic != FORMAT_MAGIC:
+                        raise ValueError(f"'{path}' is not a compiled profile.")
+                    if version != FORMAT_VERSION:
+                        raise ValueError(
+                            f"'{path}' uses unsupported format version {version}."
+                        )
+                    meta = json.loads(view[meta_offset : meta_offset + meta_length])
+
+                    def clip(entry: Optional[List[int]]) -> Optional[bytes]:
+                        if entry is None:
+                            return None
+                        start = blob_offset + entry[0]
+                        return view[start : start + entry[1]]
+
+                    sounds: Dict[str, Any] = {}
+                    for sid, entry in meta["clips"].items():
+                        if isinstance(entry, dict):
+                            sounds[sid] = {
+                                "press": clip(entry["press"]),
+                                "release": clip(entry.get("release")),
+                            }
+                        else:
+                            sounds[sid] = clip(entry)
+        except (OSError, KeyError, TypeError, struct.error, json.JSONDecodeError) as e:
+            raise ValueError(f"Compiled profile '{path}' is corrupted: {e}")
+
+        self.data: dict = meta["profile"]
+        self.key_table: dict = meta["key_table"]
+        self.manifest: List[dict] = meta["manifest"]
+        self.sounds: Dict[str, Any] = sounds
+
+    def is_stale(self) -> bool:
+        """
+        Checks whether any file the bundle was compiled from has changed.
+
+        Only the modification time and size of each file are compared, so the
+        check never opens a source file.
+
+        Returns:
+        - bool: True if the bundle needs to be rebuilt.
+        """
+        root = os.path.dirname(self.path)
+        for entry in self.manifest:
+            try:
+                stat = os.stat(os.path.join(root, entry["path"]))
+            except OSError:
+                return True
+            if stat.st_mtime_ns != entry["mtime_ns"] or stat.st_size != entry["size"]:
+                return True
+        return False
+
+
+def load_compiled_profile(name: str) -> Optional[CompiledProfile]:
+    """
+    Loads the compiled bundle of a profile, rebuilding it first if any of its
+    source files changed since it was compiled or it was written by another
+    version of the format.
+
+    Profiles are only loaded from a bundle once one has been created with
+    `kbs compile-profile`.
+
+    Parameters:
+    - name (str): The name of the profile.
+
+    Returns:
+    - Optional[CompiledProfile]: The compiled profile, or None if the profile
+                                 has not been compiled or the bundle could not
+                                 be used.
+    """
+    path = get_compiled_profile_path(name)
+    if not os.path.isfile(path):
+        return None
+    try:
+        compiled = CompiledProfile(path)
+        if not compiled.is_stale():
+            return compiled
+        print(f"Compiled profile '{name}' is out of date, rebuilding...")
+    except ValueError as e:
+        print(f"{e} Rebuilding...")
+    try:
+        compile_profile(name)
+        return CompiledProfile(path)
+    except Exception as e:
+        print(f"Unable to use compiled profile '{name}': {e}")
+        return None
+
+
+def compile_profile(name: str) -> bool:
+    """
+    Compiles a profile into a single binary bundle containing its validated
+    metadata, a precompiled key table and every clip decoded to PCM WAV.
+
+    An existing bundle is kept if the size and SHA-256 hash of every source
+    file still match the ones it was compiled from. Files whose content is
+    unchanged but whose modification time changed, e.g. after a checkout or
+    copy, only have their new modification times written to the bundle's
+    manifest.
+
+    Parameters:
+    - name (str): The name of the profile.
+
+    Returns:
+    - bool: True if the bundle was written, False if it was already up to
+            date.
+
+    Raises:
+    - ValueError: If the profile does not exist or is invalid.
+    """
+    from keyboardsounds.profile import Profile
+    from keyboardsounds.audio_manager import AudioManager, to_wav_bytes
+
+    profile = Profile(name)
+    path = get_compiled_profile_path(name)
+    manifest = __build_manifest(profile.root, profile.data())
+
+    if os.path.isfile(path):
+        try:
+            existing = CompiledProfile(path).manifest
+        except ValueError:
+            existing = None
+        if existing is not None and __content_of(existing) == __content_of(manifest):
+            if existing != manifest:
+                # Only the modification times changed, record them so that
+                # is_stale() stops reporting the bundle
+                __update_manifest(path, manifest)
+            return False
+
+    audio_manager = AudioManager(profile)
+    blob = bytearray()
+
+    def add_clip(data: Optional[bytes]) -> Optional[List[int]]:
+        if data is None:
+            return None
+        if not (data[0:4] == b"RIFF" and data[8:12] == b"WAVE"):
+            data = to_wav_bytes(data)
+        offset = len(blob)
+        blob.extend(data)
+        return [offset, len(data)]
+
+    clips: Dict[str, Any] = {}
+    for sid, sound in audio_manager.sounds.items():
+        if isinstance(sound, dict):
+            clips[sid] = {
+                "press": add_clip(sound.get("press")),
+                "release": add_clip(sound.get("release")),
+            }
+        else:
+            clips[sid] = add_clip(sound)
+
+    meta = {
+        "profile": profile.data(),
+        "key_table": build_key_table(profile.data(), list(audio_manager.sounds.keys())),
+        "manifest": manifest,
+        "clips": clips,
+    }
+    __write_bundle(path, meta, blob)
+    return True
+
+
+def __write_bundle(path: str, meta: dict, blob) -> None:
+    """
+    Writes a bundle from its metadata and the blob holding its clips.
+    """
+    encoded = json.dumps(meta).encode("utf-8")
+    meta_offset = _HEADER.size
+    blob_offset = meta_offset + len(encoded)
+    header = _HEADER.pack(
+        FORMAT_MAGIC,
+        FORMAT_VERSION,
+        0,
+        meta_offset,
+        len(encoded),
+        blob_offset,
+        len(blob),
+    )
+
+    # Write atomically so a running daemon never maps a partial bundle
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(encoded)
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def __update_manifest(path: str, manifest: List[dict]) -> None:
+    """
+    Replaces the manifest of a bundle, copying its clips over as they are.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    _, _, _, meta_offset, meta_length, blob_offset, blob_length = _HEADER.unpack_from(
+        data, 0
+    )
+    meta = json.loads(data[meta_offset : meta_offset + meta_length])
+    meta["manifest"] = manifest
+    __write_bundle(
+        path, meta, memoryview(data)[blob_offset : blob_offset + blob_length]
+    )
+
+
+def __content_of(manifest: List[dict]) -> List[tuple]:
+    """
+    Returns the parts of a manifest that describe the content of its files,
+    leaving out their modification times.
+    """
+    return [(entry["path"], entry["size"], entry["sha256"]) for entry in manifest]
+
+
+def __build_manifest(root: str, data: dict) -> List[dict]:
+    """
+    Lists profile.yaml and every file referenced by the profile along with
+    its modification time, size and SHA-256 hash.
+    """
+    files = ["profile.yaml"]
+    if data["profile"].get("type") == "video-extract":
+        files.append(data["profile"]["video"])
+    for source in data.get("sources", []):
+        src = source.get("source")
+        if isinstance(src, dict):
+            files.extend(v for k, v in src.items() if k in ("press", "release"))
+        elif isinstance(src, str):
+            files.append(src)
+
+    manifest = []
+    for file in dict.fromkeys(files):
+        full_path = os.path.join(root, file)
+        stat = os.stat(full_path)
+        digest = hashlib.sha256()
+        with open(full_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        manifest.append(
+            {
+                "path": file,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest.hexdigest(),
+            }
+        )
+    return manifest
@@ -1,9 +1,10 @@
 import os
 import io
-import subprocess
+import signal
 from sys import platform
+import heapq
 import threading
-from queue import Queue
+from queue import Empty, Queue
 
 import json
 import base64
@@ -30,38 +31,138 @@ from pygame import mixer
 from pynput.mouse import Button
 
 from keyboardsounds.listener import KeyboardListener, MouseListener
+from keyboardsounds.listener import MOUSE_CLICK, MOUSE_SCROLL
 
 from keyboardsounds.profile import Profile, OneShotProfile
-from keyboardsounds.audio_manager import AudioManager
-from typing import Optional, Any
+from keyboardsounds.audio_manager import AudioManager, to_wav_bytes
+from keyboardsounds.metrics import Metrics
+from keyboardsounds.audio_output import AudioOutput, create_output
+from keyboardsounds import app_rules
+from keyboardsounds.app_rules import Action
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Optional, Any, Tuple
 
 WIN32 = platform.lower().startswith("win")
+LINUX = platform.lower().startswith("linux")
 
 if WIN32:
     from keyboardsounds import app_detector
-    from keyboardsounds import app_rules
-    from keyboardsounds.app_rules import Action
+elif LINUX:
+    from keyboardsounds import app_detector_linux as app_detector
 
-__am: Optional[AudioManager] = None  # keyboard audio manager
-__mam: Optional[AudioManager] = None  # mouse audio manager
+
+@dataclass(frozen=True)
+class DaemonState:
+    """
+    An immutable snapshot of the daemon's runtime configuration.
+
+    The current snapshot is only ever replaced as a whole, so an event
+    handler that reads it once sees a consistent configuration for the whole
+    event, however the configuration changes meanwhile.
+    """
+
+    # Audio managers of the configured keyboard and mouse profiles
+    am: Optional[AudioManager] = None
+    mam: Optional[AudioManager] = None
+    # Audio managers of the profiles selected by a profile rule for the
+    # focused application, used instead of am and mam while set
+    rule_am: Optional[AudioManager] = None
+    rule_mam: Optional[AudioManager] = None
+    # Whether the app rules allow sounds for the focused application
+    enabled: bool = True
+    volume: int = 100
+    # Master volumes of keyboard and mouse sounds, applied on top of volume
+    keyboard_volume: int = 100
+    mouse_volume: int = 100
+    pitch_shift: bool = False
+    pitch_shift_lower: int = -2
+    pitch_shift_upper: int = 2
+    pitch_shift_profile: str = "both"
+    # Events that are older than this many seconds by the time they reach the
+    # daemon are dropped instead of played late. None disables dropping.
+    max_event_age: Optional[float] = 0.25
+    # When enabled, a burst of events delivered late (e.g. after a stall) is
+    # played back with its original relative timing instead of all at once.
+    # Late events are then replayed rather than dropped, max_event_age only
+    # limits how long a scheduled sound may wait for a playback worker.
+    smooth_jitter: bool = False
+    # The audio managers sounds are played from, derived from the fields
+    # above
+    keyboard: Optional[AudioManager] = field(init=False, repr=False)
+    mouse: Optional[AudioManager] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self, "keyboard", self.rule_am if self.rule_am is not None else self.am
+        )
+        object.__setattr__(
+            self, "mouse", self.rule_mam if self.rule_mam is not None else self.mam
+        )
+
+    def gain(self, device: str) -> float:
+        """
+        Returns the gain sounds of a device are played with.
+
+        Parameters:
+        - device (str): Either 'keyboard' or 'mouse'.
+        """
+        device_volume = (
+            self.keyboard_volume if device == "keyboard" else self.mouse_volume
+        )
+        return (self.volume / 100.0) * (device_volume / 100.0)
+
+    def semitones(self) -> Optional[str]:
+        """
+        Returns the pitch shift range in the 'lower,upper' format used on the
+        command line, or None if pitch shifting is disabled.
+        """
+        if not self.pitch_shift:
+            return None
+        return f"{self.pitch_shift_lower},{self.pitch_shift_upper}"
+
+
+__state = DaemonState()
+# Serializes changes to the state, never held while reading it
+__state_lock = threading.Lock()
+
+# Primed audio managers for every profile named by a profile rule, keyed by
+# device and profile name, and the rules they were primed for
+__primed: Dict[Tuple[str, str], AudioManager] = {}
+__primed_rules: Optional[Any] = None
+# The rules most recently handed to the background primer, and a lock that
+# lets only one of them be primed at a time
+__priming_rules: Optional[Any] = None
+__priming_lock = threading.Lock()
+# The path of the focused application, and a lock that serializes applying
+# the rules to it
+__focused_app: Optional[str] = None
+__focus_lock = threading.Lock()
 __dm: Optional[Any] = None
-__volume = 100
-__pitch_shift = False
-__pitch_shift_lower = -2
-__pitch_shift_upper = 2
-__pitch_shift_profile = "both"
-__down = []
+# Held keys and mouse buttons, mapped to the audio manager and source that
+# played their press so that the release plays the clip of the same source
+__down: Dict[Any, Tuple[Optional[AudioManager], Optional[str]]] = {}
 __debug = False
-__sound_cache: dict[int, mixer.Sound] = {}  # Cache mixer.Sound objects by bytes id
+__sound_cache: dict[int, Any] = {}  # Cache loaded clips by bytes id
 __cache_lock = threading.Lock()  # Lock for sound cache access
-__down_lock = threading.Lock()  # Lock for __down list access
+__down_lock = threading.Lock()  # Lock for __down access
 __sound_queue: Optional[Queue] = None  # Queue for sound playback tasks
 __sound_workers: list[threading.Thread] = []  # Worker threads for sound playback
 __num_sound_workers = 8
+__metrics = Metrics()  # Event latency and playback counters
+
+# Minimum number of seconds between two scroll wheel sounds. Notches scrolled
+# faster than this are coalesced by the mouse listener.
+__scroll_interval = 0.03
 
 # Keep references to listeners so they can be started/stopped dynamically
 __kb_listener: Optional[KeyboardListener] = None
 __mouse_listener: Optional[MouseListener] = None
+
+# Set to shut the daemon down, see request_shutdown()
+__shutdown_event = threading.Event()
+# Number of seconds queued and playing sounds are given to finish when the
+# daemon shuts down before they are cut off.
+SHUTDOWN_TIMEOUT = 1.0
 try:
     # Ensure pydub knows where ffmpeg is, even if not on PATH
     AudioSegment.converter = get_ffmpeg_exe()
@@ -73,69 +174,223 @@ except Exception:
     pass
 
 
-def _to_wav_bytes(input_bytes: bytes) -> bytes:
-    """
-    Decode arbitrary audio bytes to WAV using ffmpeg (in-memory, no temp files).
-    """
-    ffmpeg_path = get_ffmpeg_exe()
-    cmd = [
-        ffmpeg_path,
-        "-hide_banner",
-        "-loglevel",
-        "error",
-        "-y",
-        "-i",
-        "pipe:0",
-        "-f",
-        "wav",
-        "-ar",
-        "44100",
-        "-ac",
-        "2",
-        "pipe:1",
-    ]
-    proc = subprocess.run(
-        cmd, input=input_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    if proc.returncode != 0 or len(proc.stdout) == 0:
-        raise RuntimeError(
-            f"ffmpeg decode failed: {proc.stderr.decode('utf-8', errors='ignore')}"
-        )
-    return proc.stdout
+class _JitterSmoother:
+    """
+    Maps event timestamps onto playback times so that bursts of buffered
+    events keep their original spacing.
+
+    The smoother tracks the delivery delay of the first event in a burst and
+    schedules every following event at the same delay, relative to its own
+    timestamp. Once events arrive fresh again the delay collapses back to
+    zero.
+    """
+
+    # Events delivered within this many seconds are considered fresh.
+    FRESH_THRESHOLD = 0.010
+    # Upper bound on how far into the future a sound may be scheduled.
+    MAX_DELAY = 1.0
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__offset: Optional[float] = None
+
+    def schedule(self, timestamp: float, now: float) -> float:
+        """
+        Returns the wall clock time at which the event should be played.
+
+        Parameters:
+        - timestamp (float): The time at which the input event occurred.
+        - now (float): The time at which the event reached the daemon.
+        """
+        latency = max(0.0, now - timestamp)
+        with self.__lock:
+            if (
+                self.__offset is None
+                or latency > self.__offset
+                or latency <= self.FRESH_THRESHOLD
+            ):
+                self.__offset = latency
+            delay = min(self.__offset - latency, self.MAX_DELAY)
+        return now + delay
+
+    def reset(self) -> None:
+        with self.__lock:
+            self.__offset = None
+
+
+class _DelayedPlays:
+    """
+    Holds sounds scheduled for a later time and hands them to the playback
+    queue when they are due, so that no playback worker sleeps on them.
+
+    Pending sounds are kept in a heap ordered by their playback time and
+    released by a single daemon thread that is started on first use.
+    """
+
+    def __init__(self, submit: Callable[[Any], None]) -> None:
+        """
+        Parameters:
+        - submit (Callable): Called with each task once it is due.
+        """
+        self.__submit = submit
+        self.__cond = threading.Condition()
+        self.__heap: list[Tuple[float, int, Any]] = []
+        self.__counter = 0
+        self.__thread: Optional[threading.Thread] = None
+        self.__stopped = False
+
+    def __len__(self) -> int:
+        with self.__cond:
+            return len(self.__heap)
+
+    def schedule(self, play_at: float, task: Any) -> None:
+        """
+        Submits the task once the wall clock reaches play_at.
+
+        Parameters:
+        - play_at (float): The time at which the task is due.
+        - task: The task handed to the submit callback.
+        """
+        with self.__cond:
+            self.__stopped = False
+            # The counter keeps tasks due at the same time in order and
+            # avoids comparing the tasks themselves
+            heapq.heappush(self.__heap, (play_at, self.__counter, task))
+            self.__counter += 1
+            if self.__thread is None or not self.__thread.is_alive():
+                self.__thread = threading.Thread(
+                    target=self.__run, name="sound_scheduler", daemon=True
+                )
+                self.__thread.start()
+            self.__cond.notify()
+
+    def stop(self) -> int:
+        """
+        Stops the scheduler thread and discards the pending tasks.
+
+        Returns:
+        - int: The number of tasks that were discarded.
+        """
+        with self.__cond:
+            self.__stopped = True
+            dropped = len(self.__heap)
+            self.__heap = []
+            thread = self.__thread
+            self.__thread = None
+            self.__cond.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        return dropped
+
+    def __run(self) -> None:
+        while True:
+            with self.__cond:
+                while not self.__stopped:
+                    if not self.__heap:
+                        self.__cond.wait()
+                        continue
+                    wait = self.__heap[0][0] - time.time()
+                    if wait <= 0:
+                        break
+                    self.__cond.wait(wait)
+                if self.__stopped:
+                    return
+                _, _, task = heapq.heappop(self.__heap)
+            try:
+                self.__submit(task)
+            except Exception as e:
+                print(f"Error scheduling delayed sound: {e}")
+
+
+__jitter = _JitterSmoother()
+
+
+# Plays the clips, one of the outputs from keyboardsounds.audio_output
+__output: Optional[AudioOutput] = None
+
+
+def __update_state(**changes) -> DaemonState:
+    """
+    Replaces the daemon's state with a copy that has the specified fields
+    changed, and persists it if any of the fields reported in the lock file
+    changed.
+
+    Parameters:
+    - changes: The fields of DaemonState to change.
+
+    Returns:
+    - DaemonState: The new state.
+    """
+    global __state
+    with __state_lock:
+        state = replace(__state, **changes)
+        __state = state
+        if __dm is not None:
+            # Unchanged state is not written again
+            __dm.update_lock_file(
+                state.volume,
+                state.semitones(),
+                state.pitch_shift_profile,
+                state.am.profile.name if state.am is not None else None,
+                state.mam.profile.name if state.mam is not None else None,
+            )
+    return state
+
 
+def on_command(command: dict) -> Optional[Any]:
+    """
+    Handles a command received through the external API.
+
+    Commands that change the daemon's configuration return None, as does
+    'shutdown', which only requests the shutdown and returns before the
+    daemon has stopped. The read actions ('get_status', 'get_profiles',
+    'get_rules' and 'get_metrics') and 'subscribe' return a JSON serializable
+    result that is sent back to the client.
+
+    Parameters:
+    - command (dict): The decoded command.
 
-def on_command(command: dict) -> None:
-    global __volume
-    global __am, __mam
+    Returns:
+    - Optional[Any]: The result of the command, if it has one.
+
+    Raises:
+    - ValueError: If the command is unknown or could not be applied.
+    """
     global __kb_listener, __mouse_listener
-    global __pitch_shift, __pitch_shift_lower, __pitch_shift_upper, __pitch_shift_profile
-    global __sound_cache
-    global __cache_lock
 
     if "action" in command:
         action = command["action"]
         if action == "set_volume":
             if "volume" in command:
-                __volume = command["volume"]
-                if __dm is not None:
-                    __dm.update_lock_file(
-                        __volume,
-                        (
-                            f"{__pitch_shift_lower}:{__pitch_shift_upper}"
-                            if __pitch_shift
-                            else None
-                        ),
-                        __pitch_shift_profile,
-                        __am.profile.name if __am is not None else None,
-                        __mam.profile.name if __mam is not None else None,
+                # Without a device the overall volume is set, otherwise the
+                # master volume of keyboard or mouse sounds
+                device = command.get("device")
+                if device is None:
+                    state = __update_state(volume=command["volume"])
+                elif device == "keyboard":
+                    state = __update_state(keyboard_volume=command["volume"])
+                elif device == "mouse":
+                    state = __update_state(mouse_volume=command["volume"])
+                else:
+                    raise ValueError(f"Unknown device '{device}'")
+                # Sounds that are still playing follow the new volume
+                if __output is not None:
+                    __output.set_gains(
+                        {
+                            "keyboard": state.gain("keyboard"),
+                            "mouse": state.gain("mouse"),
+                        }
                     )
-                print(f"Volume set to {__volume}%")
+                print(
+                    f"Volume set to {state.volume}% "
+                    f"(keyboard {state.keyboard_volume}%, mouse {state.mouse_volume}%)"
+                )
         elif action == "set_profile":
             if "profile" in command:
                 profile = command["profile"]
                 try:
                     if profile is None or profile == "":
-                        __am = None
+                        __update_state(am=None)
                         # Stop keyboard listener if running
                         if __kb_listener is not None:
                             try:
@@ -146,54 +401,32 @@ def on_command(command: dict) -> None:
                         # Clear sound cache when profile changes
                         with __cache_lock:
                             __sound_cache.clear()
-                        if __dm is not None:
-                            __dm.update_lock_file(
-                                __volume,
-                                (
-                                    f"{__pitch_shift_lower}:{__pitch_shift_upper}"
-                                    if __pitch_shift
-                                    else None
-                                ),
-                                __pitch_shift_profile,
-                                None,
-                                __mam.profile.name if __mam is not None else None,
-                            )
                         print("Keyboard profile disabled")
                     else:
-                        if __am is not None:
-                            __am.set_profile(Profile(profile))
-                        else:
-                            __am = AudioManager(Profile(profile))
-                            # Start keyboard listener if not running
-                            if __kb_listener is None:
-                                __kb_listener = KeyboardListener(
-                                    on_press=__on_press, on_release=__on_release
-                                )
-                                __kb_listener.start()
+                        # The previous audio manager is replaced rather than
+                        # changed, events that already read it finish with it
+                        __update_state(am=AudioManager(Profile.load(profile)))
+                        # Start keyboard listener if not running
+                        if __kb_listener is None:
+                            __kb_listener = KeyboardListener(
+                                on_press=__on_press,
+                                on_release=__on_release,
+                                timestamps=True,
+                            )
+                            __kb_listener.start()
                         # Clear sound cache when profile changes
                         with __cache_lock:
                             __sound_cache.clear()
-                        if __dm is not None:
-                            __dm.update_lock_file(
-                                __volume,
-                                (
-                                    f"{__pitch_shift_lower}:{__pitch_shift_upper}"
-                                    if __pitch_shift
-                                    else None
-                                ),
-                                __pitch_shift_profile,
-                                profile,
-                                __mam.profile.name if __mam is not None else None,
-                            )
                         print(f"Profile set to {profile}")
                 except ValueError as err:
                     print(f"Error: {err}")
+                    raise
         elif action == "set_mouse_profile":
             if "profile" in command:
                 profile = command["profile"]
                 try:
                     if profile is None or profile == "":
-                        __mam = None
+                        __update_state(mam=None)
                         # Stop mouse listener if running
                         if __mouse_listener is not None:
                             try:
@@ -204,48 +437,25 @@ def on_command(command: dict) -> None:
                         # Clear sound cache when profile changes
                         with __cache_lock:
                             __sound_cache.clear()
-                        if __dm is not None:
-                            __dm.update_lock_file(
-                                __volume,
-                                (
-                                    f"{__pitch_shift_lower}:{__pitch_shift_upper}"
-                                    if __pitch_shift
-                                    else None
-                                ),
-                                __pitch_shift_profile,
-                                __am.profile.name if __am is not None else None,
-                                None,
-                            )
                         print("Mouse profile disabled")
                     else:
-                        if __mam is not None:
-                            __mam.set_profile(Profile(profile))
+                        state = __update_state(mam=AudioManager(Profile.load(profile)))
+                        # Start mouse listener if not running, otherwise only
+                        # subscribe to the events the new profile plays sounds for
+                        if __mouse_listener is None:
+                            __mouse_listener = __new_mouse_listener(state.mouse)
+                            __mouse_listener.start()
                         else:
-                            __mam = AudioManager(Profile(profile))
-                            # Start mouse listener if not running
-                            if __mouse_listener is None:
-                                __mouse_listener = MouseListener(
-                                    on_click=__on_mouse_click
-                                )
-                                __mouse_listener.start()
+                            __mouse_listener.set_subscriptions(
+                                __mouse_subscriptions(state.mouse)
+                            )
                         # Clear sound cache when profile changes
                         with __cache_lock:
                             __sound_cache.clear()
-                        if __dm is not None:
-                            __dm.update_lock_file(
-                                __volume,
-                                (
-                                    f"{__pitch_shift_lower}:{__pitch_shift_upper}"
-                                    if __pitch_shift
-                                    else None
-                                ),
-                                __pitch_shift_profile,
-                                __am.profile.name if __am is not None else None,
-                                profile,
-                            )
                         print(f"Mouse profile set to {profile}")
                 except ValueError as err:
                     print(f"Error: {err}")
+                    raise
         elif action == "show_daemon_window":
             try:
                 if __dm is not None:
@@ -253,46 +463,79 @@ def on_command(command: dict) -> None:
             except Exception as e:
                 print(f"Error: {e}")
         elif action == "set_pitch_shift":
-            if "semitones" in command:
-                semitones = command["semitones"]
+            semitones = command.get("semitones")
 
             if semitones is not None and semitones != "":
-                __pitch_shift = True
-                __pitch_shift_lower, __pitch_shift_upper = map(
-                    int, semitones.split(",")
+                lower, upper = map(int, semitones.split(","))
+                pitch_shift_profile = command.get("profile", "both")
+                if pitch_shift_profile not in ["both", "keyboard", "mouse"]:
+                    pitch_shift_profile = "both"
+                state = __update_state(
+                    pitch_shift=True,
+                    pitch_shift_lower=lower,
+                    pitch_shift_upper=upper,
+                    pitch_shift_profile=pitch_shift_profile,
                 )
-                if "profile" in command:
-                    if (
-                        command["profile"] != "both"
-                        and command["profile"] != "keyboard"
-                        and command["profile"] != "mouse"
-                    ):
-                        __pitch_shift_profile = "both"
-                    else:
-                        __pitch_shift_profile = command["profile"]
-                else:
-                    __pitch_shift_profile = "both"
                 print(
-                    f"Pitch shift set to {__pitch_shift_lower},{__pitch_shift_upper} for {__pitch_shift_profile}"
+                    f"Pitch shift set to {state.pitch_shift_lower},{state.pitch_shift_upper} for {state.pitch_shift_profile}"
                 )
             else:
-                __pitch_shift = False
-                __pitch_shift_lower = -2
-                __pitch_shift_upper = 2
-                __pitch_shift_profile = "both"
+                __update_state(
+                    pitch_shift=False,
+                    pitch_shift_lower=-2,
+                    pitch_shift_upper=2,
+                    pitch_shift_profile="both",
+                )
                 print(f"Pitch shift set to off")
-            if __dm is not None:
-                __dm.update_lock_file(
-                    __volume,
-                    semitones,
-                    __pitch_shift_profile,
-                    __am.profile.name if __am is not None else None,
-                    __mam.profile.name if __mam is not None else None,
+        elif action == "set_event_timing":
+            changes: Dict[str, Any] = {}
+            if "max_event_age" in command:
+                max_event_age = command["max_event_age"]
+                changes["max_event_age"] = (
+                    float(max_event_age) / 1000.0 if max_event_age is not None else None
                 )
-            print(f"Pitch shift set to {semitones}")
+            if "smooth_jitter" in command:
+                changes["smooth_jitter"] = bool(command["smooth_jitter"])
+                __jitter.reset()
+            state = __update_state(**changes)
+            print(
+                f"Event timing set to max age {state.max_event_age}s, "
+                f"jitter smoothing {'on' if state.smooth_jitter else 'off'}"
+            )
+        elif action == "get_status" or action == "subscribe":
+            # Subscribing replies with the current state, later changes are
+            # pushed to the connection as 'state' events
+            return __dm.get_state() if __dm is not None else None
+        elif action == "get_profiles":
+            profiles = Profile.list_metadata()
+            if command.get("device") is not None:
+                profiles = [p for p in profiles if p["device"] == command["device"]]
+            return profiles
+        elif action == "get_rules":
+            rules = app_rules.get_cached_rules()
+            return {
+                "global_action": rules.global_action.value,
+                "rules": [rule.to_dict() for rule in rules.rules],
+            }
+        elif action == "get_metrics":
+            return get_metrics()
+        elif action == "unsubscribe":
+            pass
+        elif action == "shutdown":
+            print("Shutdown requested through the external API")
+            request_shutdown()
+        else:
+            raise ValueError(f"Unknown action '{action}'")
+    else:
+        raise ValueError("Command is missing an 'action'")
+    return None
 
 
 def pitch_shift_from_bytes(buffer, semitones: float) -> mixer.Sound:
+    return mixer.Sound(file=pitch_shift_wav(buffer, semitones))
+
+
+def pitch_shift_wav(buffer, semitones: float) -> io.BytesIO:
     # Ensure buffer is at start
     try:
         buffer.seek(0)
@@ -314,7 +557,7 @@ def pitch_shift_from_bytes(buffer, semitones: float) -> mixer.Sound:
                 buffer.seek(0)
             except Exception:
                 pass
-            decoded_wav = _to_wav_bytes(buffer.read())
+            decoded_wav = to_wav_bytes(buffer.read())
             buffer = io.BytesIO(decoded_wav)
             try:
                 buffer.seek(0)
@@ -340,15 +583,15 @@ def pitch_shift_from_bytes(buffer, semitones: float) -> mixer.Sound:
     # Resample back to standard playback rate
     pitched = pitched.set_frame_rate(44100)
 
-    # Export into BytesIO for pygame
+    # Export into BytesIO for playback
     buf = io.BytesIO()
     pitched.export(buf, format="wav")
     buf.seek(0)
 
-    return mixer.Sound(file=buf)
+    return buf
 
 
-def __on_press(key):
+def __on_press(key, timestamp: Optional[float] = None):
     """
     Callback function for key press events.
 
@@ -358,22 +601,12 @@ def __on_press(key):
 
     Parameters:
     - key: The key that was pressed.
+    - timestamp: The time at which the key was pressed, if known.
     """
-    global __am
-    global __volume
-    global __down
-    global __down_lock
-
-    with __down_lock:
-        if key in __down:
-            return
-        __down.append(key)
+    __play_press(__state, key, "keyboard", timestamp)
 
-    sound = __am.get_sound(key, action="press")
-    __play_sound(sound, "keyboard")
 
-
-def __on_release(key):
+def __on_release(key, timestamp: Optional[float] = None):
     """
     Callback function for key release events.
 
@@ -382,16 +615,70 @@ def __on_release(key):
 
     Parameters:
     - key: The key that was released.
+    - timestamp: The time at which the key was released, if known.
     """
-    global __down
-    global __am
-    global __down_lock
+    __play_release(__state, key, "keyboard", timestamp)
+
 
-    sound = __am.get_sound(key, action="release")
-    __play_sound(sound, "keyboard")
+def __play_press(
+    state: DaemonState, key, profile_type: str, timestamp: Optional[float] = None
+):
+    """
+    Plays the press sound of a key or mouse button, unless it is already held
+    down, and remembers the source it was resolved to until it is released.
+
+    Parameters:
+    - state (DaemonState): The daemon's state when the event occurred.
+    - key: The key or mouse button that was pressed.
+    - profile_type (str): Either 'keyboard' or 'mouse'.
+    - timestamp (float, optional): The time at which the event occurred.
+    """
+    manager = state.keyboard if profile_type == "keyboard" else state.mouse
+    if not state.enabled:
+        manager = None
 
     with __down_lock:
-        __down = [k for k in __down if k != key]
+        if key in __down:
+            return
+        source = manager.get_source(key) if manager is not None else None
+        __down[key] = (manager, source)
+
+    if manager is not None and source is not None:
+        sound = manager.get_source_sound(source, action="press")
+        __play_sound(state, sound, profile_type, timestamp)
+
+
+def __play_release(
+    state: DaemonState, key, profile_type: str, timestamp: Optional[float] = None
+):
+    """
+    Plays the release sound of a key or mouse button from the same source as
+    its press.
+
+    Parameters:
+    - state (DaemonState): The daemon's state when the event occurred.
+    - key: The key or mouse button that was released.
+    - profile_type (str): Either 'keyboard' or 'mouse'.
+    - timestamp (float, optional): The time at which the event occurred.
+    """
+    with __down_lock:
+        held = __down.pop(key, None)
+    if not state.enabled:
+        return
+
+    if held is not None:
+        manager, source = held
+        if manager is None or source is None:
+            return
+        sound = manager.get_source_sound(source, action="release")
+    else:
+        # The press was never seen, e.g. the key was already held down when
+        # the daemon started
+        manager = state.keyboard if profile_type == "keyboard" else state.mouse
+        if manager is None:
+            return
+        sound = manager.get_sound(key, action="release")
+    __play_sound(state, sound, profile_type, timestamp)
 
 
 def __sound_worker():
@@ -402,8 +689,8 @@ def __sound_worker():
             task = __sound_queue.get()
             if task is None:  # Sentinel value to stop the worker
                 break
-            sound, profile_type = task
-            __play_sound_thread(sound, profile_type)
+            state, sound, profile_type, timestamp, play_at = task
+            __play_sound_thread(state, sound, profile_type, timestamp, play_at)
         except Exception as e:
             print(f"Error in sound playback worker: {e}")
             import traceback
@@ -428,37 +715,94 @@ def __init_sound_workers():
             __sound_workers.append(worker)
 
 
-def __play_sound(sound, profile_type: str):
-    """Queue a sound for playback."""
+def __play_sound(
+    state: DaemonState, sound, profile_type: str, timestamp: Optional[float] = None
+):
+    """
+    Queue a sound for playback.
+
+    Parameters:
+    - state (DaemonState): The state read by the event that triggered the
+                           sound, it is played with this state's settings.
+    - sound: The sound clip to play.
+    - profile_type (str): Either 'keyboard' or 'mouse'.
+    - timestamp (float, optional): The time at which the input event that
+                                   triggered the sound occurred. Used to drop
+                                   stale events, record latency and schedule
+                                   jitter-smoothed playback.
+    """
+    global __sound_queue
+    if sound is None:
+        return
+
+    now = time.time()
+    play_at = now
+    if timestamp is not None:
+        latency = now - timestamp
+        __metrics.observe("input_latency_ms", latency * 1000.0)
+        if state.smooth_jitter:
+            # The smoother exists to replay late bursts, so they are not
+            # dropped as stale here
+            play_at = __jitter.schedule(timestamp, now)
+        else:
+            max_event_age = state.max_event_age
+            if max_event_age is not None and latency > max_event_age:
+                __metrics.increment("events_dropped_stale")
+                return
+
+    task = (state, sound, profile_type, timestamp, play_at)
+    if play_at > now:
+        __delayed.schedule(play_at, task)
+    else:
+        __enqueue_sound(task)
+
+
+def __enqueue_sound(task) -> None:
+    """
+    Hands a sound playback task to the worker threads, starting them if
+    needed.
+
+    Parameters:
+    - task (tuple): The state, sound, profile type, timestamp and playback
+                    time of the sound.
+    """
     global __sound_queue
     if __sound_queue is None:
         __init_sound_workers()
-    __sound_queue.put((sound, profile_type))
+    __sound_queue.put(task)
 
 
-def __play_sound_thread(sound, profile_type: str):
-    global __pitch_shift, __pitch_shift_lower, __pitch_shift_upper, __pitch_shift_profile
+# Sounds scheduled by the jitter smoother for a later time
+__delayed = _DelayedPlays(__enqueue_sound)
+
+
+def __play_sound_thread(
+    state: DaemonState,
+    sound,
+    profile_type: str,
+    timestamp: Optional[float] = None,
+    play_at: Optional[float] = None,
+):
     global __sound_cache
     global __cache_lock
-    global __volume
 
     if sound is None:
         return
 
-    # Snapshot globals to avoid race conditions when they change mid-execution
-    pitch_shift = __pitch_shift
-    pitch_shift_lower = __pitch_shift_lower
-    pitch_shift_upper = __pitch_shift_upper
-    pitch_shift_profile = __pitch_shift_profile
-    volume = __volume
+    if play_at is not None:
+        # Drop sounds that sat in the playback queue for too long
+        max_event_age = state.max_event_age
+        if max_event_age is not None and time.time() - play_at > max_event_age:
+            __metrics.increment("events_dropped_queued")
+            return
 
-    if pitch_shift and (
-        pitch_shift_profile == "both" or profile_type == pitch_shift_profile
+    if state.pitch_shift and (
+        state.pitch_shift_profile == "both" or profile_type == state.pitch_shift_profile
     ):
-        semitones = random.randint(pitch_shift_lower, pitch_shift_upper)
-        clip = pitch_shift_from_bytes(sound, semitones)
+        semitones = random.randint(state.pitch_shift_lower, state.pitch_shift_upper)
+        clip = __output.load(pitch_shift_wav(sound, semitones))
     else:
-        # Cache mixer.Sound objects to avoid recreating them on every keypress
+        # Cache loaded clips to avoid decoding them on every keypress
         sound.seek(0)
         sound_bytes = sound.read()
         sound.seek(0)
@@ -468,74 +812,205 @@ def __play_sound_thread(sound, profile_type: str):
             if cache_key in __sound_cache:
                 clip = __sound_cache[cache_key]
             else:
-                clip = mixer.Sound(sound)
+                clip = __output.load(sound)
                 __sound_cache[cache_key] = clip
 
-    clip.set_volume(float(volume) / float(100))
-    clip.play()
+    # The volume is applied to the channel, the clip may be shared with
+    # other voices
+    if not __output.play(clip, profile_type, state.gain(profile_type)):
+        __metrics.increment("sounds_dropped_no_channel")
+        return
 
+    __metrics.increment(f"sounds_played_{profile_type}")
+    if timestamp is not None:
+        __metrics.observe("playback_latency_ms", (time.time() - timestamp) * 1000.0)
 
-def __on_mouse_click(x, y, button: Button, pressed: bool):
-    """
-    Callback for mouse click events. Plays sounds for mouse profiles.
+
+def __on_mouse_scroll(x, y, dx, dy, timestamp: Optional[float] = None):
     """
-    global __mam
-    global __volume
+    Callback for mouse scroll events. Plays the 'scroll_up' or 'scroll_down'
+    sound of the mouse profile, if mapped.
 
-    action = "press" if pressed else "release"
-    if __mam is None:
+    Scroll events are rate limited and coalesced by the mouse listener, so at
+    most one sound is played per callback regardless of how many notches were
+    scrolled.
+    """
+    state = __state
+    if state.mouse is None or not state.enabled or dy == 0:
         return
-    sound = __mam.get_sound(button, action=action)
+    sound = state.mouse.get_sound("scroll_up" if dy > 0 else "scroll_down")
     if sound is not None:
-        __play_sound(sound, "mouse")
+        __play_sound(state, sound, "mouse", timestamp)
 
 
-if WIN32:
+def __mouse_subscriptions(mam: AudioManager) -> int:
+    """
+    Returns the mouse events that the daemon needs to listen for with the
+    given mouse audio manager.
+    """
+    return MOUSE_CLICK | (MOUSE_SCROLL if mam.has_scroll_sounds() else 0)
+
+
+def __new_mouse_listener(mam: AudioManager) -> MouseListener:
+    """
+    Creates a mouse listener subscribed to the events used by the given mouse
+    audio manager.
+    """
+    return MouseListener(
+        on_click=__on_mouse_click,
+        on_scroll=__on_mouse_scroll,
+        timestamps=True,
+        subscriptions=__mouse_subscriptions(mam),
+        scroll_interval=__scroll_interval,
+    )
+
+
+def __on_mouse_click(
+    x, y, button: Button, pressed: bool, timestamp: Optional[float] = None
+):
+    """
+    Callback for mouse click events. Plays sounds for mouse profiles.
+    """
+    if pressed:
+        __play_press(__state, button, "mouse", timestamp)
+    else:
+        __play_release(__state, button, "mouse", timestamp)
+
+
+if WIN32 or LINUX:
 
     def __on_focused_application_changed(app_path: str):
         """
-        Callback function for detecting focused application changes on Windows.
+        Callback function for detecting focused application changes on Windows
+        and in Linux X11 sessions.
 
         It adjusts the AudioManager's state based on the foreground application
-        by consulting the app rules.
+        by consulting the app rules, and switches to the profiles selected by
+        a profile rule. Those profiles are primed ahead of time, so switching
+        only swaps a reference. When the rules changed, their profiles are
+        primed in the background and the base profiles are used until they
+        are ready.
 
         Parameters:
         - app_path: The file path of the application that has just gained focus.
         """
-        global __debug
+        global __debug, __focused_app
         if __debug:
             print(f"focused application changed: {app_path}")
 
-        rules = app_rules.get_rules()
-
-        global __am, __mam
-        if __am is None and __mam is None:
+        __focused_app = app_path
+        if __state.am is None and __state.mam is None:
             return
-        if rules is not None and rules.has_exclusive_rule():
-            exclusive = rules.get_exclusive_rule()
-            if exclusive is not None and app_path == exclusive.app_path:
-                if __am is not None:
-                    __am.set_enabled(True)
-                if __mam is not None:
-                    __mam.set_enabled(True)
+        __apply_focused_application()
+
+    def __apply_focused_application() -> None:
+        """
+        Applies the app rules to the focused application, using the profiles
+        primed so far.
+        """
+        with __focus_lock:
+            app_path = __focused_app
+            if app_path is None:
+                return
+
+            # Only re-reads the rules file when it changed
+            rules = app_rules.get_cached_rules()
+            if rules is not __primed_rules:
+                __prime_rule_profiles_in_background(rules)
+
+            started = time.perf_counter()
+            rule_am = None
+            rule_mam = None
+            if rules.has_exclusive_rule():
+                exclusive = rules.get_exclusive_rule()
+                enabled = rules.match_rule(app_path) is exclusive
             else:
-                if __am is not None:
-                    __am.set_enabled(False)
-                if __mam is not None:
-                    __mam.set_enabled(False)
+                action = rules.get_action(app_path)
+                enabled = action != Action.DISABLE
+                if action == Action.PROFILE:
+                    rule = rules.match_rule(app_path)
+                    if rule is not None and rule.profile is not None:
+                        rule_am = __primed.get(("keyboard", rule.profile))
+                    if rule is not None and rule.mouse_profile is not None:
+                        rule_mam = __primed.get(("mouse", rule.mouse_profile))
+
+            previous = __state
+            state = __update_state(enabled=enabled, rule_am=rule_am, rule_mam=rule_mam)
+        if state.keyboard is previous.keyboard and state.mouse is previous.mouse:
+            return
+        if state.mouse is not previous.mouse and state.mouse is not None:
+            if __mouse_listener is not None:
+                __mouse_listener.set_subscriptions(__mouse_subscriptions(state.mouse))
+
+        __metrics.increment("profile_swaps")
+        __metrics.observe("profile_swap_ms", (time.perf_counter() - started) * 1000.0)
+        if __debug:
+            print(
+                f"using profiles {state.keyboard.profile.name if state.keyboard else None} "
+                f"and {state.mouse.profile.name if state.mouse else None}"
+            )
+
+    def __prime_rule_profiles(rules: app_rules.Rules) -> None:
+        """
+        Primes an audio manager for every profile selected by a profile rule,
+        so that focus changes never have to load or decode a profile. Only
+        runs when the rules changed since they were last primed. Managers of
+        profiles that are still in use are kept.
+
+        Parameters:
+        - rules: The current app rules.
+        """
+        global __primed, __primed_rules
+        if rules is __primed_rules:
             return
 
-        action = rules.get_action(app_path) if rules is not None else None
-        if action == Action.DISABLE:
-            if __am is not None:
-                __am.set_enabled(False)
-            if __mam is not None:
-                __mam.set_enabled(False)
-        elif action in [Action.ENABLE, Action.EXCLUSIVE]:
-            if __am is not None:
-                __am.set_enabled(True)
-            if __mam is not None:
-                __mam.set_enabled(True)
+        profiles, mouse_profiles = rules.get_rule_profiles()
+        wanted = [("keyboard", name) for name in profiles]
+        wanted += [("mouse", name) for name in mouse_profiles]
+
+        primed: Dict[Tuple[str, str], AudioManager] = {}
+        for device, name in wanted:
+            if (device, name) in __primed:
+                primed[(device, name)] = __primed[(device, name)]
+                continue
+            try:
+                profile = Profile.load(name)
+                profile_device = profile.value("profile.device") or "keyboard"
+                if profile_device != device:
+                    raise ValueError(
+                        f"'{name}' is a '{profile_device}' profile, not a '{device}' profile"
+                    )
+                primed[(device, name)] = AudioManager(profile)
+                __metrics.increment("rule_profiles_primed")
+            except Exception as e:
+                print(f"Error: unable to prime profile '{name}' for app rules: {e}")
+
+        __primed = primed
+        __primed_rules = rules
+
+    def __prime_rule_profiles_in_background(rules: app_rules.Rules) -> None:
+        """
+        Primes the profiles of the rules on a separate thread, so that loading
+        them never holds up the focus callback, then applies the rules to the
+        focused application again. Rules replaced before their turn to be
+        primed are skipped.
+
+        Parameters:
+        - rules: The current app rules.
+        """
+        global __priming_rules
+        if rules is __priming_rules:
+            return
+        __priming_rules = rules
+
+        def prime() -> None:
+            with __priming_lock:
+                if rules is not __priming_rules:
+                    return
+                __prime_rule_profiles(rules)
+            __apply_focused_application()
+
+        threading.Thread(target=prime, name="rule_profile_primer", daemon=True).start()
 
 
 def run(
@@ -546,6 +1021,9 @@ def run(
     pitch_shift_profile: Optional[str],
     debug: bool,
     mouse_profile: Optional[str] = None,
+    on_ready: Optional[Callable[[], None]] = None,
+    backend: str = "pygame",
+    output_path: Optional[str] = None,
 ):
     """
     Initializes and runs the keyboard sound application.
@@ -557,98 +1035,208 @@ def run(
     Parameters:
     - volume: The volume level for the sound playback.
     - profile: The sound profile to use for the AudioManager.
+    - on_ready: Called once the profiles are primed, the mixer is open and
+                the listeners have started.
+    - backend: The audio output, one of audio_output.BACKENDS.
+    - output_path: The file the 'wav' backend captures to.
     """
-    global __am, __mam
-    global __volume
+    global __state
     global __dm
     global __debug
     global __kb_listener, __mouse_listener
-    global __pitch_shift, __pitch_shift_lower, __pitch_shift_upper, __pitch_shift_profile
+    global __output
 
     __debug = debug
 
-    __volume = volume
-    __am = AudioManager(Profile(profile)) if profile is not None else None
-    if mouse_profile is not None:
-        __mam = AudioManager(Profile(mouse_profile))
-    else:
-        __mam = None
-    __dm = dm
-
+    state = DaemonState(
+        am=AudioManager(Profile.load(profile)) if profile is not None else None,
+        mam=(
+            AudioManager(Profile.load(mouse_profile))
+            if mouse_profile is not None
+            else None
+        ),
+        volume=volume,
+    )
     if semitones is not None:
-        __pitch_shift = True
-        __pitch_shift_lower, __pitch_shift_upper = map(int, semitones.split(","))
-        if pitch_shift_profile is not None:
-            __pitch_shift_profile = pitch_shift_profile
-        else:
-            __pitch_shift_profile = "both"
-    else:
-        __pitch_shift = False
-        __pitch_shift_lower = -2
-        __pitch_shift_upper = 2
-        __pitch_shift_profile = "both"
+        lower, upper = map(int, semitones.split(","))
+        state = replace(
+            state,
+            pitch_shift=True,
+            pitch_shift_lower=lower,
+            pitch_shift_upper=upper,
+            pitch_shift_profile=(
+                pitch_shift_profile if pitch_shift_profile is not None else "both"
+            ),
+        )
+    __state = state
+    __dm = dm
 
-    if WIN32:
+    if WIN32 or (LINUX and app_detector.is_supported()):
+        # Prime the profiles used by profile rules before the first focus
+        # change, which is reported as soon as the detector starts
+        __prime_rule_profiles(app_rules.get_cached_rules())
         app_detector.start_listening(__on_focused_application_changed)
 
-    mixer.init()
-    mixer.set_num_channels(32)
+    output = create_output(backend, output_path)
+    output.open()
+    __output = output
     __kb_listener = (
-        KeyboardListener(on_press=__on_press, on_release=__on_release)
-        if __am is not None
+        KeyboardListener(on_press=__on_press, on_release=__on_release, timestamps=True)
+        if state.am is not None
         else None
     )
     __mouse_listener = (
-        MouseListener(on_click=__on_mouse_click) if __mam is not None else None
+        __new_mouse_listener(state.mam) if state.mam is not None else None
     )
     if __kb_listener is not None:
         __kb_listener.start()
     if __mouse_listener is not None:
         __mouse_listener.start()
+
+    # Profiles are primed, the mixer is open and the listeners are running
+    if on_ready is not None:
+        on_ready()
+
+    # Signals can only be handled on the main thread
+    if threading.current_thread() is threading.main_thread():
+        for name in ["SIGTERM", "SIGINT", "SIGBREAK"]:
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), __on_shutdown_signal)
+
     if __debug:
 
-        def stdin_loop(listener):
+        def stdin_loop():
             print("Run 'quit' to terminate the debug process")
-            while (listener is not None) and listener.running:  # type: ignore[attr-defined]
-                cmd = input("")
+            while not __shutdown_event.is_set():
+                try:
+                    cmd = input("")
+                except EOFError:
+                    return
                 if cmd == "quit":
-                    os._exit(0)
+                    request_shutdown()
 
-        stdin_loop(__kb_listener or __mouse_listener)
+        threading.Thread(target=stdin_loop, name="debug_stdin", daemon=True).start()
+
+    if WIN32:
+        # Wait with a timeout so that signals are still handled on Windows
+        while not __shutdown_event.wait(0.5):
+            pass
     else:
-        if __kb_listener is not None:
-            __kb_listener.join()
-        if __mouse_listener is not None:
-            __mouse_listener.join()
+        # Signals interrupt the wait elsewhere, the main thread wakes up as
+        # soon as a shutdown is requested
+        __shutdown_event.wait()
+    __shutdown()
 
 
-def one_shot(volume: int, press_sound: str, release_sound: str | None):
-    global __am
+def request_shutdown() -> None:
+    """
+    Requests an orderly shutdown of the daemon. Safe to call from any thread,
+    the shutdown itself runs on the thread that called run().
+    """
+    __shutdown_event.set()
 
-    __am = AudioManager(
-        OneShotProfile(press_sound=press_sound, release_sound=release_sound)
-    )
 
-    sounds = __am.get_one_shot_sounds()
+def __on_shutdown_signal(signum, frame):
+    request_shutdown()
 
-    clips = []
 
-    mixer.init()
+def __shutdown(timeout: float = SHUTDOWN_TIMEOUT):
+    """
+    Shuts the daemon down: stops the listeners so that no new sounds are
+    queued, gives queued and playing sounds until the timeout to finish,
+    stops the playback workers, closes the mixer and finally releases the
+    daemon's lock file, status segment and external API.
 
-    waitlen = 0
-    for sound in sounds:
-        if sound is not None:
-            clip = mixer.Sound(sound)
-            clip.set_volume(float(volume) / float(100))
-            clips.append(clip)
-            waitlen += clip.get_length()
+    Parameters:
+    - timeout (float): The number of seconds sounds are given to finish
+                       before they are cut off.
+    """
+    global __kb_listener, __mouse_listener
+    global __sound_queue, __sound_workers
+    global __output
 
-    for clip in clips:
-        clip.set_volume(float(volume) / float(100))
-        clip.play()
-        time.sleep(0.15)
+    started = time.perf_counter()
+    deadline = time.monotonic() + timeout
 
-    time.sleep(waitlen)
+    for listener in [__kb_listener, __mouse_listener]:
+        if listener is not None:
+            try:
+                listener.stop()
+            except Exception:
+                pass
+    __kb_listener = None
+    __mouse_listener = None
+
+    # Let scheduled sounds become due, then drop whatever is left once the
+    # time is up
+    while len(__delayed) > 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    dropped = __delayed.stop()
+
+    queue = __sound_queue
+    if queue is not None:
+        # Drain the queue, then drop whatever is left once the time is up
+        while queue.unfinished_tasks > 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        while True:
+            try:
+                queue.get_nowait()
+            except Empty:
+                break
+            queue.task_done()
+            dropped += 1
+
+        for _ in __sound_workers:
+            queue.put(None)
+        for worker in __sound_workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        __sound_workers = []
+        __sound_queue = None
+    if dropped > 0:
+        __metrics.increment("events_dropped_shutdown", dropped)
+
+    if __output is not None:
+        while __output.busy() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        __output.close()
+        __output = None
+    with __cache_lock:
+        __sound_cache.clear()
+
+    if __dm is not None:
+        __dm.shutdown()
+
+    elapsed = (time.perf_counter() - started) * 1000.0
+    __metrics.observe("shutdown_ms", elapsed)
+    print(f"Daemon shut down in {elapsed:.1f}ms")
+
+
+def one_shot(
+    volume: int,
+    press_sound: str,
+    release_sound: str | None,
+    backend: str = "pygame",
+    output_path: Optional[str] = None,
+):
+    am = AudioManager(
+        OneShotProfile(press_sound=press_sound, release_sound=release_sound)
+    )
+
+    sounds = am.get_one_shot_sounds()
+
+    output = create_output(backend, output_path)
+    output.open()
+    try:
+        clips = [output.load(sound) for sound in sounds if sound is not None]
+
+        for clip in clips:
+            output.play(clip, "keyboard", float(volume) / float(100))
+            time.sleep(0.15)
+
+        while output.busy():
+            time.sleep(0.01)
+    finally:
+        output.close()
 
 
 def get_audio_manager() -> AudioManager:
@@ -662,5 +1250,24 @@ def get_audio_manager() -> AudioManager:
     Returns:
     - AudioManager: The AudioManager instance.
     """
-    global __am
-    return __am  # type: ignore[return-value]
+    return __state.am  # type: ignore[return-value]
+
+
+def get_metrics() -> dict:
+    """
+    Retrieves a summary of the daemon's event and playback metrics.
+
+    Returns:
+    - dict: Counters for played and dropped sounds, along with input latency
+            (event timestamp to daemon) and playback latency (event timestamp
+            to playback start) timings in milliseconds. Outputs that collect
+            statistics, such as the null sink, add them under 'output'.
+    """
+    global __metrics
+    snapshot = __metrics.snapshot()
+    # Outputs such as the null sink report their own statistics
+    if __output is not None:
+        stats = __output.stats()
+        if len(stats) > 0:
+            snapshot["output"] = stats
+    return snapshot
@@ -1,14 +1,15 @@
 import os
 import sys
+import argparse
 import psutil
 import subprocess
 import time
 import json
 import socket
 import threading
-import tkinter as tk
 import atexit
-from typing import Optional
+import select
+from typing import Callable, Optional
 
 try:
     import msvcrt  # type: ignore
@@ -23,9 +24,126 @@ except Exception:
 # if sys.platform != 'win32':
 #     import signal
 
-import keyboardsounds.daemon as daemon
 from keyboardsounds.profile import Profile
-from keyboardsounds.external_api import ExternalAPI
+from keyboardsounds.external_api import ExternalAPI, ExternalAPIClient
+from keyboardsounds.external_api import bind_unix_socket
+from keyboardsounds.status_segment import StatusSegmentWriter
+from keyboardsounds.status_segment import StatusSegmentReader, pid_alive
+
+API_SOCKET_FILE = "kbs.sock"
+
+# Seconds to wait for a newly started daemon to report that it is ready.
+READY_TIMEOUT = 30.0
+# Number of seconds a daemon is given to shut down before it is killed.
+STOP_TIMEOUT = 5.0
+# Seconds to wait for a running daemon to apply new settings. Loading or
+# compiling a large profile can take far longer than a regular request.
+RECONFIGURE_TIMEOUT = 300.0
+
+# The audio and input stacks (keyboardsounds.daemon) and tkinter are only
+# imported by the methods that run inside of the daemon process, keeping
+# short lived CLI invocations such as `kbs status` fast.
+
+
+class _LockFileWriter:
+    """
+    Persists the daemon's state to the lock file from a background thread.
+
+    Updates made within `delay` seconds of each other are coalesced into a
+    single write, and the file is only written when its content changed, so
+    a burst of changes (e.g. dragging a volume slider) costs a single atomic
+    write and never blocks the caller.
+    """
+
+    def __init__(self, path: str, delay: float = 0.05) -> None:
+        self.__path = path
+        self.__delay = delay
+        self.__condition = threading.Condition()
+        # Serializes writes to the file, held while writing but never while
+        # waiting for updates
+        self.__io_lock = threading.Lock()
+        self.__pending: Optional[dict] = None
+        self.__written: Optional[dict] = None
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def write(self, data: dict, immediate: bool = False) -> None:
+        """
+        Schedules the lock file to be written with the specified data.
+
+        Parameters:
+        - data (dict): The state to write.
+        - immediate (bool): Write the file before returning instead of in the
+                            background, used for the initial state so that
+                            other processes can find the daemon right away.
+        """
+        with self.__condition:
+            if self.__closed:
+                return
+            self.__pending = data
+            self.__condition.notify()
+        if immediate:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes any pending state before returning.
+        """
+        with self.__io_lock:
+            with self.__condition:
+                data = self.__pending
+                self.__pending = None
+            self.__write(data)
+
+    def close(self) -> None:
+        """
+        Stops the writer, discarding any pending state. Used before the lock
+        file is removed so that it is not written again afterwards.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__pending = None
+            self.__condition.notify()
+        # Wait for a write that is already in progress
+        with self.__io_lock:
+            pass
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while self.__pending is None and not self.__closed:
+                    self.__condition.wait()
+                if self.__closed:
+                    return
+            # Give further updates a moment to arrive, only the latest state
+            # is written
+            time.sleep(self.__delay)
+            self.flush()
+
+    def __write(self, data: Optional[dict]) -> None:
+        if self.__closed or data is None or data == self.__written:
+            return
+
+        # Write atomically to avoid partial reads
+        tmp_path = f"{self.__path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.replace(tmp_path, self.__path)
+            except Exception:
+                # Fallback if replace not available
+                try:
+                    os.unlink(self.__path)
+                except Exception:
+                    pass
+                os.rename(tmp_path, self.__path)
+            self.__written = data
+        except OSError as e:
+            print(f"Error: unable to write lock-file: {e}")
 
 
 class DaemonManager:
@@ -44,8 +162,17 @@ class DaemonManager:
         self.__proc_info = None
         self.__lock_exists = False
         self.__is_daemon_process = False
-        self.__proc = None
+        self.__alive = False
         self.__api = None
+        self.__state: Optional[dict] = None
+        # The audio output the daemon plays through, and the file the 'wav'
+        # backend captures to
+        self.__backend = "pygame"
+        self.__output_path: Optional[str] = None
+        self.__lock_writer: Optional[_LockFileWriter] = None
+        self.__status_segment: Optional[StatusSegmentWriter] = None
+        # Set once the daemon has shut down, state is no longer persisted
+        self.__shut_down = False
         self.__one_shot = one_shot
         self.__thread = None
         self.__daemon_window_visible = False
@@ -54,6 +181,14 @@ class DaemonManager:
             f"{lock_file}.pid" if lock_file is not None else None
         )
         self.__proc_lock_handle = None
+        self.__status_file: Optional[str] = (
+            f"{lock_file}.status" if lock_file is not None else None
+        )
+        self.__status_reader: Optional[StatusSegmentReader] = (
+            StatusSegmentReader(self.__status_file)
+            if self.__status_file is not None
+            else None
+        )
         if not self.__one_shot:
             self.__load_status()
 
@@ -62,10 +197,13 @@ class DaemonManager:
             return
 
         """
-        Loads the daemon's current status from the lock file, if it exists, and
-        updates internal state accordingly. This includes checking if the lock
-        file exists, reading process information, and determining if the current
-        process is the daemon process.
+        Loads the daemon's current status, if it exists, and updates internal
+        state accordingly. This includes checking if the lock file exists,
+        reading process information, and determining if the current process is
+        the daemon process.
+
+        Process information is read from the daemon's memory mapped status
+        segment when it is available, falling back to the lock file.
 
         Parameters:
         - None
@@ -73,25 +211,22 @@ class DaemonManager:
         Returns:
         - None
         """
-        if os.path.isfile(self.__lock_file):
-            self.__lock_exists = True
-            try:
-                with open(self.__lock_file, "r") as f:
-                    self.__proc_info = json.load(f)
-            except ValueError:
-                self.__proc_info = None
-                pass
-        else:
-            self.__proc_info = None
-
-        if self.__proc_info:
-            try:
-                self.__proc = psutil.Process(self.__proc_info["pid"])
-            except psutil.NoSuchProcess:
-                self.__proc = None
-                pass
-        else:
-            self.__proc = None
+        self.__lock_exists = os.path.isfile(self.__lock_file)
+        self.__proc_info = None
+        self.__alive = False
+        if self.__lock_exists:
+            snapshot = self.__status_reader.read()
+            if snapshot is not None:
+                self.__proc_info = snapshot
+                self.__alive = snapshot["running"] and pid_alive(snapshot["pid"])
+            else:
+                try:
+                    with open(self.__lock_file, "r") as f:
+                        self.__proc_info = json.load(f)
+                except (OSError, ValueError):
+                    self.__proc_info = None
+                if self.__proc_info:
+                    self.__alive = pid_alive(self.__proc_info["pid"])
 
         # Current process is the daemon if our PID matches the lock file PID
         try:
@@ -102,11 +237,26 @@ class DaemonManager:
         except Exception:
             self.__is_daemon_process = False
 
+    def __current_status(self) -> str:
+        # If lock exists and process with PID is alive -> running; else stale
+        if self.__lock_exists:
+            return "running" if self.__alive else "stale"
+        return "free"
+
+    def __running_value(self, key: str):
+        # Values are only reported while the daemon is running
+        if self.__current_status() == "running" and self.__proc_info is not None:
+            return self.__proc_info.get(key)
+        return None
+
     def status(self, full=False, short=False) -> str:
         """
         Returns the current status of the daemon process. Can provide a simple
         status or a full status with additional details.
 
+        The status is read once, so every detail reported comes from the same
+        snapshot of the daemon's state.
+
         Parameters:
         - full (bool): If True, returns a detailed status string including
                        volume, PID, and profile. If False, returns a simple
@@ -118,14 +268,18 @@ class DaemonManager:
                'free'. If 'full' or 'short' is True, returns a detailed status
                 string or JSON string, respectively.
         """
+        self.__load_status()
+        daemon_status = self.__current_status()
+        volume = self.__running_value("volume")
+        semitones = self.__running_value("semitones")
+        pitch_shift_profile = self.__running_value("pitch_shift_profile")
+        pid = self.__running_value("pid")
+        prof_kb = self.__running_value("profile")
+        prof_mouse = self.__running_value("mouse_profile")
+
         if full:
-            volume = self.get_volume()
-            semitones = self.get_semitones()
-            pitch_shift_profile = self.get_pitch_shift_profile()
             volume_status = f", Volume: {volume}%" if volume is not None else ""
-            pid = self.get_pid()
             pid_status = f", PID: {pid}" if pid is not None else ""
-            daemon_status = self.status()
             kb_status = ""
             mouse_status = ""
 
@@ -136,8 +290,6 @@ class DaemonManager:
             )
 
             if daemon_status == "running":
-                prof_kb = self.get_profile()
-                prof_mouse = self.get_mouse_profile()
                 kb_status = (
                     f", Keyboard Profile: {prof_kb}" if prof_kb is not None else ""
                 )
@@ -149,14 +301,7 @@ class DaemonManager:
             status = f"{status_text}{volume_status}{semitones_status}{pid_status}{kb_status}{mouse_status}"
             return f"Status: {status}"
         elif short:
-            volume = self.get_volume()
-            semitones = self.get_semitones()
-            pitch_shift_profile = self.get_pitch_shift_profile()
-            pid = self.get_pid()
-            prof_kb = self.get_profile()
-            prof_mouse = self.get_mouse_profile()
-            daemon_status = self.status()
-            api_port = self.get_api_port()
+            api_port = self.__running_value("api_port")
 
             user_status = None
             if daemon_status == "running":
@@ -171,36 +316,20 @@ class DaemonManager:
                 "semitones": semitones,
                 "pitch_shift_profile": pitch_shift_profile,
                 "pid": pid,
-                "api_port": api_port,
+                "api_port": int(api_port) if api_port is not None else None,
+                "api_socket": self.__running_value("api_socket"),
                 "lock": {
                     "active": self.__lock_exists,
                     "file": os.path.abspath(self.__lock_file),
                 },
+                "profile": prof_kb,
+                "mouse_profile": prof_mouse,
+                "backend": self.__running_value("backend"),
+                "output": self.__running_value("output"),
             }
-            # Include profiles conditionally; only expose 'profile' (keyboard) and 'mouse_profile'
-            if daemon_status == "running":
-                status.update(
-                    {
-                        "profile": prof_kb,
-                        "mouse_profile": prof_mouse,
-                    }
-                )
-            else:
-                status.update(
-                    {
-                        "profile": prof_kb,
-                        "mouse_profile": prof_mouse,
-                    }
-                )
             return json.dumps(status)
         else:
-            self.__load_status()
-            if self.__lock_exists:
-                # If lock exists and process with PID is alive -> running; else stale
-                if self.__proc is not None and self.__proc.is_running():
-                    return "running"
-                return "stale"
-            return "free"
+            return daemon_status
 
     def get_volume(self) -> int | None:
         """
@@ -214,30 +343,21 @@ class DaemonManager:
                        not running.
         """
         self.__load_status()
-        status = self.status()
-        if status == "running" and self.__proc_info is not None:
-            return self.__proc_info.get("volume")
-        return None
+        return self.__running_value("volume")
 
     def get_semitones(self) -> str | None:
         """
         Retrieves the current semitone shift of the daemon if it is running.
         """
         self.__load_status()
-        status = self.status()
-        if status == "running" and self.__proc_info is not None:
-            return self.__proc_info.get("semitones")
-        return None
+        return self.__running_value("semitones")
 
     def get_pitch_shift_profile(self) -> str | None:
         """
         Retrieves the current pitch shift profile of the daemon if it is running.
         """
         self.__load_status()
-        status = self.status()
-        if status == "running" and self.__proc_info is not None:
-            return self.__proc_info.get("pitch_shift_profile")
-        return None
+        return self.__running_value("pitch_shift_profile")
 
     def get_pid(self) -> int | None:
         """
@@ -251,10 +371,7 @@ class DaemonManager:
                        running.
         """
         self.__load_status()
-        status = self.status()
-        if status == "running" and self.__proc_info is not None:
-            return self.__proc_info.get("pid")
-        return None
+        return self.__running_value("pid")
 
     def get_profile(self) -> str | None:
         """
@@ -267,17 +384,11 @@ class DaemonManager:
         - str or None: The profile name, or None if the daemon is not running.
         """
         self.__load_status()
-        status = self.status()
-        if status == "running" and self.__proc_info is not None:
-            return self.__proc_info.get("profile")
-        return None
+        return self.__running_value("profile")
 
     def get_mouse_profile(self) -> str | None:
         self.__load_status()
-        status = self.status()
-        if status == "running" and self.__proc_info is not None:
-            return self.__proc_info.get("mouse_profile")
-        return None
+        return self.__running_value("mouse_profile")
 
     def get_api_port(self) -> int | None:
         """
@@ -290,13 +401,49 @@ class DaemonManager:
         - str or None: The API port, or None if the daemon is not running.
         """
         self.__load_status()
-        status = self.status()
-        if (
-            status == "running"
-            and self.__proc_info is not None
-            and "api_port" in self.__proc_info
-        ):
-            return int(self.__proc_info["api_port"])
+        api_port = self.__running_value("api_port")
+        return int(api_port) if api_port is not None else None
+
+    def get_api_socket(self) -> str | None:
+        """
+        Retrieves the path of the Unix domain socket used by the daemon's
+        external API if it is running and was able to create one.
+
+        Parameters:
+        - None
+
+        Returns:
+        - str or None: The socket path, or None if the daemon is not running
+                       or only listens on TCP.
+        """
+        self.__load_status()
+        return self.__running_value("api_socket")
+
+    def api_client(self, timeout: float = 5.0) -> Optional[ExternalAPIClient]:
+        """
+        Connects to the running daemon's external API, preferring the Unix
+        domain socket over TCP when it is available.
+
+        Parameters:
+        - timeout (float): Seconds to wait for a reply from the daemon.
+
+        Returns:
+        - ExternalAPIClient or None: The connected client, or None if the
+                                     daemon is not running or can not be
+                                     reached.
+        """
+        path = self.get_api_socket()
+        if path is not None:
+            try:
+                return ExternalAPIClient(path=path, timeout=timeout)
+            except OSError:
+                pass
+        port = self.get_api_port()
+        if port is not None:
+            try:
+                return ExternalAPIClient(port=port, timeout=timeout)
+            except OSError:
+                pass
         return None
 
     def try_stop(self) -> bool:
@@ -320,44 +467,22 @@ class DaemonManager:
             self.__proc_info is not None and self.__proc_info.get("pid") == os.getpid()
         )
         if status == "running" and is_self:
-            try:
-                # Stop API listener if any
-                if self.__api is not None:
-                    try:
-                        self.__api.stop()
-                    except Exception:
-                        pass
-                # Release process lock and remove pid file
-                try:
-                    self.__release_process_lock()
-                except Exception:
-                    pass
-                # Remove .lock state file
-                try:
-                    if self.__lock_file is not None and os.path.exists(
-                        self.__lock_file
-                    ):
-                        os.unlink(self.__lock_file)
-                except Exception:
-                    pass
-            finally:
-                # Exit the process; cleanup done above
-                os._exit(0)
+            import keyboardsounds.daemon as daemon
 
-        if status == "running" and self.__proc is not None:
-            try:
-                self.__proc.kill()
-            except Exception:
-                pass
-            # Give OS a moment to release any file locks
-            time.sleep(0.25)
+            # The thread running the daemon performs the shutdown
+            daemon.request_shutdown()
+            return True
+
+        if status == "running" and self.__proc_info is not None:
+            self.__stop_process(self.__proc_info["pid"])
             status = self.status()
 
         if status == "stale":
-            try:
-                os.unlink(self.__lock_file)
-            except Exception:
-                pass
+            for path in [self.__lock_file, self.__status_file]:
+                try:
+                    os.unlink(path)
+                except Exception:
+                    pass
         # Clean up pid lock file if present
         if self.__proc_lock_file is not None and os.path.exists(self.__proc_lock_file):
             try:
@@ -368,10 +493,113 @@ class DaemonManager:
         self.__proc_info = None
         self.__lock_exists = False
         self.__is_daemon_process = False
-        self.__proc = None
+        self.__alive = False
 
         return True
 
+    def __stop_process(self, pid: int) -> None:
+        """
+        Asks a running daemon to shut down, first through its external API and
+        otherwise with a signal, and waits for it to exit. The daemon is killed
+        if it does not exit within STOP_TIMEOUT seconds.
+
+        Parameters:
+        - pid (int): The process ID of the daemon.
+        """
+        try:
+            proc = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            return
+
+        requested = False
+        client = self.api_client()
+        if client is not None:
+            try:
+                with client:
+                    client.request("shutdown")
+                requested = True
+            except ConnectionError:
+                # The daemon closed the connection while shutting down
+                # before its reply arrived
+                requested = True
+            except (OSError, ValueError):
+                pass
+        try:
+            if not requested:
+                proc.terminate()
+        except psutil.NoSuchProcess:
+            return
+        if self.__wait_for_exit(proc, STOP_TIMEOUT):
+            return
+        print("Daemon did not shut down in time, killing it.")
+
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            return
+        # Wait for the process to exit so that the OS has released its file
+        # locks before the lock file is cleaned up
+        self.__wait_for_exit(proc, STOP_TIMEOUT)
+
+    def __wait_for_exit(self, proc: psutil.Process, timeout: float) -> bool:
+        """
+        Waits for a process to exit.
+
+        A daemon that is not a child of this process stays a zombie until
+        its parent reaps it, which psutil would keep waiting for. A zombie
+        has already closed its files and released its locks, so it counts as
+        exited.
+
+        Returns:
+        - bool: True if the process exited within the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if proc.status() == psutil.STATUS_ZOMBIE:
+                    return True
+                proc.wait(timeout=min(0.05, max(0.0, deadline - time.monotonic())))
+                return True
+            except psutil.NoSuchProcess:
+                return True
+            except psutil.TimeoutExpired:
+                if time.monotonic() >= deadline:
+                    return False
+
+    def shutdown(self) -> None:
+        """
+        Releases everything the daemon process holds, called by the daemon as
+        the last step of its shutdown. Stops the external API, writes any
+        pending state, then removes the lock file, status segment and process
+        lock.
+
+        Parameters:
+        - None
+        """
+        self.__shut_down = True
+        if self.__api is not None:
+            try:
+                self.__api.stop()
+            except Exception:
+                pass
+        # Stop persisting state so the lock file stays removed
+        if self.__lock_writer is not None:
+            self.__lock_writer.flush()
+            self.__lock_writer.close()
+        if self.__status_segment is not None:
+            self.__status_segment.close()
+        # Release process lock and remove pid file
+        try:
+            self.__release_process_lock()
+        except Exception:
+            pass
+        # Remove .lock state file
+        try:
+            if self.__lock_file is not None and os.path.exists(self.__lock_file):
+                os.unlink(self.__lock_file)
+        except Exception:
+            pass
+
     def try_start(
         self,
         volume: int,
@@ -381,6 +609,8 @@ class DaemonManager:
         semitones: str | None,
         pitch_shift_profile: str | None,
         mouse_profile: str | None = None,
+        backend: str = "pygame",
+        output_path: str | None = None,
     ) -> bool:
         """
         Attempts to start the daemon process with the specified volume and
@@ -391,6 +621,9 @@ class DaemonManager:
         - profile (str): The profile name to be used by the daemon.
         - debug (bool): Whether or not to enable debug mode.
         - window (bool): Whether or not to display the daemon window.
+        - backend (str): The audio output, 'pygame', 'software', 'null' or
+                         'wav'.
+        - output_path (str): The WAV file the 'wav' backend captures to.
 
         Returns:
         - bool: True if the daemon was started successfully, False if there was
@@ -424,6 +657,19 @@ class DaemonManager:
 
         status = self.status()
         if status == "running":
+            # Reuse the running daemon when possible, only a daemon running in
+            # the foreground for debugging has to be replaced
+            if not debug and self.__try_reconfigure(
+                volume,
+                profile,
+                window,
+                semitones,
+                pitch_shift_profile,
+                mouse_profile,
+                backend,
+                output_path,
+            ):
+                return True
             self.try_stop()
             status = self.status()
 
@@ -439,13 +685,18 @@ class DaemonManager:
                 semitones=semitones,
                 pitch_shift_profile=pitch_shift_profile,
                 mouse_profile=mouse_profile,
+                backend=backend,
+                output_path=output_path,
             )
         else:
             if sys.platform != "win32":
+                ready_read, ready_write = os.pipe()
                 pid = os.fork()
                 if pid > 0:
-                    return True
+                    os.close(ready_write)
+                    return self.__wait_for_ready_pipe(ready_read)
                 else:
+                    os.close(ready_read)
                     try:
                         os.setsid()
                     except OSError as e:
@@ -478,6 +729,9 @@ class DaemonManager:
                         semitones=semitones,
                         pitch_shift_profile=pitch_shift_profile,
                         mouse_profile=mouse_profile,
+                        on_ready=lambda: self.__signal_ready_pipe(ready_write),
+                        backend=backend,
+                        output_path=output_path,
                     )
             else:
                 # Use sys.executable instead of sys.argv[0] for PyInstaller compatibility
@@ -486,6 +740,10 @@ class DaemonManager:
                 executable = (
                     sys.executable if getattr(sys, "frozen", False) else sys.argv[0]
                 )
+                # The daemon connects back to this socket once it is ready
+                ready_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                ready_socket.bind(("localhost", 0))
+                ready_socket.listen(1)
                 args = [
                     executable,
                     "start-daemon",
@@ -495,8 +753,11 @@ class DaemonManager:
                     semitones if semitones is not None else "off",
                     pitch_shift_profile if pitch_shift_profile is not None else "both",
                     mouse_profile if mouse_profile is not None else "off",
+                    backend,
+                    output_path if output_path is not None else "off",
+                    str(ready_socket.getsockname()[1]),
                 ]
-                subprocess.Popen(
+                proc = subprocess.Popen(
                     args,
                     stdin=subprocess.DEVNULL,
                     stdout=subprocess.DEVNULL,
@@ -505,9 +766,153 @@ class DaemonManager:
                     creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0,
                     start_new_session=True,
                 )
-                time.sleep(1.0)
+                return self.__wait_for_ready_socket(ready_socket, proc)
+        return True
+
+    def __try_reconfigure(
+        self,
+        volume: int,
+        profile: str | None,
+        window: bool,
+        semitones: str | None,
+        pitch_shift_profile: str | None,
+        mouse_profile: str | None,
+        backend: str,
+        output_path: str | None,
+    ) -> bool:
+        """
+        Applies a new configuration to the running daemon through its external
+        API instead of restarting it.
+
+        The configuration is compared with the daemon's current state and only
+        the settings that differ are sent, as a single batch. The audio backend
+        can not be changed while the daemon is running, and a daemon capturing
+        to a WAV file is always restarted so that it starts a new capture.
+
+        Returns:
+        - bool: True if every setting was applied, False if the daemon has to
+                be restarted instead.
+        """
+        state = self.__proc_info or {}
+        if (state.get("backend") or "pygame") != backend or backend == "wav":
+            return False
+
+        commands = []
+        if state.get("volume") != volume:
+            commands.append({"action": "set_volume", "volume": volume})
+        if state.get("profile") != profile:
+            commands.append({"action": "set_profile", "profile": profile})
+        if state.get("mouse_profile") != mouse_profile:
+            commands.append({"action": "set_mouse_profile", "profile": mouse_profile})
+        if self.__pitch_shift_config(
+            state.get("semitones"), state.get("pitch_shift_profile")
+        ) != self.__pitch_shift_config(semitones, pitch_shift_profile):
+            commands.append(
+                {
+                    "action": "set_pitch_shift",
+                    "semitones": semitones,
+                    "profile": pitch_shift_profile,
+                }
+            )
+        if window:
+            commands.append({"action": "show_daemon_window"})
+
+        if len(commands) == 0:
+            print("Running daemon is already configured.")
+            return True
+
+        # A timeout would restart the daemon while it is still applying the
+        # batch, so wait for as long as loading the profile takes
+        client = self.api_client(timeout=RECONFIGURE_TIMEOUT)
+        if client is None:
+            return False
+
+        try:
+            with client:
+                results = client.batch(commands)
+        except (OSError, ValueError) as e:
+            print(f"Unable to re-configure running daemon: {e}")
+            return False
+
+        for result in results:
+            if not result["ok"]:
+                print(f"Unable to re-configure running daemon: {result['error']}")
+                return False
         return True
 
+    def __pitch_shift_config(
+        self, semitones: str | None, pitch_shift_profile: str | None
+    ) -> tuple:
+        # The daemon reports the range in the 'lower,upper' format used on
+        # the command line, pitch shifting is disabled when it is empty
+        if semitones is None or semitones == "":
+            return (None, None)
+        return (semitones, pitch_shift_profile or "both")
+
+    def __wait_for_ready_pipe(self, ready_read: int) -> bool:
+        """
+        Waits for a forked daemon to report that it is ready.
+
+        Returns:
+        - bool: True if the daemon became ready, False if it exited or did
+                not become ready in time.
+        """
+        try:
+            readable, _, _ = select.select([ready_read], [], [], READY_TIMEOUT)
+            # The pipe reads as empty if the daemon exited before it was ready
+            ready = len(readable) > 0 and os.read(ready_read, 1) == b"1"
+        finally:
+            os.close(ready_read)
+        if not ready:
+            print("Daemon did not report that it was ready.")
+        return ready
+
+    def __signal_ready_pipe(self, ready_write: int) -> None:
+        try:
+            os.write(ready_write, b"1")
+            os.close(ready_write)
+        except OSError:
+            pass
+
+    def __wait_for_ready_socket(
+        self, ready_socket: socket.socket, proc: subprocess.Popen
+    ) -> bool:
+        """
+        Waits for a daemon started as a separate process to connect to the
+        readiness socket.
+
+        Returns:
+        - bool: True if the daemon became ready, False if it exited or did
+                not become ready in time.
+        """
+        deadline = time.monotonic() + READY_TIMEOUT
+        ready_socket.settimeout(0.1)
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    conn, _ = ready_socket.accept()
+                except socket.timeout:
+                    if proc.poll() is not None:
+                        break
+                    continue
+                with conn:
+                    conn.settimeout(1.0)
+                    if conn.recv(1) == b"1":
+                        return True
+        except OSError:
+            pass
+        finally:
+            ready_socket.close()
+        print("Daemon did not report that it was ready.")
+        return False
+
+    def __signal_ready_socket(self, port: int) -> None:
+        try:
+            with socket.create_connection(("localhost", port), timeout=1.0) as s:
+                s.sendall(b"1")
+        except OSError:
+            pass
+
     def __acquire_process_lock(self) -> bool:
         """
         Acquire an OS-level exclusive lock to ensure only one daemon runs.
@@ -597,6 +1002,21 @@ class DaemonManager:
         profile: str | None,
         mouse_profile: str | None = None,
     ):
+        """
+        Updates the daemon's state and persists it to the lock file.
+
+        The in-memory state, available through `get_state()` and the external
+        API's 'get_status' action, is updated immediately and published to
+        subscribed API clients. The lock file itself is written in the
+        background, coalescing bursts of updates into a single write.
+
+        Parameters:
+        - volume (int): The volume level of the daemon.
+        - semitones (str): The pitch shift range, if enabled.
+        - pitch_shift_profile (str): The devices pitch shifting applies to.
+        - profile (str): The keyboard profile name, if any.
+        - mouse_profile (str): The mouse profile name, if any.
+        """
         lockData = {
             "pid": os.getpid(),
             "volume": volume,
@@ -604,24 +1024,46 @@ class DaemonManager:
             "pitch_shift_profile": pitch_shift_profile,
             "profile": profile,
             "mouse_profile": mouse_profile,
+            "backend": self.__backend,
+            "output": self.__output_path,
             "api_port": self.__api.port() if self.__api is not None else None,
+            "api_socket": self.__api.unix_path() if self.__api is not None else None,
         }
-        print(f"updating lock-file with {lockData}")
-        # Write atomically to avoid partial reads
-        tmp_path = f"{self.__lock_file}.tmp"
-        with open(tmp_path, "w") as f:
-            json.dump(lockData, f)
-            f.flush()
-            os.fsync(f.fileno())
-        try:
-            os.replace(tmp_path, self.__lock_file)
-        except Exception:
-            # Fallback if replace not available
+        if lockData == self.__state or self.__shut_down:
+            return
+        self.__state = lockData
+        if self.__api is not None:
+            self.__api.publish("state", lockData)
+
+        # Readers checking the daemon's status use the status segment, which
+        # is cheap enough to update on every change
+        if self.__status_segment is None and self.__status_file is not None:
             try:
-                os.unlink(self.__lock_file)
-            except Exception:
-                pass
-            os.rename(tmp_path, self.__lock_file)
+                self.__status_segment = StatusSegmentWriter(self.__status_file)
+            except (OSError, ValueError) as e:
+                print(f"Error: unable to create status segment: {e}")
+        if self.__status_segment is not None:
+            self.__status_segment.publish(lockData)
+
+        # The first write happens right away so that other processes can find
+        # the daemon as soon as it has started
+        if self.__lock_writer is None:
+            self.__lock_writer = _LockFileWriter(self.__lock_file)
+            self.__lock_writer.write(lockData, immediate=True)
+        else:
+            self.__lock_writer.write(lockData)
+
+    def get_state(self) -> Optional[dict]:
+        """
+        Retrieves the daemon's current state from within the daemon process,
+        without reading the lock file.
+
+        Returns:
+        - dict or None: The daemon's current state, which may not have been
+                        written to the lock file yet, or None if the daemon
+                        has not been started.
+        """
+        return self.__state
 
     def capture_daemon_initialization(self):
         """
@@ -636,7 +1078,7 @@ class DaemonManager:
         - bool: True if the daemon was initialized successfully, False if the
                 conditions for initialization were not met.
         """
-        if len(sys.argv) == 8 and sys.argv[1] == "start-daemon":
+        if len(sys.argv) in (10, 11) and sys.argv[1] == "start-daemon":
             # Ensure only one daemon proceeds by acquiring OS-level lock
             if not self.__acquire_process_lock():
                 # Another daemon is already running
@@ -694,6 +1136,26 @@ class DaemonManager:
             except:
                 pass
 
+            backend = "pygame"
+            try:
+                if sys.argv[8] in ("pygame", "software", "null", "wav"):
+                    backend = sys.argv[8]
+            except:
+                pass
+
+            output_path = None
+            try:
+                output_path = sys.argv[9] if sys.argv[9] != "off" else None
+            except:
+                pass
+
+            # The process that started the daemon waits on this port for it
+            # to report that it is ready
+            on_ready = None
+            if len(sys.argv) == 11:
+                ready_port = int(sys.argv[10])
+                on_ready = lambda: self.__signal_ready_socket(ready_port)
+
             self.run_daemon(
                 volume,
                 profile,
@@ -702,6 +1164,9 @@ class DaemonManager:
                 semitones=semitones,
                 pitch_shift_profile=pitch_shift_profile,
                 mouse_profile=mouse_profile,
+                on_ready=on_ready,
+                backend=backend,
+                output_path=output_path,
             )
             return True
         return False
@@ -715,10 +1180,25 @@ class DaemonManager:
         semitones: str | None,
         pitch_shift_profile: str | None,
         mouse_profile: str | None = None,
+        on_ready: Optional[Callable[[], None]] = None,
+        backend: str = "pygame",
+        output_path: str | None = None,
     ):
+        import keyboardsounds.daemon as daemon
+
+        self.__backend = backend
+        self.__output_path = output_path
+
         api_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         api_socket.bind(("localhost", 0))
-        self.__api = ExternalAPI(api_socket, daemon.on_command)
+        # On Linux and macOS the API is also served over a Unix domain socket
+        # next to the lock file, only accessible to the current user
+        unix_socket = None
+        if sys.platform != "win32":
+            unix_socket = bind_unix_socket(
+                os.path.join(os.path.dirname(self.__lock_file), API_SOCKET_FILE)
+            )
+        self.__api = ExternalAPI(api_socket, daemon.on_command, unix_socket)
         self.__api.listen()
 
         self.update_lock_file(
@@ -742,14 +1222,21 @@ class DaemonManager:
             pitch_shift_profile,
             debug=debug,
             mouse_profile=mouse_profile,
+            on_ready=on_ready,
+            backend=backend,
+            output_path=output_path,
         )
 
     def show_daemon_window(self):
         if not self.__daemon_window_visible:
-            self.__thread = threading.Thread(target=self.start_daemon_window)
+            self.__thread = threading.Thread(
+                target=self.start_daemon_window, daemon=True
+            )
             self.__thread.start()
 
     def start_daemon_window(self):
+        import tkinter as tk
+
         self.__daemon_window_visible = True
         root = tk.Tk()
         root.title("Keyboard Sounds - Audio Daemon")
@@ -845,7 +1332,7 @@ class DaemonManager:
         root.mainloop()
         self.__daemon_window_visible = False
 
-    def _stop_via_gui(self, root: tk.Tk) -> None:
+    def _stop_via_gui(self, root: "tk.Tk") -> None:
         try:
             # Close the window promptly to avoid UI freeze
             try:
@@ -862,18 +1349,30 @@ class DaemonManager:
                 pass
 
     def capture_oneshot(self) -> bool:
-        if (
-            self.__one_shot
-            and (len(sys.argv) == 3 or len(sys.argv) == 4)
-            and sys.argv[1] == "one-shot"
-        ):
-            pressSound = sys.argv[2]
-            releaseSound = None
-            if len(sys.argv) == 4:
-                releaseSound = sys.argv[3]
+        if self.__one_shot and len(sys.argv) >= 3 and sys.argv[1] == "one-shot":
+            # kbs one-shot <press_sound> [<release_sound>] [-b <backend>] [-o <file>]
+            parser = argparse.ArgumentParser(prog="kbs one-shot")
+            parser.add_argument("press_sound")
+            parser.add_argument("release_sound", nargs="?", default=None)
+            parser.add_argument(
+                "-b",
+                "--backend",
+                choices=["pygame", "software", "null", "wav"],
+                default="pygame",
+            )
+            parser.add_argument("-o", "--output", default=None)
+            args = parser.parse_args(sys.argv[2:])
+
+            import keyboardsounds.daemon as daemon
 
             try:
-                daemon.one_shot(100, pressSound, releaseSound)
+                daemon.one_shot(
+                    100,
+                    args.press_sound,
+                    args.release_sound,
+                    backend=args.backend,
+                    output_path=args.output,
+                )
                 return True
             except Exception as e:
                 print(e)
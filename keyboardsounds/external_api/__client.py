@@ -0,0 +1,159 @@
+import socket
+import json
+import itertools
+
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+
+class ExternalAPIClient:
+    def __init__(
+        self,
+        port: Optional[int] = None,
+        host: str = "localhost",
+        timeout: float = 5.0,
+        path: Optional[str] = None,
+    ):
+        """
+        Opens a connection to a running daemon's external API.
+
+        Requests are sent as plain JSON lines. Events pushed to the
+        connection after subscribing are buffered until read with
+        `next_event()`.
+
+        Parameters:
+        - port (int): The TCP port of the external API, see
+                      `DaemonManager.get_api_port()`.
+        - host (str): The host of the external API.
+        - timeout (float): Seconds to wait for a reply before raising
+                           `socket.timeout`.
+        - path (str): The path of the external API's Unix domain socket, see
+                      `DaemonManager.get_api_socket()`. Used instead of the
+                      TCP port when provided.
+        """
+        if path is not None:
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.__socket.settimeout(timeout)
+            try:
+                self.__socket.connect(path)
+            except OSError:
+                self.__socket.close()
+                raise
+        elif port is not None:
+            self.__socket = socket.create_connection((host, port), timeout=timeout)
+        else:
+            raise ValueError("Either a port or a socket path is required")
+        self.__file = self.__socket.makefile("rb")
+        self.__ids = itertools.count(1)
+        self.__events: Deque[dict] = deque()
+
+    def close(self) -> None:
+        self.__file.close()
+        self.__socket.close()
+
+    def __enter__(self) -> "ExternalAPIClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def send(self, command: dict) -> None:
+        """
+        Sends a command without waiting for, or requesting, a reply.
+
+        Parameters:
+        - command (dict): The command, including its 'action'.
+        """
+        self.__socket.sendall(json.dumps(command).encode("utf-8") + b"\n")
+
+    def request(self, action: str, **params) -> Any:
+        """
+        Sends a command and waits for its reply.
+
+        Parameters:
+        - action (str): The action to perform.
+        - params: The parameters of the action.
+
+        Returns:
+        - Any: The result of the command.
+
+        Raises:
+        - ValueError: If the daemon failed to handle the command.
+        """
+        return self.pipeline([dict(params, action=action)])[0]
+
+    def pipeline(self, commands: List[dict]) -> List[Any]:
+        """
+        Sends several commands at once and then waits for all of their
+        replies, avoiding a round trip per command.
+
+        Parameters:
+        - commands (List[dict]): The commands, each including its 'action'.
+
+        Returns:
+        - List[Any]: The result of each command, in order.
+
+        Raises:
+        - ValueError: If the daemon failed to handle any of the commands.
+        """
+        ids = []
+        data = b""
+        for command in commands:
+            request_id = next(self.__ids)
+            ids.append(request_id)
+            data += json.dumps(dict(command, id=request_id)).encode("utf-8") + b"\n"
+        self.__socket.sendall(data)
+
+        replies = {}
+        while len(replies) < len(ids):
+            message = self.__read()
+            if "event" in message:
+                self.__events.append(message)
+            elif message.get("id") in ids:
+                replies[message["id"]] = message
+
+        results = []
+        for request_id in ids:
+            reply = replies[request_id]
+            if not reply["ok"]:
+                raise ValueError(reply["error"])
+            results.append(reply.get("result"))
+        return results
+
+    def batch(self, commands: List[dict]) -> List[dict]:
+        """
+        Runs several commands as a single 'batch' request.
+
+        Parameters:
+        - commands (List[dict]): The commands, each including its 'action'.
+
+        Returns:
+        - List[dict]: The outcome of each command, in the form
+                      {"ok": True, "result": ...} or {"ok": False, "error": ...}.
+        """
+        return self.request("batch", commands=commands)
+
+    def next_event(self) -> Optional[dict]:
+        """
+        Waits for the next event pushed to the connection after subscribing
+        with the 'subscribe' action.
+
+        Returns:
+        - dict or None: The event, in the form {"event": ..., "data": ...}, or
+                        None if the connection was closed.
+        """
+        if len(self.__events) > 0:
+            return self.__events.popleft()
+        while True:
+            try:
+                message = self.__read()
+            except ConnectionError:
+                return None
+            if "event" in message:
+                return message
+
+    def __read(self) -> dict:
+        line = self.__file.readline()
+        if len(line) == 0:
+            raise ConnectionError("Connection closed by the daemon")
+        return json.loads(line)
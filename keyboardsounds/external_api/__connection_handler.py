@@ -1,61 +1,221 @@
-import socket
+import asyncio
 import base64
 import json
 
-from typing import Callable
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+# Connections whose unsent output grows beyond this many bytes (e.g. a
+# subscriber that stopped reading) are closed rather than buffered forever.
+MAX_WRITE_BUFFER = 1024 * 1024
 
 
 class _ConnectionHandler:
-    def __init__(self, conn: socket.socket, on_command: Callable[[dict], None]) -> None:
-        self.__connection = conn
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        on_command: Callable[[dict], Optional[Any]],
+        executor: Executor,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
+        self.__reader = reader
+        self.__writer = writer
         self.__continue = True
         self.__on_command = on_command
+        self.__executor = executor
+        self.__idle_timeout = idle_timeout
+        # Whether the client has been sending plain JSON rather than base-64,
+        # used to encode pushed events the same way
+        self.__raw = False
+        self.subscribed = False
+
+        peer = writer.get_extra_info("peername")
+        if isinstance(peer, tuple):
+            self.name = str(peer[1])
+        else:
+            # Unix domain socket peers have no address, use the descriptor
+            self.name = f"unix:{writer.get_extra_info('socket').fileno()}"
 
     def stop(self):
+        """
+        Closes the connection. Must be called from the event loop's thread.
+        """
         self.__continue = False
-        self.__connection.close()
+        self.__writer.close()
+
+    def running(self) -> bool:
+        return self.__continue
 
-    def handle_connection(self):
+    def send(self, message: Any, raw: Optional[bool] = None) -> bool:
+        """
+        Queues a message to be sent to the client as a single line of JSON.
+        Must be called from the event loop's thread.
+
+        Parameters:
+        - message (Any): The JSON serializable message to send.
+        - raw (bool): Whether to send plain JSON instead of base-64 encoded
+                      JSON. Defaults to the encoding the client last used.
+
+        Returns:
+        - bool: False if the connection is no longer writable.
+        """
+        if not self.__continue or self.__writer.is_closing():
+            return False
+        if self.__writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            print(f"({self.name}) Client is not reading, closing connection")
+            self.stop()
+            return False
+
+        data = json.dumps(message).encode("utf-8")
+        if not (self.__raw if raw is None else raw):
+            data = base64.b64encode(data)
+        self.__writer.write(data + b"\n")
+        return True
+
+    async def handle_connection(self):
         """
         Handles an incoming connection to the external API.
 
-        This function reads the incoming data from the connection and processes it
-        based on the command received.
+        Each line received is a single request, either plain JSON or base-64
+        encoded JSON. Requests are processed in the order they are received, so
+        clients may pipeline several requests without waiting for replies.
+        Commands from all connections are run one at a time on the executor.
 
-        Parameters:
-        - conn: The socket connection object to the client.
+        Requests that include an 'id' are always answered with a reply in the
+        same encoding, in the form {"id": ..., "ok": true, "result": ...} or
+        {"id": ..., "ok": false, "error": "..."}. Requests without an 'id' are
+        only answered if they return a result, in the form
+        {"action": ..., "result": ...}.
+
+        The 'batch' action runs each of the request's 'commands' in order and
+        returns a list with the outcome of each of them.
+
+        The 'subscribe' and 'unsubscribe' actions take effect on the event
+        loop's thread before the command is run, so events published while it
+        runs already honor them.
+
+        Connections that send nothing for longer than the idle timeout are
+        closed, unless they are subscribed to events. A subscriber only
+        receives events and may stay quiet for as long as it is connected.
 
         Returns:
         - None
         """
-        remote_port = self.__connection.getpeername()[1]
-        print(f"new external api connection ::{remote_port}")
-        with self.__connection.makefile("r") as f:
-            # I want this to only loop while the connection is open
+        loop = asyncio.get_running_loop()
+        print(f"new external api connection ::{self.name}")
+        try:
             while self.__continue:
-                data = f.readline()
+                # Subscribers are waiting on events, not sending requests
+                timeout = None if self.subscribed else self.__idle_timeout
+                try:
+                    data = await asyncio.wait_for(self.__reader.readline(), timeout)
+                except asyncio.TimeoutError:
+                    print(f"({self.name}) Connection idle, closing")
+                    return
+                except (ValueError, asyncio.LimitOverrunError):
+                    print(f"({self.name}) Request too large, closing")
+                    return
+                except OSError:
+                    data = None
                 if data is None or len(data) == 0:
-                    print(f"({remote_port}) Connection closed")
+                    print(f"({self.name}) Connection closed")
                     return
 
-                # Decode from base-64
-                decoded = None
-                try:
-                    decoded = base64.b64decode(data.strip(), validate=True)
-                except base64.binascii.Error:
-                    print(f"({remote_port}) Failed to decode base64 data")
+                data = data.strip()
+                if len(data) == 0:
                     continue
 
-                if decoded is None:
-                    print(f"({remote_port}) Invalid base64 data")
-                    continue
+                # Plain JSON requests always start with '{', which is not a
+                # valid base-64 character
+                raw = data.startswith(b"{")
+                if not raw:
+                    try:
+                        data = base64.b64decode(data, validate=True)
+                    except base64.binascii.Error:
+                        print(f"({self.name}) Failed to decode base64 data")
+                        continue
+                self.__raw = raw
 
                 # Parse the decoded data as JSON
                 try:
-                    command = json.loads(decoded)
-                except json.JSONDecodeError:
-                    print(f"({remote_port}) Failed to parse JSON")
+                    command = json.loads(data)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    print(f"({self.name}) Failed to parse JSON")
                     continue
 
-                print(f"({remote_port}) {command}")
-                self.__on_command(command)
+                print(f"({self.name}) {command}")
+                request_id = command.get("id") if isinstance(command, dict) else None
+
+                subscribed = self.__subscription(command)
+                if subscribed is not None:
+                    self.subscribed = subscribed
+
+                error = None
+                result = None
+                try:
+                    result = await loop.run_in_executor(
+                        self.__executor, self.__execute, command
+                    )
+                except Exception as e:
+                    error = str(e)
+
+                if request_id is not None:
+                    reply = {"id": request_id, "ok": error is None}
+                    if error is None:
+                        reply["result"] = result
+                    else:
+                        reply["error"] = error
+                    self.send(reply, raw=raw)
+                elif error is not None:
+                    print(f"({self.name}) Failed to handle command: {error}")
+                elif result is not None:
+                    self.send({"action": command["action"], "result": result}, raw=raw)
+        finally:
+            self.stop()
+
+    def __execute(self, command: Any, batched: bool = False) -> Optional[Any]:
+        if not isinstance(command, dict) or "action" not in command:
+            raise ValueError("Command is missing an 'action'")
+
+        action = command["action"]
+        if action == "batch":
+            if batched:
+                raise ValueError("Batches cannot be nested")
+            commands = command.get("commands")
+            if not isinstance(commands, list):
+                raise ValueError("Batch is missing a list of 'commands'")
+            results = []
+            for sub_command in commands:
+                try:
+                    results.append(
+                        {"ok": True, "result": self.__execute(sub_command, True)}
+                    )
+                except Exception as e:
+                    results.append({"ok": False, "error": str(e)})
+            return results
+
+        return self.__on_command(command)
+
+    def __subscription(self, command: Any) -> Optional[bool]:
+        """
+        Returns whether the connection is subscribed to events once the
+        command has run, or None if the command does not change it.
+        """
+        if not isinstance(command, dict):
+            return None
+        action = command.get("action")
+        if action == "subscribe":
+            return True
+        if action == "unsubscribe":
+            return False
+        if action != "batch" or not isinstance(command.get("commands"), list):
+            return None
+        subscribed = None
+        for sub_command in command["commands"]:
+            if isinstance(sub_command, dict) and sub_command.get("action") in (
+                "subscribe",
+                "unsubscribe",
+            ):
+                subscribed = sub_command["action"] == "subscribe"
+        return subscribed
@@ -1,78 +1,251 @@
+import os
+import stat
 import socket
+import struct
+import asyncio
 from threading import Thread
-import base64
-import json
 import sys
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
 from keyboardsounds.external_api.__connection_handler import _ConnectionHandler
 
 
+def bind_unix_socket(path: str) -> Optional[socket.socket]:
+    """
+    Creates a Unix domain socket for the external API at the specified path.
+
+    The socket file is created with owner-only permissions (0600) so that
+    other local users can not connect to it. A stale socket left behind by a
+    daemon that did not shut down cleanly is replaced.
+
+    Parameters:
+    - path (str): The path of the socket file.
+
+    Returns:
+    - socket.socket or None: The bound socket, or None if Unix domain sockets
+                             are not available or the socket could not be
+                             created.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    try:
+        if stat.S_ISSOCK(os.lstat(path).st_mode):
+            os.unlink(path)
+    except OSError:
+        pass
+
+    unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    previous_umask = os.umask(0o177)
+    try:
+        unix_socket.bind(path)
+    except OSError as e:
+        print(f"unable to create external API socket at {path}: {e}")
+        unix_socket.close()
+        return None
+    finally:
+        os.umask(previous_umask)
+    return unix_socket
+
+
+def _peer_is_owner(conn) -> bool:
+    """
+    Checks that the process connected to a Unix domain socket belongs to the
+    same user as the daemon. Where peer credentials are not available the
+    socket file's permissions are relied upon instead.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    creds = conn.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", creds)
+    return uid == os.getuid()
+
+
 class ExternalAPI:
     def __init__(
-        self, socket: socket.socket, on_command: Callable[[dict], None]
+        self,
+        socket: socket.socket,
+        on_command: Callable[[dict], Optional[Any]],
+        unix_socket: Optional[socket.socket] = None,
+        max_connections: int = 32,
+        idle_timeout: Optional[float] = 600.0,
     ) -> None:
+        """
+        Initializes the external API.
+
+        All connections are served by a single asyncio event loop running in
+        its own thread. Commands are passed to `on_command` one at a time, in
+        the order they are received, on a dedicated worker thread.
+
+        Parameters:
+        - socket (socket.socket): The bound TCP socket to listen on.
+        - on_command (Callable): Called with each command received, returns
+                                 the command's result, if any.
+        - unix_socket (socket.socket): An optional bound Unix domain socket,
+                                       see `bind_unix_socket()`, to listen on
+                                       alongside the TCP socket.
+        - max_connections (int): The maximum number of open connections,
+                                 further connections are closed immediately.
+        - idle_timeout (float): Seconds after which a connection that has not
+                                sent anything is closed. Connections that
+                                are subscribed to events are never closed
+                                for being idle. None disables the timeout.
+        """
         self.__socket = socket
-        self.__continue = True
+        self.__unix_socket = unix_socket
         self.__on_command = on_command
+        self.__max_connections = max_connections
+        self.__idle_timeout = idle_timeout
         self.__port = int(socket.getsockname()[1])
-        self.__thread = None
+        self.__unix_path = (
+            unix_socket.getsockname() if unix_socket is not None else None
+        )
+        self.__thread: Optional[Thread] = None
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__stopped: Optional[asyncio.Event] = None
+        self.__stop_requested = False
+        self.__executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="external-api"
+        )
+        self.__handlers: set[_ConnectionHandler] = set()
+        self.__tasks: set[asyncio.Task] = set()
 
     def listen(self) -> None:
         if self.__thread is None:
-            self.__thread = Thread(target=self.__listen)
+            self.__loop = asyncio.new_event_loop()
+            self.__thread = Thread(target=self.__run)
             self.__thread.daemon = True
             self.__thread.start()
 
     def block(self):
         if self.__thread is not None:
-            while self.__continue:
+            while self.__thread.is_alive():
                 try:
                     self.__thread.join(1)
                 except KeyboardInterrupt:
                     sys.exit(0)
 
     def stop(self) -> None:
-        if self.__thread is not None:
-            # Signal the listener loop to stop
-            self.__continue = False
-            # Nudge the blocking accept() by connecting to the local port
+        if self.__thread is not None and self.__loop is not None:
             try:
-                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                    s.settimeout(0.2)
-                    s.connect(("localhost", self.__port))
-            except Exception:
+                self.__loop.call_soon_threadsafe(self.__request_stop)
+            except RuntimeError:
+                # The event loop has already been closed
                 pass
-            # Join the thread now that accept() should have returned
             self.__thread.join()
             self.__thread = None
+            self.__executor.shutdown(wait=False)
 
     def port(self) -> int:
         return self.__port
 
-    def __listen(self):
-        self.__socket.listen(9)
+    def unix_path(self) -> Optional[str]:
+        return self.__unix_path
+
+    def publish(self, event: str, data: Any) -> None:
+        """
+        Pushes an event to every connection that has subscribed to events
+        using the 'subscribe' action. Safe to call from any thread.
+
+        Parameters:
+        - event (str): The name of the event, e.g. 'state'.
+        - data (Any): The JSON serializable event payload.
+        """
+        if self.__loop is None or self.__thread is None:
+            return
+        try:
+            self.__loop.call_soon_threadsafe(self.__publish, event, data)
+        except RuntimeError:
+            # The event loop has already been closed
+            pass
+
+    def __publish(self, event: str, data: Any) -> None:
+        for connection in list(self.__handlers):
+            if connection.subscribed:
+                connection.send({"event": event, "data": data})
+
+    def __request_stop(self) -> None:
+        self.__stop_requested = True
+        if self.__stopped is not None:
+            self.__stopped.set()
+
+    def __run(self) -> None:
+        assert self.__loop is not None
+        asyncio.set_event_loop(self.__loop)
+        try:
+            self.__loop.run_until_complete(self.__serve())
+        finally:
+            self.__loop.close()
+
+    async def __serve(self) -> None:
+        self.__stopped = asyncio.Event()
+        if self.__stop_requested:
+            self.__stopped.set()
+        # Allow large batches while still bounding the memory a single
+        # request can use
+        limit = 1024 * 1024
+
+        servers = [
+            await asyncio.start_server(
+                self.__accept, sock=self.__socket, backlog=9, limit=limit
+            )
+        ]
         print(f"external API listening on localhost:{self.__port}")
+        if self.__unix_socket is not None:
+            servers.append(
+                await asyncio.start_unix_server(
+                    self.__accept, sock=self.__unix_socket, backlog=9, limit=limit
+                )
+            )
+            print(f"external API listening on {self.__unix_path}")
+
+        await self.__stopped.wait()
 
-        connection_handlers: list[tuple[_ConnectionHandler, Thread]] = []
+        for server in servers:
+            server.close()
+        for connection in list(self.__handlers):
+            connection.stop()
+        # Wait for every connection to finish so no task is left pending
+        # when the event loop is closed
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+        for server in servers:
+            await server.wait_closed()
 
-        while self.__continue:
+        if self.__unix_path is not None:
             try:
-                conn, _ = self.__socket.accept()
+                os.unlink(self.__unix_path)
             except OSError:
-                # Socket likely closed during stop(); exit if we're stopping
-                if not self.__continue:
-                    break
-                else:
-                    continue
-            connection = _ConnectionHandler(conn=conn, on_command=self.__on_command)
-            thread = Thread(target=connection.handle_connection)
-            thread.daemon = True
-            thread.start()
-            connection_handlers.append((connection, thread))
-
-        for connect, thread in connection_handlers:
-            connect.stop()
-            thread.join()
-
-        self.__socket.close()
+                pass
+
+    async def __accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        sock = writer.get_extra_info("socket")
+        if sock.family != socket.AF_INET and not _peer_is_owner(sock):
+            print("rejected external api connection from another user")
+            writer.close()
+            return
+        if len(self.__handlers) >= self.__max_connections:
+            print("rejected external api connection, too many connections")
+            writer.close()
+            return
+
+        connection = _ConnectionHandler(
+            reader,
+            writer,
+            on_command=self.__on_command,
+            executor=self.__executor,
+            idle_timeout=self.__idle_timeout,
+        )
+        task = asyncio.current_task()
+        self.__handlers.add(connection)
+        if task is not None:
+            self.__tasks.add(task)
+        try:
+            await connection.handle_connection()
+        finally:
+            self.__handlers.discard(connection)
+            self.__tasks.discard(task)
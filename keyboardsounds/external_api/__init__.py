@@ -1 +1,2 @@
-from keyboardsounds.external_api.__external_api import ExternalAPI
+from keyboardsounds.external_api.__external_api import ExternalAPI, bind_unix_socket
+from keyboardsounds.external_api.__client import ExternalAPIClient
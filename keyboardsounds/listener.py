@@ -4,6 +4,7 @@ Custom wrapper classes for pynput keyboard and mouse listeners.
 
 import os
 import sys
+import time
 import threading
 import glob
 from typing import Optional, Callable, Any, TYPE_CHECKING
@@ -21,6 +22,11 @@ except ImportError:
     # Type stub for when libevdev is not available
     Device = None  # type: ignore
 
+# Kernel timestamps further than this from the wall clock are assumed to come
+# from a non-realtime clock source and are replaced with the time of receipt.
+_MAX_CLOCK_SKEW = 60.0
+
+
 def isWayland():
     """
     Check if the current session is Wayland.
@@ -222,6 +228,15 @@ _LINUX_KEY_TO_PYNPUT_KEY.update({
 for i, char in enumerate("abcdefghijklmnopqrstuvwxyz", start=30):
     _LINUX_KEY_TO_PYNPUT_KEY[i] = KeyCode.from_char(char)
 
+# Mouse event subscription flags. A MouseListener only processes the event
+# kinds included in its subscription mask.
+MOUSE_MOVE = 1
+MOUSE_CLICK = 2
+MOUSE_SCROLL = 4
+
+# Units reported by REL_WHEEL_HI_RES for a single wheel notch.
+_HI_RES_UNITS_PER_NOTCH = 120
+
 # Mapping from Linux button codes to pynput Button
 _LINUX_BUTTON_TO_PYNPUT_BUTTON = {
     272: Button.left,  # BTN_LEFT
@@ -230,6 +245,25 @@ _LINUX_BUTTON_TO_PYNPUT_BUTTON = {
 }
 
 
+def _event_timestamp(event) -> float:
+    """
+    Convert the kernel timestamp of a libevdev event to seconds since the
+    epoch.
+
+    evdev stamps events with CLOCK_REALTIME by default. If the stamp does not
+    look like wall clock time (e.g. the device was switched to a monotonic
+    clock), the time of receipt is used instead.
+    """
+    now = time.time()
+    try:
+        timestamp = event.sec + event.usec / 1_000_000
+    except Exception:
+        return now
+    if abs(now - timestamp) > _MAX_CLOCK_SKEW:
+        return now
+    return timestamp
+
+
 def _linux_key_to_pynput(linux_key_code: int) -> Key | KeyCode:
     """
     Convert a Linux key code to a pynput Key or KeyCode.
@@ -258,6 +292,115 @@ def _linux_button_to_pynput(linux_button_code: int) -> Optional[Button]:
     return _LINUX_BUTTON_TO_PYNPUT_BUTTON.get(int(linux_button_code))
 
 
+class _ScrollCoalescer:
+    """
+    Rate limits scroll events, folding notches that arrive faster than the
+    configured interval into the next event that is let through.
+
+    Notches absorbed at the end of a burst are flushed one interval after the
+    last emitted event through `on_flush`. Without a flush callback they are
+    discarded once they are older than the interval, so that a later scroll
+    is not reported together with the leftovers of a burst.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        on_flush: Optional[Callable[[int, float], None]] = None,
+    ) -> None:
+        """
+        Args:
+            interval: Minimum number of seconds between two emitted scroll
+                events. 0 lets every notch through.
+            on_flush: Called from a timer thread with the signed number of
+                notches and the time when absorbed notches are flushed.
+        """
+        self._interval = interval
+        self._on_flush = on_flush
+        self._pending = 0
+        self._last_emit = 0.0
+        self._last_feed = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def feed(self, notches: int, now: float) -> int:
+        """
+        Add wheel notches and return how many should be emitted now.
+
+        Args:
+            notches: Signed number of notches scrolled (positive is up).
+            now: The time of the scroll event in seconds.
+
+        Returns:
+            The signed number of coalesced notches to report, or 0 if the
+            event was absorbed by the rate limiter.
+        """
+        if notches == 0:
+            return 0
+        with self._lock:
+            # Notches left over from a burst that ended are not reported
+            # along with this one
+            if self._pending != 0 and now - self._last_feed >= self._interval:
+                self._pending = 0
+            # A change of direction discards notches pending the other way
+            if self._pending != 0 and (self._pending > 0) != (notches > 0):
+                self._pending = 0
+            self._pending += notches
+            self._last_feed = now
+            if now < self._last_emit + self._interval:
+                self._schedule_flush(now)
+                return 0
+            return self._take(now)
+
+    def flush(self, now: float) -> int:
+        """
+        Return the absorbed notches if the interval since the last emitted
+        event has passed.
+
+        Args:
+            now: The current time in seconds.
+
+        Returns:
+            The signed number of pending notches to report, or 0 if there
+            are none or they are not due yet.
+        """
+        with self._lock:
+            if self._pending == 0 or now < self._last_emit + self._interval:
+                return 0
+            return self._take(now)
+
+    def cancel(self) -> None:
+        """Stop a scheduled flush."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _take(self, now: float) -> int:
+        emitted = self._pending
+        self._pending = 0
+        self._last_emit = now
+        return emitted
+
+    def _schedule_flush(self, now: float) -> None:
+        if self._on_flush is None or self._timer is not None:
+            return
+        delay = max(0.0, self._last_emit + self._interval - now)
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            # Event times and the timer's clock may differ slightly, the
+            # flush is due by definition
+            now = max(time.time(), self._last_emit + self._interval)
+        notches = self.flush(now)
+        if notches != 0 and self._on_flush is not None:
+            self._on_flush(notches, now)
+
+
 class KeyboardListener:
     """
     Wrapper around pynput.keyboard.Listener that maintains identical signatures.
@@ -268,6 +411,7 @@ class KeyboardListener:
         self,
         on_press: Optional[Callable] = None,
         on_release: Optional[Callable] = None,
+        timestamps: bool = False,
         **kwargs: Any
     ):
         """
@@ -276,10 +420,15 @@ class KeyboardListener:
         Args:
             on_press: Callback function for key press events.
             on_release: Callback function for key release events.
+            timestamps: If True, callbacks receive the time at which the event
+                occurred (seconds since the epoch) as an extra trailing
+                argument. libevdev events carry the kernel timestamp; pynput
+                events are stamped on receipt.
             **kwargs: Additional keyword arguments passed to the underlying listener.
         """
         self._on_press = on_press
         self._on_release = on_release
+        self._timestamps = timestamps
         self._use_libevdev = _should_use_libevdev()
         self._running = False
         self._devices: list["Device"] = []
@@ -300,12 +449,23 @@ class KeyboardListener:
         
         if not self._use_libevdev:
             print("Using pynput for keyboard listener")
+            if timestamps:
+                on_press = self._stamp_on_press if on_press else None
+                on_release = self._stamp_on_release if on_release else None
             self._listener = PynputKeyboardListener(
                 on_press=on_press, on_release=on_release, **kwargs
             )
         else:
             self._listener = None
 
+    def _stamp_on_press(self, key) -> Any:
+        """Forward a pynput key press along with its time of receipt."""
+        return self._on_press(key, time.time())
+
+    def _stamp_on_release(self, key) -> Any:
+        """Forward a pynput key release along with its time of receipt."""
+        return self._on_release(key, time.time())
+
     def _libevdev_listener_loop(self, device: "Device") -> None:
         """Event loop for a single libevdev keyboard device."""
         while not self._stop_event.is_set():
@@ -320,12 +480,15 @@ class KeyboardListener:
                     
                     if event.type == libevdev.EV_KEY:
                         key = _linux_key_to_pynput(event.code)
+                        args = (key,)
+                        if self._timestamps:
+                            args = (key, _event_timestamp(event))
                         if event.value == 1:  # Key press
                             if self._on_press:
-                                self._on_press(key)
+                                self._on_press(*args)
                         elif event.value == 0:  # Key release
                             if self._on_release:
-                                self._on_release(key)
+                                self._on_release(*args)
                         else:
                             print(f"Unknown event value for keyboard device '{device.name}': {event.value}")
             except (OSError, IOError) as e:
@@ -398,6 +561,9 @@ class MouseListener:
         on_move: Optional[Callable] = None,
         on_click: Optional[Callable] = None,
         on_scroll: Optional[Callable] = None,
+        timestamps: bool = False,
+        subscriptions: Optional[int] = None,
+        scroll_interval: float = 0.0,
         **kwargs: Any
     ):
         """
@@ -407,11 +573,37 @@ class MouseListener:
             on_move: Callback function for mouse move events.
             on_click: Callback function for mouse click events.
             on_scroll: Callback function for mouse scroll events.
+            timestamps: If True, callbacks receive the time at which the event
+                occurred (seconds since the epoch) as an extra trailing
+                argument. libevdev events carry the kernel timestamp; pynput
+                events are stamped on receipt.
+            subscriptions: Mask of MOUSE_MOVE, MOUSE_CLICK and MOUSE_SCROLL
+                selecting which events are processed. Defaults to every event
+                kind that has a callback. Can be changed later with
+                set_subscriptions().
+            scroll_interval: Minimum number of seconds between two scroll
+                callbacks. Notches scrolled in between are coalesced into the
+                next callback, so dy may be larger than 1. Scroll deltas are
+                always reported in wheel notches, high resolution wheel
+                events are accumulated into whole notches.
             **kwargs: Additional keyword arguments passed to the underlying listener.
         """
         self._on_move = on_move
         self._on_click = on_click
         self._on_scroll = on_scroll
+        self._timestamps = timestamps
+        self._available = (
+            (MOUSE_MOVE if on_move else 0)
+            | (MOUSE_CLICK if on_click else 0)
+            | (MOUSE_SCROLL if on_scroll else 0)
+        )
+        self._subscriptions = self._available
+        if subscriptions is not None:
+            self._subscriptions = subscriptions & self._available
+        self._scroll = _ScrollCoalescer(scroll_interval, self._flush_scroll)
+        # Position of the last scroll event, reported with flushed notches
+        self._scroll_x = 0
+        self._scroll_y = 0
         self._use_libevdev = _should_use_libevdev()
         self._running = False
         self._devices: list["Device"] = []
@@ -437,13 +629,77 @@ class MouseListener:
         if not self._use_libevdev:
             print("Using pynput for mouse listener")
             self._listener = PynputMouseListener(
-                on_move=on_move, on_click=on_click, on_scroll=on_scroll, **kwargs
+                on_move=self._dispatch_move if on_move else None,
+                on_click=self._dispatch_click if on_click else None,
+                on_scroll=self._dispatch_scroll if on_scroll else None,
+                **kwargs
             )
         else:
             self._listener = None
 
+    @property
+    def subscriptions(self) -> int:
+        """The mask of mouse events currently being processed."""
+        return self._subscriptions
+
+    def set_subscriptions(self, subscriptions: int) -> None:
+        """
+        Change which mouse events are processed while the listener is running.
+
+        Event kinds without a callback are ignored. When MOUSE_MOVE is not
+        subscribed, pointer movement is not tracked at all, so the coordinates
+        reported to click and scroll callbacks on libevdev may be stale.
+
+        Args:
+            subscriptions: Mask of MOUSE_MOVE, MOUSE_CLICK and MOUSE_SCROLL.
+        """
+        self._subscriptions = subscriptions & self._available
+
+    def _dispatch_move(self, x, y) -> Any:
+        """Forward a pynput move event if movement is subscribed."""
+        if self._subscriptions & MOUSE_MOVE:
+            if self._timestamps:
+                return self._on_move(x, y, time.time())
+            return self._on_move(x, y)
+
+    def _dispatch_click(self, x, y, button, pressed) -> Any:
+        """Forward a pynput click event if clicks are subscribed."""
+        if self._subscriptions & MOUSE_CLICK:
+            if self._timestamps:
+                return self._on_click(x, y, button, pressed, time.time())
+            return self._on_click(x, y, button, pressed)
+
+    def _dispatch_scroll(self, x, y, dx, dy) -> Any:
+        """Forward a pynput scroll event if scrolling is subscribed."""
+        if self._subscriptions & MOUSE_SCROLL:
+            now = time.time()
+            # Some platforms report fractional deltas; count at least one
+            # notch in the direction of travel.
+            notches = int(dy) or (1 if dy > 0 else -1 if dy < 0 else 0)
+            self._scroll_x, self._scroll_y = x, y
+            notches = self._scroll.feed(notches, now)
+            if notches == 0:
+                return
+            if self._timestamps:
+                return self._on_scroll(x, y, dx, notches, now)
+            return self._on_scroll(x, y, dx, notches)
+
+    def _flush_scroll(self, notches: int, now: float) -> None:
+        """Report notches the rate limiter flushed after a burst ended."""
+        if not self._subscriptions & MOUSE_SCROLL:
+            return
+        stamp = (now,) if self._timestamps else ()
+        self._on_scroll(self._scroll_x, self._scroll_y, 0, notches, *stamp)
+
     def _libevdev_listener_loop(self, device: "Device") -> None:
         """Event loop for a single libevdev mouse device."""
+        # Devices with a high resolution wheel report every notch through
+        # both REL_WHEEL and REL_WHEEL_HI_RES. Only use one of the two.
+        try:
+            hi_res = bool(device.has(libevdev.EV_REL.REL_WHEEL_HI_RES))
+        except Exception:
+            hi_res = False
+        hi_res_remainder = 0
         while not self._stop_event.is_set():
             try:
                 # Use sync mode to read events
@@ -453,42 +709,61 @@ class MouseListener:
                         print(f"Stop event set for mouse device '{device.name}'")
                         break
                     
+                    # Read the mask once per event; it may be changed from
+                    # another thread through set_subscriptions().
+                    subscriptions = self._subscriptions
                     if event.type == libevdev.EV_KEY:
+                        if not subscriptions & MOUSE_CLICK:
+                            continue
                         # Mouse button event
                         button = _linux_button_to_pynput(event.code)
                         if button is not None:
                             pressed = event.value == 1
-                            if self._on_click:
-                                # Get current position with lock
-                                with self._position_lock:
-                                    x, y = self._last_x, self._last_y
-                                # pynput's on_click signature: (x, y, button, pressed)
-                                self._on_click(x, y, button, pressed)
+                            # Get current position with lock
+                            with self._position_lock:
+                                x, y = self._last_x, self._last_y
+                            stamp = (_event_timestamp(event),) if self._timestamps else ()
+                            # pynput's on_click signature: (x, y, button, pressed)
+                            self._on_click(x, y, button, pressed, *stamp)
                         else:
                             print(f"Unknown button code for mouse device '{device.name}': {event.code}")
                     elif event.type == libevdev.EV_REL:
-                        # Relative movement event
-                        with self._position_lock:
-                            if event.code == 0:  # REL_X
-                                self._last_x += event.value
-                                x, y = self._last_x, self._last_y
-                            elif event.code == 1:  # REL_Y
-                                self._last_y += event.value
+                        if event.code == 0 or event.code == 1:  # REL_X, REL_Y
+                            # Movement can arrive at 1000+ Hz, skip it entirely
+                            # (including position tracking) unless subscribed.
+                            if not subscriptions & MOUSE_MOVE:
+                                continue
+                            with self._position_lock:
+                                if event.code == 0:
+                                    self._last_x += event.value
+                                else:
+                                    self._last_y += event.value
                                 x, y = self._last_x, self._last_y
+                            stamp = (_event_timestamp(event),) if self._timestamps else ()
+                            self._on_move(x, y, *stamp)
+                        elif event.code == 8 or event.code == 11:
+                            if not subscriptions & MOUSE_SCROLL:
+                                continue
+                            if hi_res:
+                                if event.code != 11:  # REL_WHEEL_HI_RES
+                                    continue
+                                hi_res_remainder += event.value
+                                notches = int(hi_res_remainder / _HI_RES_UNITS_PER_NOTCH)
+                                hi_res_remainder -= notches * _HI_RES_UNITS_PER_NOTCH
                             else:
+                                if event.code != 8:  # REL_WHEEL
+                                    continue
+                                notches = event.value
+                            timestamp = _event_timestamp(event)
+                            with self._position_lock:
                                 x, y = self._last_x, self._last_y
-                            
-                            if event.code == 0 or event.code == 1:
-                                # Movement event
-                                if self._on_move:
-                                    self._on_move(x, y)
-                            elif event.code == 8:  # REL_WHEEL
-                                if self._on_scroll:
-                                    # pynput's on_scroll signature: (x, y, dx, dy)
-                                    self._on_scroll(x, y, 0, event.value)
-                            elif event.code == 11:  # REL_WHEEL_HI_RES
-                                if self._on_scroll:
-                                    self._on_scroll(x, y, 0, event.value)
+                            self._scroll_x, self._scroll_y = x, y
+                            notches = self._scroll.feed(notches, timestamp)
+                            if notches == 0:
+                                continue
+                            stamp = (timestamp,) if self._timestamps else ()
+                            # pynput's on_scroll signature: (x, y, dx, dy)
+                            self._on_scroll(x, y, 0, notches, *stamp)
             except (OSError, IOError) as e:
                 # If there's an error reading events (e.g., device disconnected), break
                 print(f"Error reading from mouse device '{device.name}': {e}")
@@ -521,6 +796,7 @@ class MouseListener:
 
     def stop(self) -> None:
         """Stop the listener."""
+        self._scroll.cancel()
         if self._use_libevdev:
             self._running = False
             self._stop_event.set()
@@ -3,25 +3,33 @@ import os
 import json
 import sys
 
+from importlib.util import find_spec
+
 # import warnings
 
 from sys import platform
 
 LINUX = platform.lower().startswith("linux")
 WIN32 = platform.lower().startswith("win")
+# Application rules are applied on Windows and in Linux X11 sessions, the
+# focused application can not be detected under Wayland
+RULES = WIN32
+if LINUX:
+    from keyboardsounds import app_detector_linux
+
+    RULES = app_detector_linux.is_supported()
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
-import pygame
 
 if not getattr(sys, "frozen", False):
-    from importlib.metadata import version
+    from importlib.metadata import PackageNotFoundError, version
 
 from keyboardsounds.root import get_root
 
 from keyboardsounds.daemon_manager import DaemonManager
 
 from keyboardsounds.profile import Profile
-from keyboardsounds.profile_builder import CliProfileBuilder
+from keyboardsounds.compiled_profile import compile_profile
 
 from keyboardsounds.app_rules import Action, GlobalAction
 from keyboardsounds.app_rules import get_rules
@@ -36,7 +44,11 @@ def main():
     # Work around to get pygame to load mp3 files on windows
     # see https://github.com/pygame/pygame/issues/2647
     if os.name == "nt":
-        os.add_dll_directory(pygame.__path__[0])
+        # Locate pygame without importing it, it is only imported by the
+        # daemon process
+        pygame_spec = find_spec("pygame")
+        if pygame_spec is not None and pygame_spec.submodule_search_locations:
+            os.add_dll_directory(list(pygame_spec.submodule_search_locations)[0])
 
     dm = DaemonManager(lock_file=None, one_shot=True)
     if dm.capture_oneshot():
@@ -99,13 +111,17 @@ def main():
         except Exception:
             version_number = "unknown"
     else:
-        version_number = version("keyboardsounds")
+        try:
+            version_number = version("keyboardsounds")
+        except PackageNotFoundError:
+            # Running from a source checkout that is not installed
+            version_number = "unknown"
 
     win_messages = ""
-    if WIN32:
+    if RULES:
         win_messages = (
             f"  manage rules:{os.linesep * 2}"
-            f"    %(prog)s <ar|add-rule> -r <rule> -a <app>{os.linesep}"
+            f"    %(prog)s <ar|add-rule> -r <rule> -a <app> [-p <profile>] [-m <mouse_profile>]{os.linesep}"
             f"    %(prog)s <rr|remove-rule> -a <app>{os.linesep}"
             f"    %(prog)s <lr|list-rules> [-s]{os.linesep}"
             f"    %(prog)s <sr|set-global-rule> -r <rule>{os.linesep}"
@@ -116,7 +132,7 @@ def main():
         (
             f"usage: %(prog)s <action> [params]{os.linesep *2}"
             f"  manage daemon:{os.linesep * 2}"
-            f"    %(prog)s start [-v <volume>] [-p <profile>] [-m <mouse_profile>] [-c '<lower_semitone>,<upper_semitone>'] [-k <keyboard|mouse|both>] [-D] [-w]{os.linesep}"
+            f"    %(prog)s start [-v <volume>] [-p <profile>] [-m <mouse_profile>] [-c '<lower_semitone>,<upper_semitone>'] [-k <keyboard|mouse|both>] [-b <pygame|software|null|wav>] [-o <wav_file>] [-D] [-w]{os.linesep}"
             f"    %(prog)s stop{os.linesep}"
             f"    %(prog)s status [-s]{os.linesep * 2}"
             f"  manage profiles:{os.linesep * 2}"
@@ -125,7 +141,8 @@ def main():
             f"    %(prog)s <rp|remove-profile> -n <profile>{os.linesep}"
             f"    %(prog)s <lp|list-profiles> [-s] [--remote] [-t <device_type>]{os.linesep}"
             f"    %(prog)s <dp|download-profile> -n <profile>{os.linesep}"
-            f"    %(prog)s <ex|export-profile> -n <profile> -o <zip_file>{os.linesep * 2}"
+            f"    %(prog)s <ex|export-profile> -n <profile> -o <zip_file>{os.linesep}"
+            f"    %(prog)s <cp|compile-profile> [-n <profile>]{os.linesep * 2}"
             f"    %(prog)s <bp|build-profile> -d <sound_dir> -o <zip_file>{os.linesep * 2}"
         )
         + win_messages
@@ -194,6 +211,15 @@ def main():
         metavar="pitch_shift_profile",
         help="pitch shift profile to use for random pitch shift, in the format of 'both', 'keyboard', or 'mouse'.",
     )
+    parser.add_argument(
+        "-b",
+        "--backend",
+        type=str,
+        choices=["pygame", "software", "null", "wav"],
+        default="pygame",
+        metavar="backend",
+        help="audio output to play sounds through: 'pygame' (default), 'software', which mixes sounds with NumPy into a single low latency stream, 'null', which only counts and times plays, or 'wav', which captures the software mix to the file given with -o",
+    )
 
     # Status Action
     parser.add_argument(
@@ -251,18 +277,18 @@ def main():
         type=str,
         default=None,
         metavar="file",
-        help="path to the zip file to create",
+        help="path to the zip file to create, or the WAV file to capture to with kbs start -b wav",
     )
 
     # Rules
-    if WIN32:
+    if RULES:
         parser.add_argument(
             "-a",
             "--app",
             type=str,
             default=None,
             metavar="app",
-            help="absolute path to the application to add the rule for",
+            help="absolute path to the application to add the rule for, a directory ending in a path separator or a glob pattern",
         )
         parser.add_argument(
             "-r",
@@ -270,7 +296,7 @@ def main():
             type=str,
             default=None,
             metavar="rule",
-            help="rule to apply. must be one of 'enable', 'disable', or 'exclusive'",
+            help="rule to apply. must be one of 'enable', 'disable', 'exclusive' or 'profile'. the 'profile' rule uses the profiles given with -p and -m",
         )
 
     # If no arguments provided, show help instead of error
@@ -320,6 +346,14 @@ def main():
                 "Error: You must provide at least one profile (-p for keyboard, -m for mouse)."
             )
             return
+        if args.backend in ("software", "wav") and find_spec("numpy") is None:
+            print(
+                f"Error: The {args.backend} backend requires NumPy, install it with 'pip install numpy'."
+            )
+            return
+        if args.backend == "wav" and args.output is None:
+            print("Error: You must provide the WAV file to capture to with -o.")
+            return
         if not dm.try_start(
             volume=args.volume,
             profile=args.profile,
@@ -328,6 +362,10 @@ def main():
             semitones=args.semitones,
             pitch_shift_profile=args.pitch_shift_profile,
             mouse_profile=args.mouse_profile,
+            backend=args.backend,
+            output_path=(
+                os.path.abspath(args.output) if args.backend == "wav" else None
+            ),
         ):
             print("Failed to start.")
             return
@@ -356,7 +394,7 @@ def main():
                     "author": profile["author"],
                     "description": profile["description"],
                 }
-                for profile in [profile.metadata() for profile in Profile.list()]
+                for profile in Profile.list_metadata()
             ],
             "status": json.loads(dm.status(full=False, short=True)),
         }
@@ -421,7 +459,7 @@ def main():
                     )
                 print(os.linesep)
         else:
-            profiles = [profile.metadata() for profile in Profile.list()]
+            profiles = Profile.list_metadata()
             if args.device_type is not None:
                 profiles = [
                     p
@@ -483,6 +521,8 @@ def main():
             )
             return
 
+        from keyboardsounds.profile_builder import CliProfileBuilder
+
         builder = CliProfileBuilder(args.directory, args.output)
         builder.start()
     elif args.action == "download-profile" or args.action == "dp":
@@ -490,9 +530,9 @@ def main():
             print("Please specify a name for the remote profile to download.")
             return
 
-        existing = Profile.list()
+        existing = Profile.list_metadata()
         for profile in existing:
-            if profile.metadata()["name"] == args.name:
+            if profile["name"] == args.name:
                 print(f"Profile '{args.name}' already exists.")
                 return
 
@@ -506,19 +546,27 @@ def main():
     elif args.action == "export-profile" or args.action == "ex":
         Profile.export_profile(args.name, args.output)
         return
+    elif args.action == "compile-profile" or args.action == "cp":
+        names = (
+            [args.name]
+            if args.name is not None
+            else [profile.name for profile in Profile.list()]
+        )
+        for name in names:
+            try:
+                if compile_profile(name):
+                    print(f"Compiled profile '{name}'.")
+                else:
+                    print(f"Profile '{name}' is already up to date.")
+            except Exception as e:
+                print(f"Unable to compile profile '{name}': {e}")
+        return
     # Rules are only available on windows
-    elif WIN32 and (args.action == "list-rules" or args.action == "lr"):
+    elif RULES and (args.action == "list-rules" or args.action == "lr"):
         rules = get_rules()
 
         if args.short:
-            print(
-                json.dumps(
-                    [
-                        {"app_path": rule.app_path, "action": rule.action.value}
-                        for rule in rules.rules
-                    ]
-                )
-            )
+            print(json.dumps([rule.to_dict() for rule in rules.rules]))
             return
 
         print(f"Keyboard Sounds v{version_number} - Application Rules{os.linesep}")
@@ -540,14 +588,18 @@ def main():
             print("")
             print(f" - Application : {rule.app_path}")
             print(f"   Action      : {rule.action.value.upper()}")
+            if rule.profile is not None:
+                print(f"   Profile     : {rule.profile}")
+            if rule.mouse_profile is not None:
+                print(f"   Mouse       : {rule.mouse_profile}")
         print("")
-    elif WIN32 and (args.action == "add-rule" or args.action == "ar"):
+    elif RULES and (args.action == "add-rule" or args.action == "ar"):
         if args.app is None:
             print("Please specify an application to add the rule for.")
             return
         if args.rule is None:
             print(
-                "Please specify a rule to apply. Must be one of 'enable', 'disable', or 'exclusive'."
+                "Please specify a rule to apply. Must be one of 'enable', 'disable', 'exclusive' or 'profile'."
             )
             return
 
@@ -558,8 +610,11 @@ def main():
             Action.ENABLE.value,
             Action.DISABLE.value,
             Action.EXCLUSIVE.value,
+            Action.PROFILE.value,
         ]:
-            print("Invalid rule. Must be one of 'enable', 'disable', or 'exclusive'.")
+            print(
+                "Invalid rule. Must be one of 'enable', 'disable', 'exclusive' or 'profile'."
+            )
             return
         if args.rule.lower() == Action.EXCLUSIVE.value:
             if rules.has_exclusive_rule():
@@ -567,13 +622,37 @@ def main():
                     "Exclusive rule already exists. Only one exclusive rule can be set."
                 )
                 return
-        rules.set_rule(args.app, Action(args.rule))
+        profile = None
+        mouse_profile = None
+        if args.rule == Action.PROFILE.value:
+            if args.profile is None and args.mouse_profile is None:
+                print(
+                    "Please specify the profiles to use for the application with -p and/or -m."
+                )
+                return
+            for name, device in [
+                (args.profile, "keyboard"),
+                (args.mouse_profile, "mouse"),
+            ]:
+                if name is None:
+                    continue
+                try:
+                    profile_device = Profile(name).value("profile.device") or "keyboard"
+                except ValueError as err:
+                    print(f"Error: {err}")
+                    return
+                if profile_device != device:
+                    print(f"Error: '{name}' is a '{profile_device}' profile.")
+                    return
+            profile = args.profile
+            mouse_profile = args.mouse_profile
+        rules.set_rule(args.app, Action(args.rule), profile, mouse_profile)
         try:
             rules.save()
             print(f"Rule '{args.rule.upper()}' added for {args.app}.")
         except Exception as e:
             print(f"Failed to save rules: {e}")
-    elif WIN32 and (args.action == "remove-rule" or args.action == "rr"):
+    elif RULES and (args.action == "remove-rule" or args.action == "rr"):
         if args.app is None:
             print("Please specify an application to remove the rule for.")
             return
@@ -589,7 +668,7 @@ def main():
             print(f"Rule removed for {args.app}.")
         except Exception as e:
             print(f"Failed to save rules: {e}")
-    elif WIN32 and (args.action == "set-global-rule" or args.action == "sr"):
+    elif RULES and (args.action == "set-global-rule" or args.action == "sr"):
         if args.rule is None:
             print(
                 "Please specify a rule to apply. Must be one of 'enable' or 'disable'."
@@ -616,7 +695,7 @@ def main():
             return
 
         print(f"Global rule set to '{args.rule.upper()}'.")
-    elif WIN32 and (args.action == "get-global-rule" or args.action == "gr"):
+    elif RULES and (args.action == "get-global-rule" or args.action == "gr"):
         rules = get_rules()
         if args.short:
             print(json.dumps({"global_action": rules.global_action.value}))
@@ -0,0 +1,85 @@
+import threading
+
+from collections import deque
+from typing import Deque, Dict
+
+
+class Metrics:
+    def __init__(self, window: int = 1024) -> None:
+        """
+        Initializes a thread-safe collection of counters and timing samples.
+
+        Parameters:
+        - window (int): The number of most recent samples kept for each timing
+                        when computing percentiles.
+        """
+        self.__lock = threading.Lock()
+        self.__window = window
+        self.__counters: Dict[str, int] = {}
+        self.__timings: Dict[str, Deque[float]] = {}
+        self.__timing_totals: Dict[str, int] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        Increments a named counter.
+
+        Parameters:
+        - name (str): The name of the counter.
+        - amount (int): The amount to add to the counter. Defaults to 1.
+        """
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Records a timing sample.
+
+        Parameters:
+        - name (str): The name of the timing.
+        - value (float): The sample, in milliseconds.
+        """
+        with self.__lock:
+            samples = self.__timings.get(name)
+            if samples is None:
+                samples = deque(maxlen=self.__window)
+                self.__timings[name] = samples
+            samples.append(value)
+            self.__timing_totals[name] = self.__timing_totals.get(name, 0) + 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns a JSON serializable summary of all counters and timings.
+
+        Each timing is summarized over its most recent samples as the count,
+        mean, p50, p95 and max values in milliseconds, along with the total
+        number of samples ever recorded.
+        """
+        with self.__lock:
+            counters = dict(self.__counters)
+            timings = {
+                name: (sorted(samples), self.__timing_totals[name])
+                for name, samples in self.__timings.items()
+            }
+
+        summary = {}
+        for name, (samples, total) in timings.items():
+            if len(samples) == 0:
+                continue
+            summary[name] = {
+                "total": total,
+                "count": len(samples),
+                "mean": round(sum(samples) / len(samples), 3),
+                "p50": round(samples[int(0.50 * (len(samples) - 1))], 3),
+                "p95": round(samples[int(0.95 * (len(samples) - 1))], 3),
+                "max": round(samples[-1], 3),
+            }
+        return {"counters": counters, "timings": summary}
+
+    def reset(self) -> None:
+        """
+        Clears all counters and timing samples.
+        """
+        with self.__lock:
+            self.__counters.clear()
+            self.__timings.clear()
+            self.__timing_totals.clear()
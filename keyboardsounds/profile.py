@@ -1,19 +1,23 @@
 import os
+import json
 import yaml
 import zipfile
 import shutil
 import tempfile
-import requests
 
 from keyboardsounds.root import get_root
 
 from keyboardsounds.path_resolver import PathResolver
 from keyboardsounds.profile_validation import validate_profile
-from keyboardsounds.profile_builder import CliProfileBuilder
+from keyboardsounds.compiled_profile import load_compiled_profile
 
 PROFILES_REMOTE_URL = "https://api.github.com/repos/nathan-fiscaletti/keyboardsounds/contents/keyboardsounds/profiles?ref=master"
 PROFILE_REMOTE_URL = "https://api.github.com/repos/nathan-fiscaletti/keyboardsounds/contents/keyboardsounds/profiles/{name}?ref=master"
 PROFILE_DETAIL_URL = "https://raw.githubusercontent.com/nathan-fiscaletti/keyboardsounds/master/keyboardsounds/profiles/{name}/profile.yaml"
+PROFILE_INDEX_FILE = ".profile_index.json"
+
+# Use the libyaml backed loader when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def OneShotProfile(press_sound: str | None = None, release_sound: str | None = None):
@@ -32,14 +36,20 @@ class Profile(PathResolver):
         one_shot: bool = False,
         one_shot_press_sound: str | None = None,
         one_shot_release_sound: str | None = None,
+        compiled=None,
     ):
         super().__init__(os.path.join(get_root(), "profiles", name))
 
         self.name = name
+        self.compiled = compiled
         self.__one_shot = one_shot
         self.__one_shot_press_sound = one_shot_press_sound
         self.__one_shot_release_sound = one_shot_release_sound
-        self.__validate()
+        if compiled is not None:
+            # Compiled bundles contain data that was validated at compile time
+            self.__data = compiled.data
+        else:
+            self.__validate()
 
     def __validate(self):
 
@@ -65,7 +75,7 @@ class Profile(PathResolver):
             )
 
         with open(self.get_child("profile.yaml").get_path(), "r") as f:
-            data = yaml.safe_load(f)
+            data = yaml.load(f, Loader=YAML_LOADER)
             self.__data = validate_profile(self, data)
 
     def value(self, key: str):
@@ -105,9 +115,27 @@ class Profile(PathResolver):
         }
 
     def export(self, output: str):
+        from keyboardsounds.profile_builder import CliProfileBuilder
+
         # export profile to zip file
         CliProfileBuilder(self.root, output).save()
 
+    @classmethod
+    def load(cls, name: str):
+        """
+        Loads a profile, using its compiled bundle when one exists.
+
+        Parameters:
+        - name (str): The name of the profile.
+
+        Returns:
+        - Profile: The loaded profile.
+        """
+        compiled = load_compiled_profile(name)
+        if compiled is not None:
+            return Profile(name, compiled=compiled)
+        return Profile(name)
+
     @classmethod
     def list(cls):
         names = [
@@ -125,6 +153,59 @@ class Profile(PathResolver):
             for name in names
         ]
 
+    @classmethod
+    def list_metadata(cls):
+        """
+        Lists the metadata of all installed profiles.
+
+        Metadata is read from an index stored in the root directory. Only
+        profiles whose profile.yaml changed size or modification time since
+        the index was written are loaded and validated again, after which the
+        index is updated.
+
+        Returns:
+        - list: The metadata of each profile, as returned by `metadata()`.
+
+        Raises:
+        - ValueError: If a profile that has to be loaded is invalid.
+        """
+        index_path = os.path.join(get_root(), PROFILE_INDEX_FILE)
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+        updated = {}
+        for entry in os.scandir(os.path.join(get_root(), "profiles")):
+            if not entry.is_dir():
+                continue
+            try:
+                stat = os.stat(os.path.join(entry.path, "profile.yaml"))
+                key = [stat.st_mtime_ns, stat.st_size]
+            except OSError:
+                key = None
+
+            cached = index.get(entry.name)
+            if key is not None and cached is not None and cached["key"] == key:
+                updated[entry.name] = cached
+            else:
+                metadata = Profile(entry.name).metadata()
+                updated[entry.name] = {"key": key, "metadata": metadata}
+
+        if updated != index:
+            # Write atomically so concurrent invocations never read a
+            # partially written index
+            tmp_path = f"{index_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump(updated, f)
+                os.replace(tmp_path, index_path)
+            except OSError:
+                pass
+
+        return [entry["metadata"] for entry in updated.values()]
+
     @classmethod
     def remove_profile(cls, name: str):
         output_path = os.path.join(get_root(), "profiles", name)
@@ -136,6 +217,8 @@ class Profile(PathResolver):
 
     @classmethod
     def list_remote_profiles(cls):
+        import requests
+
         response = requests.get(PROFILES_REMOTE_URL)
         if response.status_code != 200:
             raise ValueError("Failed to fetch remote profiles.")
@@ -148,7 +231,7 @@ class Profile(PathResolver):
             if response.status_code != 200:
                 raise ValueError(f"Failed to fetch remote profile '{profile_name}'.")
             # parse the yaml file
-            profile_data = yaml.safe_load(response.text)
+            profile_data = yaml.load(response.text, Loader=YAML_LOADER)
             prof = profile_data["profile"]
             if "device" not in prof:
                 prof["device"] = "keyboard"
@@ -157,6 +240,8 @@ class Profile(PathResolver):
 
     @classmethod
     def download_profile(cls, name: str):
+        import requests
+
         print(f"Retrieving meta-data for profile '{name}'...")
         response = requests.get(PROFILE_REMOTE_URL.format(name=name))
         if response.status_code != 200:
@@ -207,7 +292,7 @@ class Profile(PathResolver):
         profile_data = None
         if os.path.isfile(os.path.join(tmpdir, "profile.yaml")):
             with open(os.path.join(tmpdir, "profile.yaml"), "r") as f:
-                profile_data = yaml.safe_load(f)
+                profile_data = yaml.load(f, Loader=YAML_LOADER)
 
         if (
             not profile_data
@@ -1,6 +1,7 @@
 import os
 
 from keyboardsounds.path_resolver import PathResolver
+from keyboardsounds.source_selection import SELECTION_STRATEGIES
 from typing import Any
 
 VALID_PROFILE_TYPES = ["video-extract", "files"]
@@ -8,6 +9,9 @@ SUPPORTED_AUDIO_FORMATS = [".wav", ".mp3", ".WAV", ".MP3"]
 SUPPORTED_VIDEO_FORMATS = [".mp4", ".MP4"]
 VALID_DEVICES = ["keyboard", "mouse"]
 SUPPORTED_MOUSE_BUTTONS = ["left", "right", "middle"]
+# Scroll wheel inputs. These can only be mapped through 'buttons.other', they
+# never fall back to 'buttons.default' or to a random source.
+SUPPORTED_MOUSE_SCROLL = ["scroll_up", "scroll_down"]
 
 
 def validate_profile(path_resolver: PathResolver, data: dict):
@@ -62,6 +66,12 @@ def __validate_meta_data(path_resolver: PathResolver, data: dict) -> dict:
     else:
         data["profile"]["device"] = "keyboard"
 
+    if "selection" in data["profile"]:
+        if data["profile"]["selection"] not in SELECTION_STRATEGIES:
+            raise ValueError(
+                f"Profile '{name}' is corrupted. Invalid 'selection' in profile.yaml. Must be one of {SELECTION_STRATEGIES}."
+            )
+
     if "author" in data["profile"]:
         if type(data["profile"]["author"]) != str:
             raise ValueError(
@@ -118,6 +128,11 @@ def __validate_source(path_resolver: PathResolver, name: str, data: dict, source
         raise ValueError(
             f"Profile '{name}' is corrupted. Missing 'id' one or more source in profile.yaml."
         )
+    if "weight" in source:
+        if type(source["weight"]) not in [int, float] or source["weight"] <= 0:
+            raise ValueError(
+                f"Profile '{name}' is corrupted. Invalid 'weight' in one or more sources in profile.yaml. Must be a number greater than 0."
+            )
 
     if data["profile"]["type"] == "files":
         if "source" not in source:
@@ -266,7 +281,7 @@ def __validate_key(path_resolver: PathResolver, name: str, data: dict, key: Any)
             __validate_source_ref(path_resolver, name, data, source_ref)
     else:
         __validate_source_ref(path_resolver, name, data, key["sound"])
-    pass
+    __validate_selection(name, key, "keys.other")
 
 
 def __validate_button_map(
@@ -289,6 +304,7 @@ def __validate_button_map(
             __validate_source_ref(path_resolver, name, data, source_ref)
     else:
         __validate_source_ref(path_resolver, name, data, button_map["sound"])
+    __validate_selection(name, button_map, "buttons.other")
     if "buttons" in button_map:
         if type(button_map["buttons"]) != list:
             raise ValueError(
@@ -300,12 +316,19 @@ def __validate_button_map(
                 raise ValueError(
                     f"Profile '{name}' is corrupted. Invalid button name in buttons.other mapping in profile.yaml."
                 )
-            if b not in SUPPORTED_MOUSE_BUTTONS:
+            if b not in SUPPORTED_MOUSE_BUTTONS + SUPPORTED_MOUSE_SCROLL:
                 raise ValueError(
                     f"Profile '{name}' is corrupted. Unsupported mouse button '{b}' in buttons.other mapping in profile.yaml."
                 )
 
 
+def __validate_selection(name: str, mapping: dict, section: str):
+    if "selection" in mapping and mapping["selection"] not in SELECTION_STRATEGIES:
+        raise ValueError(
+            f"Profile '{name}' is corrupted. Invalid 'selection' in one or more {section} entries in profile.yaml. Must be one of {SELECTION_STRATEGIES}."
+        )
+
+
 def __validate_source_ref(
     path_resolver: PathResolver, name: str, data: dict, source_ref: Any
 ):
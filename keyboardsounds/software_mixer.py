@@ -0,0 +1,323 @@
+import io
+import time
+import wave
+import threading
+
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None  # type: ignore
+
+from pydub import AudioSegment
+
+from keyboardsounds.audio_manager import to_wav_bytes
+from keyboardsounds.audio_output import AudioOutput
+
+# Sample rate and channel count of the output stream.
+FREQUENCY = 44100
+CHANNELS = 2
+# Frames per buffer. pygame.mixer defaults to 512 frames, a smaller buffer
+# shortens the time between a play() call and the sound reaching the device.
+BUFFER_SIZE = 256
+MAX_VOICES = 32
+# Level above which soft clipping starts to saturate the mix, samples below
+# it are left unchanged.
+SOFT_CLIP_KNEE = 0.9
+
+
+def is_available() -> bool:
+    """
+    Checks whether the software mixer can be used.
+
+    Returns:
+    - bool: True if NumPy is installed.
+    """
+    return np is not None
+
+
+class SoftwareMixer(AudioOutput):
+    def __init__(
+        self,
+        frequency: int = FREQUENCY,
+        buffer_size: int = BUFFER_SIZE,
+        max_voices: int = MAX_VOICES,
+        soft_clip: bool = False,
+    ) -> None:
+        """
+        Mixes the active voices with NumPy into a single SDL audio stream.
+
+        Clips are decoded once to stereo float32 arrays at the stream's
+        sample rate. Every voice has its own gain and pan, and the sum of the
+        voices is written straight into the buffer SDL hands to the audio
+        callback, so mixing a buffer allocates nothing.
+
+        Parameters:
+        - frequency (int): The sample rate of the output stream.
+        - buffer_size (int): The number of frames per buffer.
+        - max_voices (int): The number of voices that can play at once.
+        - soft_clip (bool): Whether to saturate the peaks of the mix above
+                            SOFT_CLIP_KNEE with tanh, which rounds off
+                            voices adding up past full scale, instead of
+                            hard clipping it. Samples below the knee are
+                            never changed.
+
+        Raises:
+        - ValueError: If NumPy is not installed.
+        """
+        if np is None:
+            raise ValueError(
+                "The software mixer requires NumPy, install it with 'pip install numpy'."
+            )
+        self.frequency = frequency
+        self.buffer_size = buffer_size
+        self.soft_clip = soft_clip
+        self.__lock = threading.Lock()
+        self.__device = None
+
+        # Voice slots, a slot is free when its clip is None
+        self.__clips: List[Optional["np.ndarray"]] = [None] * max_voices
+        self.__devices: List[Optional[str]] = [None] * max_voices
+        self.__positions = [0] * max_voices
+        self.__gains = np.zeros((max_voices, CHANNELS), dtype=np.float32)
+        self.__pans = np.zeros(max_voices, dtype=np.float32)
+        self.__next = 0
+
+        # Scratch buffer for a single voice, grown if SDL asks for a larger
+        # buffer than requested
+        self.__scratch = np.zeros((buffer_size, CHANNELS), dtype=np.float32)
+
+    def open(self) -> None:
+        """
+        Opens the output stream on the first audio output device and starts
+        calling back into the mixer.
+        """
+        import pygame._sdl2 as sdl2
+        from pygame._sdl2 import audio
+
+        sdl2.init_subsystem(sdl2.INIT_AUDIO)
+        names = audio.get_audio_device_names(False)
+        if len(names) == 0:
+            raise ValueError("No audio output device is available.")
+        # No changes are allowed, SDL converts the stream to the device's
+        # format if it differs
+        self.__device = audio.AudioDevice(
+            devicename=names[0],
+            iscapture=False,
+            frequency=self.frequency,
+            audioformat=audio.AUDIO_F32,
+            numchannels=CHANNELS,
+            chunksize=self.buffer_size,
+            allowed_changes=0,
+            callback=self.__callback,
+        )
+        self.__device.pause(0)
+
+    def close(self) -> None:
+        """
+        Closes the output stream and stops every voice.
+        """
+        if self.__device is not None:
+            self.__device.pause(1)
+            self.__device.close()
+            self.__device = None
+        with self.__lock:
+            for i in range(len(self.__clips)):
+                self.__clips[i] = None
+                self.__devices[i] = None
+
+    def load(self, sound) -> "np.ndarray":
+        """
+        Decodes a clip for playback.
+
+        Parameters:
+        - sound: A file-like object or bytes holding the clip in any format
+                 ffmpeg can decode.
+
+        Returns:
+        - np.ndarray: The clip as float32 frames of shape (frames, 2) at the
+                      stream's sample rate.
+        """
+        if hasattr(sound, "read"):
+            sound.seek(0)
+            data = sound.read()
+            sound.seek(0)
+        else:
+            data = bytes(sound)
+        if not (data[0:4] == b"RIFF" and data[8:12] == b"WAVE"):
+            data = to_wav_bytes(data)
+
+        segment = (
+            AudioSegment.from_wav(io.BytesIO(data))
+            .set_frame_rate(self.frequency)
+            .set_channels(CHANNELS)
+            .set_sample_width(2)
+        )
+        samples = np.frombuffer(segment.raw_data, dtype=np.int16)
+        clip = samples.reshape(-1, CHANNELS).astype(np.float32)
+        clip *= 1.0 / 32768.0
+        return clip
+
+    def play(self, clip, device: str, gain: float, pan: float = 0.0) -> bool:
+        """
+        Starts a voice playing a clip. The voice is mixed into the next
+        buffer the device requests.
+
+        Parameters:
+        - clip (np.ndarray): A clip returned by load().
+        - device (str): Either 'keyboard' or 'mouse'.
+        - gain (float): The gain of the voice, between 0.0 and 1.0.
+        - pan (float): The position of the voice, from -1.0 (left) to 1.0
+                       (right).
+
+        Returns:
+        - bool: True if the clip is playing, False if every voice is busy.
+        """
+        with self.__lock:
+            count = len(self.__clips)
+            for offset in range(count):
+                index = (self.__next + offset) % count
+                if self.__clips[index] is None:
+                    self.__next = (index + 1) % count
+                    self.__pans[index] = pan
+                    self.__set_gain(index, gain)
+                    self.__positions[index] = 0
+                    self.__devices[index] = device
+                    self.__clips[index] = clip
+                    return True
+        return False
+
+    def set_gains(self, gains: Dict[str, float]) -> None:
+        """
+        Applies new gains to the voices that are still playing, starting
+        with the next buffer.
+
+        Parameters:
+        - gains (Dict[str, float]): The gain for each device.
+        """
+        with self.__lock:
+            for index, device in enumerate(self.__devices):
+                if device is not None:
+                    self.__set_gain(index, gains[device])
+
+    def busy(self) -> bool:
+        """
+        Returns:
+        - bool: True if any voice is playing.
+        """
+        with self.__lock:
+            return any(clip is not None for clip in self.__clips)
+
+    def mix(self, out: "np.ndarray") -> None:
+        """
+        Mixes the next buffer of every active voice into an output buffer,
+        advancing the voices and freeing the ones that finished.
+
+        Parameters:
+        - out (np.ndarray): A float32 buffer of shape (frames, 2), it is
+                            overwritten with the mix.
+        """
+        frames = out.shape[0]
+        if self.__scratch.shape[0] < frames:
+            self.__scratch = np.zeros((frames, CHANNELS), dtype=np.float32)
+        out.fill(0.0)
+        with self.__lock:
+            for index, clip in enumerate(self.__clips):
+                if clip is None:
+                    continue
+                position = self.__positions[index]
+                count = min(frames, clip.shape[0] - position)
+                scratch = self.__scratch[:count]
+                np.multiply(
+                    clip[position : position + count], self.__gains[index], out=scratch
+                )
+                np.add(out[:count], scratch, out=out[:count])
+                position += count
+                if position >= clip.shape[0]:
+                    self.__clips[index] = None
+                    self.__devices[index] = None
+                else:
+                    self.__positions[index] = position
+        if self.soft_clip:
+            self.__saturate(out)
+        else:
+            np.clip(out, -1.0, 1.0, out=out)
+
+    def __saturate(self, out: "np.ndarray") -> None:
+        # Only the samples above the knee are bent towards full scale, so a
+        # mix that never reaches the knee passes through unchanged
+        magnitude = self.__scratch[: out.shape[0]]
+        np.abs(out, out=magnitude)
+        if magnitude.max(initial=0.0) <= SOFT_CLIP_KNEE:
+            return
+        peaks = magnitude > SOFT_CLIP_KNEE
+        headroom = 1.0 - SOFT_CLIP_KNEE
+        out[peaks] = np.sign(out[peaks]) * (
+            SOFT_CLIP_KNEE
+            + headroom * np.tanh((magnitude[peaks] - SOFT_CLIP_KNEE) / headroom)
+        )
+
+    def __set_gain(self, index: int, gain: float) -> None:
+        # Balance panning, a centered voice plays at full gain on both sides
+        pan = float(self.__pans[index])
+        self.__gains[index, 0] = gain * min(1.0, 1.0 - pan)
+        self.__gains[index, 1] = gain * min(1.0, 1.0 + pan)
+
+    def __callback(self, audio_device, stream: memoryview) -> None:
+        # Called from SDL's audio thread with the buffer to fill
+        self.mix(np.frombuffer(stream, dtype=np.float32).reshape(-1, CHANNELS))
+
+
+class WavCapture(SoftwareMixer):
+    def __init__(self, path: str, **kwargs) -> None:
+        """
+        Renders the mix to a WAV file instead of an audio device.
+
+        A clock thread mixes one buffer per buffer period, so plays land in
+        the file at the time they happened and the file holds exactly what
+        the software mixer would have sent to the device, as 16-bit PCM.
+
+        Parameters:
+        - path (str): The WAV file to write, replaced if it exists.
+        - kwargs: Passed on to SoftwareMixer.
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.__file: Optional[wave.Wave_write] = None
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+
+    def open(self) -> None:
+        self.__file = wave.open(self.path, "wb")
+        self.__file.setnchannels(CHANNELS)
+        self.__file.setsampwidth(2)
+        self.__file.setframerate(self.frequency)
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def close(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+        super().close()
+
+    def __run(self) -> None:
+        mixed = np.zeros((self.buffer_size, CHANNELS), dtype=np.float32)
+        samples = np.zeros((self.buffer_size, CHANNELS), dtype=np.int16)
+        period = self.buffer_size / float(self.frequency)
+        next_buffer = time.monotonic()
+        while not self.__stop.is_set():
+            self.mix(mixed)
+            np.multiply(mixed, 32767.0, out=mixed)
+            np.copyto(samples, mixed, casting="unsafe")
+            self.__file.writeframesraw(samples.data)
+            next_buffer += period
+            delay = next_buffer - time.monotonic()
+            if delay > 0:
+                self.__stop.wait(delay)
@@ -0,0 +1,139 @@
+import random
+import threading
+
+from typing import Dict, List, Optional
+
+# How a source is picked each time a mapping plays a sound.
+#
+# - uniform:   Every source is equally likely.
+# - weighted:  Sources are picked in proportion to their 'weight'.
+# - no-repeat: Like uniform, but never the source that played last.
+# - shuffle:   Every source plays once, in random order, before any of them
+#              repeats.
+SELECTION_STRATEGIES = ["uniform", "weighted", "no-repeat", "shuffle"]
+DEFAULT_SELECTION = "uniform"
+
+
+class SourceSelector:
+    def __init__(
+        self,
+        sources: List[str],
+        strategy: str = DEFAULT_SELECTION,
+        weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """
+        Picks one of a mapping's sources each time it plays a sound.
+
+        Everything a strategy needs is computed here, when the profile is
+        loaded, so choosing a source takes constant time and never builds a
+        list.
+
+        Parameters:
+        - sources (List[str]): The IDs of the sources to pick from.
+        - strategy (str): One of SELECTION_STRATEGIES.
+        - weights (Dict[str, float], optional): The weight of each source,
+                                                used by the 'weighted'
+                                                strategy. Sources without a
+                                                weight have a weight of 1.
+
+        Raises:
+        - ValueError: If the strategy is unknown.
+        """
+        if strategy not in SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown selection strategy '{strategy}'")
+        self.sources = list(sources)
+        self.strategy = strategy
+        self.__count = len(self.sources)
+        self.__lock = threading.Lock()
+        self.__last = -1
+
+        if strategy == "weighted":
+            self.__build_alias_table(
+                [(weights or {}).get(source, 1.0) for source in self.sources]
+            )
+        elif strategy == "shuffle":
+            self.__bag = list(range(self.__count))
+            self.__position = self.__count
+
+        self.__choose = {
+            "uniform": self.__choose_uniform,
+            "weighted": self.__choose_weighted,
+            "no-repeat": self.__choose_no_repeat,
+            "shuffle": self.__choose_shuffle,
+        }[strategy]
+        if self.__count == 0:
+            self.__choose = lambda: None
+        elif self.__count == 1:
+            only = self.sources[0]
+            self.__choose = lambda: only
+
+    def choose(self) -> Optional[str]:
+        """
+        Picks the next source.
+
+        Returns:
+        - str or None: The ID of the source, or None if there are no sources.
+        """
+        return self.__choose()
+
+    def __choose_uniform(self) -> str:
+        return self.sources[int(random.random() * self.__count)]
+
+    def __choose_weighted(self) -> str:
+        # Alias method: pick a column, then either its own source or
+        # its alias
+        column = int(random.random() * self.__count)
+        if random.random() < self.__probability[column]:
+            return self.sources[column]
+        return self.sources[self.__alias[column]]
+
+    def __choose_no_repeat(self) -> str:
+        # Pick among every source but the last one by skipping over it
+        with self.__lock:
+            index = int(random.random() * (self.__count - 1))
+            if index >= self.__last >= 0:
+                index += 1
+            self.__last = index
+        return self.sources[index]
+
+    def __choose_shuffle(self) -> str:
+        with self.__lock:
+            if self.__position >= self.__count:
+                random.shuffle(self.__bag)
+                # Don't repeat the last source of the previous bag
+                if self.__bag[0] == self.__last:
+                    swap = 1 + int(random.random() * (self.__count - 1))
+                    self.__bag[0], self.__bag[swap] = self.__bag[swap], self.__bag[0]
+                self.__position = 0
+            index = self.__bag[self.__position]
+            self.__position += 1
+            self.__last = index
+        return self.sources[index]
+
+    def __build_alias_table(self, weights: List[float]) -> None:
+        """
+        Builds the probability and alias columns of Vose's alias method.
+        """
+        count = len(weights)
+        total = float(sum(weights))
+        self.__probability = [1.0] * count
+        self.__alias = list(range(count))
+        if count == 0 or total <= 0:
+            return
+
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while len(small) > 0 and len(large) > 0:
+            less = small.pop()
+            more = large.pop()
+            self.__probability[less] = scaled[less]
+            self.__alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Whatever is left has a probability of 1 up to rounding errors
+        for index in small + large:
+            self.__probability[index] = 1.0
@@ -0,0 +1,242 @@
+import os
+import mmap
+import struct
+
+from typing import Optional
+
+SEGMENT_MAGIC = b"KBSS"
+SEGMENT_VERSION = 3
+
+# magic, version, reserved, sequence number
+_HEADER = struct.Struct("<4sHHQ")
+# pid, volume, api port, flags, semitones, pitch shift profile, profile,
+# mouse profile, api socket, audio backend, output file
+_RECORD = struct.Struct("<qiiI32p16p128p128p128p16p128p")
+SEGMENT_SIZE = _HEADER.size + _RECORD.size
+
+# Flags
+_RUNNING = 1 << 0
+# Set when a value did not fit in the record, readers should fall back to
+# the lock file.
+_OVERFLOW = 1 << 1
+
+# Optional string fields and the flag marking each of them as present.
+_STRING_FIELDS = [
+    ("semitones", 1 << 2, 32),
+    ("pitch_shift_profile", 1 << 3, 16),
+    ("profile", 1 << 4, 128),
+    ("mouse_profile", 1 << 5, 128),
+    ("api_socket", 1 << 6, 128),
+    ("backend", 1 << 7, 16),
+    ("output", 1 << 8, 128),
+]
+
+# Consistent reads are retried this many times while a write is in progress.
+_MAX_READ_ATTEMPTS = 1000
+
+
+def pid_alive(pid: int) -> bool:
+    """
+    Checks whether a process with the specified PID is running.
+
+    Parameters:
+    - pid (int): The process ID.
+
+    Returns:
+    - bool: True if the process exists.
+    """
+    if os.name == "nt":
+        import psutil
+
+        return psutil.pid_exists(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class StatusSegmentWriter:
+    def __init__(self, path: str) -> None:
+        """
+        Creates the memory mapped status segment that the daemon publishes its
+        state through.
+
+        The segment is a fixed size binary record guarded by a sequence
+        number. The sequence number is odd while the record is being written,
+        which lets readers detect and retry torn reads without any locking.
+
+        A new segment file is created and moved into place, so readers that
+        still map the segment of a previous daemon never see it truncated.
+
+        Parameters:
+        - path (str): The path of the segment file.
+        """
+        self.__path = path
+        self.__seq = 0
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, 0, 0))
+            f.write(bytes(_RECORD.size))
+        try:
+            os.replace(tmp_path, path)
+            self.__file = open(path, "r+b")
+        except OSError:
+            # Windows does not allow replacing a file that a reader has
+            # mapped, reuse the existing segment in place instead
+            os.unlink(tmp_path)
+            self.__file = open(path, "r+b")
+            if os.fstat(self.__file.fileno()).st_size != SEGMENT_SIZE:
+                self.__file.close()
+                raise
+            self.__seq = struct.unpack("<Q", self.__file.read(_HEADER.size)[8:])[0]
+            self.__seq += self.__seq % 2
+            self.__file.seek(0)
+            self.__file.write(
+                _HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, 0, self.__seq)
+            )
+            self.__file.flush()
+        self.__view = mmap.mmap(self.__file.fileno(), SEGMENT_SIZE)
+
+    def publish(self, state: dict, running: bool = True) -> None:
+        """
+        Publishes the daemon's state.
+
+        Parameters:
+        - state (dict): The state, with the same fields as the lock file.
+        - running (bool): Whether the daemon is running. Cleared when the
+                          daemon shuts down.
+        """
+        flags = _RUNNING if running else 0
+        strings = []
+        for name, flag, size in _STRING_FIELDS:
+            value = state.get(name)
+            encoded = b""
+            if value is not None:
+                encoded = str(value).encode("utf-8")
+                if len(encoded) < size:
+                    flags |= flag
+                else:
+                    flags |= _OVERFLOW
+                    encoded = b""
+            strings.append(encoded)
+
+        volume = state.get("volume")
+        api_port = state.get("api_port")
+        record = _RECORD.pack(
+            int(state.get("pid") or os.getpid()),
+            int(volume) if volume is not None else -1,
+            int(api_port) if api_port is not None else -1,
+            flags,
+            *strings,
+        )
+
+        # Odd sequence numbers mark the record as being written
+        self.__seq += 1
+        struct.pack_into("<Q", self.__view, 8, self.__seq)
+        self.__view[_HEADER.size : SEGMENT_SIZE] = record
+        self.__seq += 1
+        struct.pack_into("<Q", self.__view, 8, self.__seq)
+
+    def close(self, remove: bool = True) -> None:
+        """
+        Unmaps the segment, removing its file by default.
+        """
+        try:
+            self.__view.close()
+            self.__file.close()
+        except (OSError, ValueError):
+            pass
+        if remove:
+            try:
+                os.unlink(self.__path)
+            except OSError:
+                pass
+
+
+class StatusSegmentReader:
+    def __init__(self, path: str) -> None:
+        """
+        Reads the daemon's state from its status segment.
+
+        The segment stays mapped between reads, so a read costs a single
+        stat() call to detect a segment that was replaced or removed.
+
+        Parameters:
+        - path (str): The path of the segment file.
+        """
+        self.__path = path
+        self.__view: Optional[mmap.mmap] = None
+        self.__identity = None
+
+    def close(self) -> None:
+        if self.__view is not None:
+            self.__view.close()
+            self.__view = None
+            self.__identity = None
+
+    def read(self) -> Optional[dict]:
+        """
+        Reads a consistent snapshot of the daemon's state.
+
+        Returns:
+        - dict or None: The state, with the same fields as the lock file plus
+                        a 'running' flag, or None if the segment does not
+                        exist, is from an incompatible version, or holds
+                        values that did not fit in it.
+        """
+        try:
+            stat = os.stat(self.__path)
+        except OSError:
+            self.close()
+            return None
+
+        identity = (stat.st_dev, stat.st_ino, stat.st_size)
+        if self.__view is None or identity != self.__identity:
+            self.close()
+            if stat.st_size != SEGMENT_SIZE:
+                return None
+            try:
+                with open(self.__path, "rb") as f:
+                    self.__view = mmap.mmap(
+                        f.fileno(), SEGMENT_SIZE, access=mmap.ACCESS_READ
+                    )
+            except (OSError, ValueError):
+                return None
+            self.__identity = identity
+
+        view = self.__view
+        magic, version, _, _ = _HEADER.unpack_from(view, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            return None
+        for _ in range(_MAX_READ_ATTEMPTS):
+            seq = struct.unpack_from("<Q", view, 8)[0]
+            if seq == 0:
+                # Nothing has been published yet
+                return None
+            if seq % 2 == 1:
+                continue
+            record = _RECORD.unpack_from(view, _HEADER.size)
+            if struct.unpack_from("<Q", view, 8)[0] == seq:
+                break
+        else:
+            return None
+
+        pid, volume, api_port, flags = record[0:4]
+        if flags & _OVERFLOW:
+            return None
+
+        state = {
+            "pid": pid,
+            "volume": volume if volume >= 0 else None,
+            "api_port": api_port if api_port >= 0 else None,
+            "running": bool(flags & _RUNNING),
+        }
+        for (name, flag, _), value in zip(_STRING_FIELDS, record[4:]):
+            state[name] = value.decode("utf-8") if flags & flag else None
+        return state
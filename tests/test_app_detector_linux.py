@@ -0,0 +1,84 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("Xlib")
+
+if not sys.platform.startswith("linux"):
+    pytest.skip("X11 detection is only used on Linux", allow_module_level=True)
+
+from keyboardsounds import app_detector_linux
+
+event_loop = getattr(app_detector_linux, "__event_loop")
+
+
+def test_missing_display_stops_cleanly(monkeypatch, capsys):
+    monkeypatch.delenv("DISPLAY", raising=False)
+    event_loop()
+    assert "Unable to detect the focused application" in capsys.readouterr().out
+
+
+@pytest.fixture
+def xvfb(monkeypatch):
+    if shutil.which("Xvfb") is None:
+        pytest.skip("Xvfb is not installed")
+    for number in range(90, 100):
+        if not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            break
+    display = f":{number}"
+    server = subprocess.Popen(
+        ["Xvfb", display, "-nolisten", "tcp"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10.0
+    while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+        if time.monotonic() > deadline or server.poll() is not None:
+            server.kill()
+            pytest.skip("Xvfb did not start")
+        time.sleep(0.05)
+    monkeypatch.setenv("DISPLAY", display)
+    monkeypatch.setenv("XDG_SESSION_TYPE", "x11")
+    yield display
+    server.terminate()
+    server.wait()
+
+
+def test_active_window_change_reports_executable(xvfb):
+    from Xlib import X, Xatom
+    from Xlib.display import Display
+
+    assert app_detector_linux.is_supported()
+
+    paths = []
+    changed = threading.Event()
+
+    def on_change(path):
+        paths.append(path)
+        changed.set()
+
+    app_detector_linux.start_listening(on_change)
+
+    # Act as the window manager, publishing a window of this process as the
+    # active window
+    display = Display()
+    root = display.screen().root
+    window = root.create_window(0, 0, 10, 10, 0, X.CopyFromParent)
+    window.change_property(
+        display.intern_atom("_NET_WM_PID"), Xatom.CARDINAL, 32, [os.getpid()]
+    )
+    # Give the detector time to subscribe to the root window
+    time.sleep(0.5)
+    root.change_property(
+        display.intern_atom("_NET_ACTIVE_WINDOW"), Xatom.WINDOW, 32, [window.id]
+    )
+    display.flush()
+
+    assert changed.wait(5.0)
+    assert paths == [os.readlink("/proc/self/exe")]
+    display.close()
@@ -0,0 +1,52 @@
+import sys
+
+import pytest
+
+from keyboardsounds import app_rules
+from keyboardsounds.app_rules import Action, GlobalAction, Rules
+
+
+@pytest.fixture
+def windows(monkeypatch):
+    monkeypatch.setattr(app_rules, "WIN32", True)
+    monkeypatch.setattr(app_rules, "PATH_SEPARATOR", "\\")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Linux paths")
+def test_linux_paths_are_case_sensitive():
+    rules = Rules(
+        GlobalAction.ENABLE,
+        [app_rules.Rule("/opt/App/bin", Action.DISABLE)],
+    )
+    assert rules.match_rule("/opt/App/bin") is not None
+    assert rules.match_rule("/opt/App/./bin") is not None
+    assert rules.match_rule("/opt/app/bin") is None
+    assert not rules.has_rule("/opt/app/bin")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Linux paths")
+def test_linux_prefix_and_glob_rules():
+    rules = Rules(
+        GlobalAction.ENABLE,
+        [
+            app_rules.Rule("/opt/JetBrains/", Action.DISABLE),
+            app_rules.Rule("/opt/JetBrains/*/bin/idea", Action.ENABLE),
+        ],
+    )
+    assert rules.match_rule("/opt/JetBrains/tool/bin/idea").action == Action.ENABLE
+    assert rules.match_rule("/opt/JetBrains/tool/bin/other").action == Action.DISABLE
+    assert rules.match_rule("/opt/jetbrains/tool/bin/other") is None
+    # A backslash is part of a file name on Linux, not a separator
+    assert rules.match_rule("/opt/JetBrains\\tool") is None
+
+
+def test_windows_paths_ignore_case_and_separators(windows):
+    rules = Rules(
+        GlobalAction.ENABLE,
+        [
+            app_rules.Rule("C:\\Program Files\\App\\app.exe", Action.DISABLE),
+            app_rules.Rule("C:\\Tools\\", Action.ENABLE),
+        ],
+    )
+    assert rules.match_rule("c:/program files/app/APP.EXE") is not None
+    assert rules.match_rule("C:/tools/bin/x.exe").action == Action.ENABLE
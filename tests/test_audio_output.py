@@ -0,0 +1,22 @@
+import pytest
+
+from keyboardsounds.audio_output import AudioOutput, NullOutput
+
+
+def test_output_must_implement_load_and_play():
+    class LoadOnly(AudioOutput):
+        def load(self, sound):
+            return sound
+
+    with pytest.raises(TypeError):
+        AudioOutput()
+    with pytest.raises(TypeError):
+        LoadOnly()
+
+
+def test_optional_methods_have_defaults():
+    output = NullOutput()
+    output.open()
+    output.set_gains({"keyboard": 1.0, "mouse": 1.0})
+    assert not output.busy()
+    output.close()
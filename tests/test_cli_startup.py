@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported by the daemon, but never by short lived commands
+HEAVY_MODULES = ["pygame", "numpy", "pynput", "pydub", "Xlib"]
+
+
+def imported_modules(*args):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "keyboardsounds.main", *args],
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    modules = set()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if line.startswith("import time:") and line.count("|") == 2:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+@pytest.mark.parametrize("args", [["--help"], ["status"]])
+def test_cli_does_not_import_heavy_modules(args):
+    modules = imported_modules(*args)
+    assert "keyboardsounds.daemon_manager" in modules
+    for module in HEAVY_MODULES:
+        imported = [m for m in modules if m == module or m.startswith(f"{module}.")]
+        assert imported == [], f"'{' '.join(args)}' imported {module}"
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import pytest
+
+import keyboardsounds.audio_manager
+import keyboardsounds.compiled_profile
+import keyboardsounds.profile
+
+from keyboardsounds.compiled_profile import (
+    FORMAT_VERSION,
+    CompiledProfile,
+    build_key_table,
+    compile_profile,
+    get_compiled_profile_path,
+    load_compiled_profile,
+)
+
+PROFILES = os.path.join(os.path.dirname(keyboardsounds.profile.__file__), "profiles")
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    shutil.copytree(
+        os.path.join(PROFILES, "alpaca"), os.path.join(tmp_path, "profiles", "alpaca")
+    )
+    for module in (keyboardsounds.profile, keyboardsounds.compiled_profile):
+        monkeypatch.setattr(module, "get_root", lambda: str(tmp_path))
+    return tmp_path
+
+
+def touch_profile(root):
+    directory = os.path.join(root, "profiles", "alpaca")
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_touched_profile_is_not_rebuilt(root, monkeypatch):
+    assert compile_profile("alpaca")
+    path = get_compiled_profile_path("alpaca")
+    sounds = CompiledProfile(path).sounds
+
+    touch_profile(root)
+    assert CompiledProfile(path).is_stale()
+
+    def decode(*_):
+        raise AssertionError("Clips were decoded again")
+
+    monkeypatch.setattr(keyboardsounds.audio_manager, "AudioManager", decode)
+    assert not compile_profile("alpaca")
+
+    compiled = CompiledProfile(path)
+    assert not compiled.is_stale()
+    assert compiled.sounds == sounds
+
+
+def test_changed_profile_is_rebuilt(root):
+    assert compile_profile("alpaca")
+    with open(os.path.join(root, "profiles", "alpaca", "profile.yaml"), "a") as f:
+        f.write("\n# changed\n")
+    assert compile_profile("alpaca")
+    assert not CompiledProfile(get_compiled_profile_path("alpaca")).is_stale()
+
+
+def test_bundle_from_older_format_is_rebuilt(root):
+    assert compile_profile("alpaca")
+    path = get_compiled_profile_path("alpaca")
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write((FORMAT_VERSION - 1).to_bytes(2, "little"))
+    with pytest.raises(ValueError):
+        CompiledProfile(path)
+
+    compiled = load_compiled_profile("alpaca")
+    assert compiled is not None
+    assert "selection" in compiled.key_table
+
+
+def test_key_in_several_mappings_lists_each_source_once():
+    data = {
+        "profile": {"device": "keyboard", "selection": "no-repeat"},
+        "keys": {
+            "other": [
+                {"sound": ["a", "b"], "keys": ["space"]},
+                {"sound": ["b", "c"], "keys": ["space", "enter"]},
+            ]
+        },
+    }
+    table = build_key_table(data, ["a", "b", "c"])
+    assert table["map"]["space"] == ["a", "b", "c"]
+    assert table["map"]["enter"] == ["b", "c"]
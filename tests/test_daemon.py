@@ -0,0 +1,266 @@
+import threading
+import time
+
+import pytest
+
+from keyboardsounds import daemon
+from keyboardsounds.daemon import DaemonState, _DelayedPlays, _JitterSmoother
+from keyboardsounds.metrics import Metrics
+
+
+def test_fresh_events_play_immediately():
+    jitter = _JitterSmoother()
+    assert jitter.schedule(10.000, 10.005) == 10.005
+    assert jitter.schedule(10.100, 10.102) == 10.102
+
+
+def test_late_burst_keeps_its_original_spacing():
+    jitter = _JitterSmoother()
+    # Three events 50ms apart all delivered at once after a stall
+    play = [jitter.schedule(t, 10.50) for t in (10.00, 10.05, 10.10)]
+    assert play == pytest.approx([10.50, 10.55, 10.60])
+
+
+def test_delay_collapses_back_once_events_are_fresh():
+    jitter = _JitterSmoother()
+    jitter.schedule(10.00, 10.50)
+    assert jitter.schedule(10.05, 10.50) == pytest.approx(10.55)
+    # A fresh event resets the offset, later events are no longer delayed
+    assert jitter.schedule(11.000, 11.005) == 11.005
+    assert jitter.schedule(11.100, 11.120) == 11.120
+
+
+def test_delay_is_capped():
+    jitter = _JitterSmoother()
+    jitter.schedule(10.0, 13.0)
+    assert jitter.schedule(12.0, 13.0) == 13.0 + _JitterSmoother.MAX_DELAY
+
+
+def test_delayed_plays_are_submitted_in_order_when_due():
+    submitted = []
+    done = threading.Event()
+
+    def submit(task):
+        submitted.append((task, time.time()))
+        if len(submitted) == 2:
+            done.set()
+
+    delayed = _DelayedPlays(submit)
+    now = time.time()
+    delayed.schedule(now + 0.06, "second")
+    delayed.schedule(now + 0.03, "first")
+    assert done.wait(2.0)
+    assert [task for task, _ in submitted] == ["first", "second"]
+    assert submitted[0][1] >= now + 0.03
+    assert submitted[1][1] >= now + 0.06
+    assert delayed.stop() == 0
+
+
+def test_stopping_delayed_plays_discards_pending_tasks():
+    submitted = []
+    delayed = _DelayedPlays(submitted.append)
+    delayed.schedule(time.time() + 60, "later")
+    assert len(delayed) == 1
+    assert delayed.stop() == 1
+    assert len(delayed) == 0
+    assert submitted == []
+
+
+@pytest.fixture
+def playback(monkeypatch):
+    """
+    Replaces the daemon's playback queue and scheduler with lists that record
+    the queued and scheduled sounds.
+    """
+    queued = []
+    scheduled = []
+
+    class Scheduler:
+        def schedule(self, play_at, task):
+            scheduled.append((play_at, task))
+
+    module = vars(daemon)
+    monkeypatch.setitem(module, "__enqueue_sound", queued.append)
+    monkeypatch.setitem(module, "__delayed", Scheduler())
+    monkeypatch.setitem(module, "__jitter", _JitterSmoother())
+    monkeypatch.setitem(module, "__metrics", Metrics())
+    return queued, scheduled
+
+
+def test_late_event_is_dropped_without_jitter_smoothing(playback):
+    queued, scheduled = playback
+    play_sound = vars(daemon)["__play_sound"]
+    play_sound(DaemonState(), object(), "keyboard", time.time() - 0.5)
+    assert queued == [] and scheduled == []
+    counters = vars(daemon)["__metrics"].snapshot()["counters"]
+    assert counters["events_dropped_stale"] == 1
+
+
+def test_late_burst_is_replayed_with_jitter_smoothing(playback):
+    queued, scheduled = playback
+    play_sound = vars(daemon)["__play_sound"]
+    state = DaemonState(smooth_jitter=True)
+    start = time.time() - 0.5
+    play_sound(state, object(), "keyboard", start)
+    play_sound(state, object(), "keyboard", start + 0.1)
+    # The first sound plays now, the second keeps its distance to the first
+    assert len(queued) == 1
+    assert len(scheduled) == 1
+    assert scheduled[0][0] - queued[0][4] == pytest.approx(0.1, abs=0.01)
+
+
+class FakeManager:
+    """
+    Stands in for an AudioManager, its sounds name the manager, the source
+    and the action they were resolved to.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.picks = 0
+
+    def get_source(self, key):
+        self.picks += 1
+        return f"{key}-{self.picks}"
+
+    def get_source_sound(self, source, action="press"):
+        return (self.name, source, action)
+
+    def get_sound(self, key, action="press"):
+        return (self.name, key, action)
+
+
+@pytest.fixture
+def played(monkeypatch):
+    """
+    Records the sounds played by the press and release handlers instead of
+    queueing them, starting with no keys held down.
+    """
+    sounds = []
+    module = vars(daemon)
+    monkeypatch.setitem(module, "__down", {})
+    monkeypatch.setitem(
+        module, "__play_sound", lambda state, sound, *_: sounds.append(sound)
+    )
+    return sounds
+
+
+def press(state, key):
+    vars(daemon)["__play_press"](state, key, "keyboard")
+
+
+def release(state, key):
+    vars(daemon)["__play_release"](state, key, "keyboard")
+
+
+def test_key_repeat_while_held_plays_one_press(played):
+    state = DaemonState(am=FakeManager("base"))
+    for _ in range(5):
+        press(state, "a")
+    release(state, "a")
+    assert played == [("base", "a-1", "press"), ("base", "a-1", "release")]
+    # Once released the key plays again, from a newly picked source
+    press(state, "a")
+    assert played[-1] == ("base", "a-2", "press")
+
+
+def test_release_after_profile_swap_uses_the_press_profile(played):
+    before = DaemonState(am=FakeManager("before"))
+    after = DaemonState(am=FakeManager("after"))
+    press(before, "a")
+    release(after, "a")
+    assert played == [("before", "a-1", "press"), ("before", "a-1", "release")]
+    assert "a" not in vars(daemon)["__down"]
+
+
+def test_release_of_a_key_never_pressed_uses_the_current_profile(played):
+    state = DaemonState(am=FakeManager("base"))
+    release(state, "a")
+    assert played == [("base", "a", "release")]
+    release(DaemonState(), "b")
+    assert len(played) == 1
+
+
+def test_key_pressed_while_disabled_stays_silent_on_release(played):
+    press(DaemonState(am=FakeManager("base"), enabled=False), "a")
+    release(DaemonState(am=FakeManager("base")), "a")
+    assert played == []
+
+
+class ProfileRules:
+    """
+    App rules that select the 'rule' keyboard profile for every application.
+    """
+
+    class Rule:
+        profile = "rule"
+        mouse_profile = None
+
+    def get_rule_profiles(self):
+        return ["rule"], []
+
+    def has_exclusive_rule(self):
+        return False
+
+    def get_action(self, app_path):
+        return daemon.Action.PROFILE
+
+    def match_rule(self, app_path):
+        return self.Rule()
+
+
+class SlowProfile:
+    """
+    Stands in for Profile, loading a profile blocks until it is released.
+    """
+
+    released = threading.Event()
+
+    def __init__(self, name):
+        self.name = name
+
+    @classmethod
+    def load(cls, name):
+        assert cls.released.wait(5.0)
+        return cls(name)
+
+    def value(self, path):
+        return "keyboard"
+
+
+@pytest.mark.skipif(
+    "__on_focused_application_changed" not in vars(daemon),
+    reason="Focus detection is not supported on this platform",
+)
+def test_rule_profiles_are_primed_without_blocking_focus_changes(monkeypatch):
+    module = vars(daemon)
+    rules = ProfileRules()
+    monkeypatch.setattr(daemon.app_rules, "get_cached_rules", lambda: rules)
+    monkeypatch.setattr(daemon, "Profile", SlowProfile)
+    monkeypatch.setattr(daemon, "AudioManager", lambda profile: profile)
+    monkeypatch.setattr(SlowProfile, "released", threading.Event())
+    for name, value in [
+        ("__state", DaemonState(am=FakeManager("base"))),
+        ("__dm", None),
+        ("__primed", {}),
+        ("__primed_rules", None),
+        ("__priming_rules", None),
+        ("__focused_app", None),
+        ("__metrics", Metrics()),
+        ("__mouse_listener", None),
+    ]:
+        monkeypatch.setitem(module, name, value)
+
+    started = time.monotonic()
+    module["__on_focused_application_changed"]("/usr/bin/editor")
+    assert time.monotonic() - started < 1.0
+    # The base profile plays until the rule's profile is primed
+    assert module["__state"].keyboard.name == "base"
+
+    SlowProfile.released.set()
+    deadline = time.monotonic() + 5.0
+    while module["__state"].keyboard.name == "base":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert module["__state"].keyboard.name == "rule"
+    assert module["__primed_rules"] is rules
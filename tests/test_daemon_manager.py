@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from keyboardsounds.daemon_manager import RECONFIGURE_TIMEOUT, DaemonManager
+
+STATE = {
+    "pid": os.getpid(),
+    "volume": 50,
+    "semitones": None,
+    "pitch_shift_profile": "both",
+    "profile": "alpaca",
+    "mouse_profile": None,
+    "backend": "pygame",
+    "output": None,
+}
+
+
+class FakeClient:
+    def __init__(self):
+        self.batches = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    def batch(self, commands):
+        self.batches.append(commands)
+        return [{"ok": True} for _ in commands]
+
+
+@pytest.fixture
+def reconfigure(tmp_path, monkeypatch):
+    """
+    Returns a function that reconfigures a daemon running with STATE and
+    the client the changes were sent through.
+    """
+    manager = DaemonManager(str(tmp_path / ".lock"))
+    manager._DaemonManager__proc_info = dict(STATE)
+    client = FakeClient()
+    timeouts = []
+
+    def api_client(timeout=5.0):
+        timeouts.append(timeout)
+        return client
+
+    monkeypatch.setattr(manager, "api_client", api_client)
+
+    def apply(volume=50, profile="alpaca", window=False, **changes):
+        config = {
+            "semitones": None,
+            "pitch_shift_profile": None,
+            "mouse_profile": None,
+            "backend": "pygame",
+            "output_path": None,
+            **changes,
+        }
+        return manager._DaemonManager__try_reconfigure(
+            volume,
+            profile,
+            window,
+            config["semitones"],
+            config["pitch_shift_profile"],
+            config["mouse_profile"],
+            config["backend"],
+            config["output_path"],
+        )
+
+    apply.client = client
+    apply.timeouts = timeouts
+    return apply
+
+
+def test_unchanged_configuration_sends_nothing(reconfigure):
+    assert reconfigure()
+    assert reconfigure.client.batches == []
+
+
+def test_only_changed_settings_are_sent_in_one_batch(reconfigure):
+    assert reconfigure(volume=80, mouse_profile="mouse", semitones="-1,1")
+    assert reconfigure.client.batches == [
+        [
+            {"action": "set_volume", "volume": 80},
+            {"action": "set_mouse_profile", "profile": "mouse"},
+            {"action": "set_pitch_shift", "semitones": "-1,1", "profile": None},
+        ]
+    ]
+    assert reconfigure.timeouts == [RECONFIGURE_TIMEOUT]
+
+
+def test_backend_change_requires_a_restart(reconfigure):
+    assert not reconfigure(volume=80, backend="software")
+    assert not reconfigure(backend="wav", output_path="out.wav")
+    assert reconfigure.client.batches == []
+
+
+def test_failed_setting_requires_a_restart(reconfigure, monkeypatch):
+    monkeypatch.setattr(
+        reconfigure.client,
+        "batch",
+        lambda commands: [{"ok": False, "error": "Unknown profile"}],
+    )
+    assert not reconfigure(profile="missing")
@@ -0,0 +1,68 @@
+import socket
+import time
+
+from keyboardsounds.external_api import ExternalAPI, ExternalAPIClient
+
+
+def start_api(idle_timeout):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("localhost", 0))
+    # Accept connections before the event loop starts serving them
+    sock.listen()
+    api = ExternalAPI(sock, on_command=lambda command: None, idle_timeout=idle_timeout)
+    api.listen()
+    return api
+
+
+def test_idle_connection_is_closed():
+    api = start_api(idle_timeout=0.5)
+    try:
+        with ExternalAPIClient(port=api.port()) as client:
+            client.request("status")
+            time.sleep(1.0)
+            assert client.next_event() is None
+    finally:
+        api.stop()
+
+
+def test_subscriber_outlives_idle_timeout():
+    api = start_api(idle_timeout=0.5)
+    try:
+        with ExternalAPIClient(port=api.port()) as client:
+            client.request("subscribe")
+            time.sleep(1.5)
+            api.publish("state", {"enabled": True})
+            assert client.next_event() == {
+                "event": "state",
+                "data": {"enabled": True},
+            }
+    finally:
+        api.stop()
+
+
+def test_subscription_in_a_batch_outlives_idle_timeout():
+    api = start_api(idle_timeout=0.5)
+    try:
+        with ExternalAPIClient(port=api.port()) as client:
+            client.batch([{"action": "status"}, {"action": "subscribe"}])
+            time.sleep(1.0)
+            api.publish("state", {"enabled": False})
+            assert client.next_event() == {
+                "event": "state",
+                "data": {"enabled": False},
+            }
+    finally:
+        api.stop()
+
+
+def test_unsubscribed_connection_is_closed_when_idle():
+    api = start_api(idle_timeout=0.5)
+    try:
+        with ExternalAPIClient(port=api.port()) as client:
+            client.request("subscribe")
+            client.request("unsubscribe")
+            time.sleep(1.0)
+            api.publish("state", {"enabled": True})
+            assert client.next_event() is None
+    finally:
+        api.stop()
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from keyboardsounds.listener import _ScrollCoalescer
+
+
+def test_burst_is_coalesced_into_one_event_per_interval():
+    scroll = _ScrollCoalescer(0.05)
+    assert scroll.feed(1, 10.00) == 1
+    assert scroll.feed(1, 10.01) == 0
+    assert scroll.feed(2, 10.02) == 0
+    assert scroll.feed(1, 10.06) == 4
+
+
+def test_zero_interval_lets_every_notch_through():
+    scroll = _ScrollCoalescer(0.0)
+    assert [scroll.feed(1, 10.0 + i * 0.001) for i in range(3)] == [1, 1, 1]
+
+
+def test_trailing_notches_are_flushed_once_due():
+    scroll = _ScrollCoalescer(0.05)
+    assert scroll.feed(1, 10.00) == 1
+    assert scroll.feed(1, 10.01) == 0
+    assert scroll.feed(1, 10.02) == 0
+    assert scroll.flush(10.03) == 0
+    assert scroll.flush(10.05) == 2
+    assert scroll.flush(10.20) == 0
+
+
+def test_stale_notches_are_not_reported_with_a_later_scroll():
+    scroll = _ScrollCoalescer(0.05)
+    assert scroll.feed(1, 10.00) == 1
+    assert scroll.feed(5, 10.01) == 0
+    assert scroll.feed(1, 100.0) == 1
+
+
+def test_direction_change_discards_pending_notches():
+    scroll = _ScrollCoalescer(0.05)
+    assert scroll.feed(1, 10.00) == 1
+    assert scroll.feed(3, 10.01) == 0
+    assert scroll.feed(-1, 10.02) == 0
+    assert scroll.feed(-1, 10.06) == -2
+
+
+def test_flush_timer_reports_trailing_notches():
+    flushed = []
+    done = threading.Event()
+
+    def on_flush(notches, now):
+        flushed.append(notches)
+        done.set()
+
+    scroll = _ScrollCoalescer(0.05, on_flush)
+    now = time.time()
+    assert scroll.feed(1, now) == 1
+    assert scroll.feed(-1, now + 0.001) == 0
+    assert scroll.feed(-1, now + 0.002) == 0
+    assert done.wait(2.0)
+    assert flushed == [-2]
+    scroll.cancel()
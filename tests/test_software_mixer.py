@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from keyboardsounds.software_mixer import SoftwareMixer
+
+
+def make_clip(level, frames=1000):
+    clip = np.empty((frames, 2), dtype=np.float32)
+    clip[:, 0] = level
+    clip[:, 1] = -level
+    return clip
+
+
+@pytest.mark.parametrize("soft_clip", [False, True])
+def test_voice_under_full_scale_is_unchanged(soft_clip):
+    mixer = SoftwareMixer(buffer_size=256, soft_clip=soft_clip)
+    clip = make_clip(0.5)
+    assert mixer.play(clip, "keyboard", 1.0)
+
+    out = np.zeros((256, 2), dtype=np.float32)
+    mixer.mix(out)
+    np.testing.assert_array_equal(out, clip[:256])
+
+
+def test_hard_clip_by_default():
+    mixer = SoftwareMixer(buffer_size=256)
+    mixer.play(make_clip(0.8), "keyboard", 1.0)
+    mixer.play(make_clip(0.8), "keyboard", 1.0)
+
+    out = np.zeros((256, 2), dtype=np.float32)
+    mixer.mix(out)
+    assert np.all(out[:, 0] == 1.0)
+    assert np.all(out[:, 1] == -1.0)
+
+
+def test_soft_clip_saturates_above_knee():
+    mixer = SoftwareMixer(buffer_size=256, soft_clip=True)
+    mixer.play(make_clip(0.8), "keyboard", 1.0)
+    mixer.play(make_clip(0.8), "keyboard", 1.0)
+
+    out = np.zeros((256, 2), dtype=np.float32)
+    mixer.mix(out)
+    assert np.all((out[:, 0] > 0.9) & (out[:, 0] < 1.0))
+    np.testing.assert_array_equal(out[:, 1], -out[:, 0])
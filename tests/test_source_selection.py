@@ -0,0 +1,54 @@
+import random
+from collections import Counter
+
+import pytest
+
+from keyboardsounds.source_selection import SourceSelector
+
+SOURCES = ["a", "b", "c", "d"]
+
+
+@pytest.fixture(autouse=True)
+def seed():
+    random.seed(1234)
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        SourceSelector(SOURCES, "round-robin")
+
+
+def test_no_sources_and_single_source():
+    assert SourceSelector([], "shuffle").choose() is None
+    assert {SourceSelector(["a"], "no-repeat").choose() for _ in range(10)} == {"a"}
+
+
+def test_weighted_picks_follow_the_weights():
+    weights = {"a": 1.0, "b": 2.0, "c": 3.0}
+    selector = SourceSelector(["a", "b", "c", "d"], "weighted", weights)
+    picks = Counter(selector.choose() for _ in range(60000))
+    # d has no weight and counts as 1
+    total = 7.0
+    for source, weight in {**weights, "d": 1.0}.items():
+        assert picks[source] / 60000 == pytest.approx(weight / total, abs=0.01)
+
+
+def test_weighted_source_with_zero_weight_is_never_picked():
+    selector = SourceSelector(["a", "b"], "weighted", {"a": 0.0})
+    assert {selector.choose() for _ in range(1000)} == {"b"}
+
+
+def test_no_repeat_never_picks_the_same_source_twice_in_a_row():
+    selector = SourceSelector(SOURCES, "no-repeat")
+    picks = [selector.choose() for _ in range(5000)]
+    assert all(previous != current for previous, current in zip(picks, picks[1:]))
+    assert set(picks) == set(SOURCES)
+
+
+def test_shuffle_plays_every_source_once_per_bag():
+    selector = SourceSelector(SOURCES, "shuffle")
+    picks = [selector.choose() for _ in range(len(SOURCES) * 200)]
+    for start in range(0, len(picks), len(SOURCES)):
+        assert sorted(picks[start : start + len(SOURCES)]) == SOURCES
+    # Not even across the boundary of two bags
+    assert all(previous != current for previous, current in zip(picks, picks[1:]))
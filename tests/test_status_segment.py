@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+
+import keyboardsounds.status_segment
+from keyboardsounds.daemon_manager import DaemonManager
+from keyboardsounds.status_segment import StatusSegmentReader, StatusSegmentWriter
+
+STATE = {
+    "pid": os.getpid(),
+    "volume": 50,
+    "semitones": "-2,2",
+    "pitch_shift_profile": "both",
+    "profile": "alpaca",
+    "mouse_profile": None,
+    "backend": "pygame",
+    "output": None,
+    "api_port": 4000,
+    "api_socket": "/tmp/kbs.sock",
+}
+
+
+@pytest.fixture
+def segment(tmp_path):
+    path = str(tmp_path / ".lock.status")
+    writer = StatusSegmentWriter(path)
+    reader = StatusSegmentReader(path)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def test_published_state_is_read_back(segment):
+    writer, reader = segment
+    assert reader.read() is None
+    writer.publish(STATE)
+    assert reader.read() == {**STATE, "running": True}
+    writer.publish({**STATE, "volume": 75, "profile": None}, running=False)
+    assert reader.read() == {**STATE, "volume": 75, "profile": None, "running": False}
+
+
+def test_value_too_long_for_the_segment_is_not_read(segment):
+    writer, reader = segment
+    writer.publish({**STATE, "profile": "p" * 200})
+    assert reader.read() is None
+
+
+def test_manager_falls_back_to_the_lock_file_on_overflow(tmp_path):
+    lock_file = str(tmp_path / ".lock")
+    state = {**STATE, "profile": "p" * 200}
+    with open(lock_file, "w") as f:
+        json.dump(state, f)
+    writer = StatusSegmentWriter(f"{lock_file}.status")
+    try:
+        writer.publish(state)
+        manager = DaemonManager(lock_file)
+        assert manager.get_profile() == "p" * 200
+        assert manager.get_volume() == 50
+    finally:
+        writer.close()
+
+
+def test_torn_read_is_retried(segment, monkeypatch):
+    writer, reader = segment
+    writer.publish(STATE)
+    record = keyboardsounds.status_segment._RECORD
+
+    class TornRecord:
+        """
+        Publishes a new state while the reader copies the record, so that
+        the first copy is torn.
+        """
+
+        size = record.size
+        pack = record.pack
+        reads = 0
+
+        def unpack_from(self, view, offset):
+            TornRecord.reads += 1
+            values = record.unpack_from(view, offset)
+            if TornRecord.reads == 1:
+                writer.publish({**STATE, "volume": 10})
+            return values
+
+    monkeypatch.setattr(keyboardsounds.status_segment, "_RECORD", TornRecord())
+    assert reader.read()["volume"] == 10
+    assert TornRecord.reads == 2
+
+
+def test_read_during_a_write_gives_up_after_retrying(segment):
+    writer, reader = segment
+    writer.publish(STATE)
+    # Leave the sequence number odd, as if the writer died mid-write
+    with open(writer._StatusSegmentWriter__path, "r+b") as f:
+        f.seek(8)
+        f.write((3).to_bytes(8, "little"))
+    assert reader.read() is None